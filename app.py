@@ -21,6 +21,12 @@ import sys
 
 sys.path.append("src")
 
+from helpers import enable_copy_on_write
+
+# Executions work on copy-on-write views of the shared datasets (pandas option, set
+# once for the process)
+enable_copy_on_write()
+
 # Page config
 st.set_page_config(
     page_title="PepsiCo - LIFT Bot",
@@ -0,0 +1,178 @@
+"""
+Answer a file of questions in one go, for recurring reviews.
+
+The questions file is a .txt (one question per line) or a .csv with a "question"
+column. Every question runs in its own session (fresh agent memories) with up to
+--workers questions in flight; the datasets, prompts and caches are prepared once and
+shared. The output directory gets answers.json / answers.csv (answer, route, graph
+paths, timings, error per question) and the figures under figures/q<N>/.
+"""
+
+# Steps to run the batch
+# python batch.py questions.txt --output-dir batch_output --workers 4
+# python batch.py questions.txt --fake-llm --expense-file <csv>  (dry run)
+
+# Import Libraries
+import warnings
+
+warnings.filterwarnings("ignore")
+import argparse
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import yaml
+
+sys.path.append("src")
+
+from dataset_registry import registry
+from helpers import enable_copy_on_write
+from multi_agents import MultiAgentSystem, extract_content_within_tag
+from sandbox import start_sandbox_pool
+from response_cache import ResponseCache
+
+
+def read_questions(file_path):
+    if file_path.lower().endswith(".csv"):
+        questions = pd.read_csv(file_path)["question"].dropna().astype(str)
+    else:
+        with open(file_path, "r", encoding="utf-8") as f:
+            questions = f.read().splitlines()
+    return [q.strip() for q in questions if q.strip()]
+
+
+def answer_question(question_id, question, session_kwargs, output_dir):
+    """Run one question through supervisor -> Insight Agent in its own session."""
+    row = {
+        "id": question_id,
+        "question": question,
+        "route": None,
+        "answer": None,
+        "graphs": [],
+        "tools": [],
+        "seconds": None,
+        "error": None,
+    }
+    start = time.perf_counter()
+    try:
+        agent_obj = MultiAgentSystem(
+            plot_path=os.path.join(output_dir, "figures", f"q{question_id}"),
+            **session_kwargs,
+        )
+        # Same flow as the chat tab: stop after the Insight Agent's answer
+        for chunk in agent_obj.graph.stream({"question": question}):
+            if "supervisor" in chunk:
+                result = chunk["supervisor"]
+                row["route"] = result["type"]
+                row["answer"] = result["messages"][0].content
+            if "Insight Agent" in chunk:
+                result = chunk["Insight Agent"]
+                final_answer = result.get("output") or result.get("final_answer", "")
+                graph_content = extract_content_within_tag(final_answer, "graph")
+                row["answer"] = extract_content_within_tag(final_answer, "answer")
+                row["graphs"] = [
+                    g.strip() for g in graph_content.split("|") if ".json" in g
+                ]
+                row["tools"] = [
+                    step["tool"]
+                    for step in result.get("recorder_steps", [])
+                    if "tool" in step
+                ]
+                break
+    except Exception as e:
+        print(f"Question {question_id} failed: {e} \n{traceback.format_exc()}")
+        row["error"] = str(e)
+    row["seconds"] = time.perf_counter() - start
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("questions_file")
+    parser.add_argument("--expense-file", default="src/data/Expenses_RB.csv")
+    parser.add_argument("--budget-file", default="src/data/Budget_RB.csv")
+    parser.add_argument("--output-dir", default="batch_output")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--model-name", default="gpt-4o")
+    parser.add_argument("--no-parallel-tools", action="store_true")
+    parser.add_argument(
+        "--fake-llm",
+        action="store_true",
+        help="Answer with FakeChatModel (no API key needed, for dry runs)",
+    )
+    parser.add_argument("--fake-latency", type=float, default=0.5)
+    args = parser.parse_args()
+    # Executions work on copy-on-write views of the shared datasets
+    enable_copy_on_write()
+
+    questions = read_questions(args.questions_file)
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    # Open AI key
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f) or {}
+    api_key = config.get("open_ai") or os.environ.get("OPENAI_API_KEY")
+    llm = None
+    response_cache = None
+    if args.fake_llm:
+        from fake_llm import FakeChatModel
+
+        llm = FakeChatModel(latency=args.fake_latency)
+        # Canned responses must never be replayed to real models: own model name and
+        # an in-memory response cache instead of the shared one on disk
+        args.model_name = "fake"
+        response_cache = ResponseCache(":memory:")
+
+    # Datasets are loaded once and shared by every question
+    expense_dataset = registry.get(registry.register_file("expense", args.expense_file))
+    budget_dataset = registry.get(registry.register_file("budget", args.budget_file))
+    # Sandbox workers are forked before the worker threads start
+    start_sandbox_pool(
+        datasets=[expense_dataset, budget_dataset],
+        fork=True,
+        **(config.get("sandbox") or {}),
+    )
+    session_kwargs = {
+        "model_name": args.model_name,
+        "api_key": api_key,
+        "expense_dataset": expense_dataset,
+        "budget_dataset": budget_dataset,
+        "parallel_tools": not args.no_parallel_tools,
+        "llm": llm,
+        "response_cache": response_cache,
+    }
+    # Build the first session up front so that the shared prompts, tier mapping and
+    # budget vs actual dataset are computed once, not by every worker
+    MultiAgentSystem(
+        plot_path=os.path.join(args.output_dir, "figures"), **session_kwargs
+    )
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        rows = list(
+            executor.map(
+                lambda item: answer_question(
+                    item[0], item[1], session_kwargs, args.output_dir
+                ),
+                enumerate(questions, start=1),
+            )
+        )
+    elapsed = time.perf_counter() - start
+
+    with open(os.path.join(args.output_dir, "answers.json"), "w") as f:
+        json.dump(rows, f, indent=2, default=str)
+    pd.DataFrame(rows).to_csv(os.path.join(args.output_dir, "answers.csv"), index=False)
+    n_failed = sum(row["error"] is not None for row in rows)
+    print(
+        f"Answered {len(rows) - n_failed}/{len(rows)} questions in {elapsed:.2f}s "
+        f"({len(rows) / elapsed:.2f} questions/s, {args.workers} workers), "
+        f"results in {args.output_dir}"
+    )
+
+
+if __name__ == "__main__":
+    main()
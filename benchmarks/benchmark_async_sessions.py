@@ -0,0 +1,86 @@
+"""
+Wall-clock time of N concurrent conversations (one question each, supervisor through
+Insight Agent) on a single event loop with graph.astream. Uses FakeChatModel with an
+injected per-call latency, so no API key is needed.
+
+Run from the repository root:
+    python benchmarks/benchmark_async_sessions.py --sessions 1 10 50 --latency 0.5
+"""
+
+# Import Libraries
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append("src")
+
+from benchmark_compact_schema import write_expense_file
+from data_cache import load_preprocessed_dataset
+from helpers import enable_copy_on_write, preprocess_expense_data
+from fake_llm import FakeChatModel
+from multi_agents import MultiAgentSystem
+from response_cache import ResponseCache
+
+
+async def ask(system, question):
+    async for mode, chunk in system.graph.astream(
+        {"question": question}, stream_mode=["updates", "custom"]
+    ):
+        if mode == "updates" and "Insight Agent" in chunk:
+            return chunk["Insight Agent"]["output"]
+
+
+async def run_sessions(n_sessions, llm, df_expense, df_budget, plot_path):
+    # Fresh in-memory cache per configuration: responses cached by a previous
+    # configuration (or benchmark run, through the shared cache file) are not replayed
+    response_cache = ResponseCache(":memory:")
+    systems = [
+        MultiAgentSystem(
+            model_name="fake",
+            api_key=None,
+            expense_dataset=df_expense,
+            budget_dataset=df_budget,
+            plot_path=plot_path,
+            parallel_tools=True,
+            llm=llm,
+            response_cache=response_cache,
+        )
+        for _ in range(n_sessions)
+    ]
+    start = time.perf_counter()
+    await asyncio.gather(
+        *[
+            ask(system, f"Compare 2024 expenses vs budget for Brazil ({i})")
+            for i, system in enumerate(systems)
+        ]
+    )
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sessions", type=int, nargs="+", default=[1, 10, 50])
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    # Same pandas mode as the app
+    enable_copy_on_write()
+
+    df_budget = load_preprocessed_dataset("budget", "src/data/Budget_RB.csv")
+    # Synthetic expense extract (the expense source file is not part of the repository)
+    expense_path = os.path.join(tempfile.mkdtemp(), "expenses.csv")
+    write_expense_file(expense_path, 10_000)
+    df_expense = preprocess_expense_data(expense_path)
+    llm = FakeChatModel(latency=args.latency)
+    plot_path = tempfile.mkdtemp()
+    for n_sessions in args.sessions:
+        elapsed = asyncio.run(
+            run_sessions(n_sessions, llm, df_expense, df_budget, plot_path)
+        )
+        print(f"sessions={n_sessions}: {elapsed:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""
+Memory and groupby speed of the preprocessed expense dataset with the compact schema
+(src/schema.py: categorical dimensions, downcast amounts) vs the previous object/int64
+columns, on a synthetic expense CSV file.
+
+Run from the repository root:
+    python benchmarks/benchmark_compact_schema.py --rows 5000000
+"""
+
+# Import Libraries
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("src")
+
+from helpers import preprocess_expense_data
+from schema import expense_schema
+
+groupbys = [
+    ["Country"],
+    ["Country", "Year"],
+    ["Brand", "Tier 1", "Tier 2"],
+    ["Region", "Country", "Brand", "Year", "Month", "Tier 1", "Tier 2", "Tier 3"],
+]
+
+
+def write_expense_file(path, n_rows, seed=0):
+    # Raw column names as in the source extract
+    rng = np.random.default_rng(seed)
+
+    def pick(values):
+        return np.array(values, dtype=object)[rng.integers(0, len(values), n_rows)]
+
+    countries = [f"Country {i}" for i in range(20)]
+    pep = rng.integers(0, 500_000, n_rows)
+    bottler = rng.integers(0, 500_000, n_rows)
+    pd.DataFrame(
+        {
+            "Region": pick(["LAB North", "LAB South", "LAB Central", "LAB Mexico"]),
+            "Country": pick(countries),
+            "Category": pick(["CSD", "Water", "Snacks"]),
+            "Brand": pick([f"Brand {i}" for i in range(40)]),
+            "Year": rng.integers(2022, 2026, n_rows),
+            "Time Month": rng.integers(1, 13, n_rows),
+            "Tier 1": pick(["Pull-Non-Working", "Pull-Working", "STB - Push"]),
+            "Tier 2": pick([f"Tier 2 item {i}" for i in range(16)]),
+            "Tier 3": pick([f"Tier 3 item {i}" for i in range(60)]),
+            "Expense Status": pick(["approved", "under approval", "rejected"]),
+            "Pending At": pick(["Marketing Analyst", None]),
+            "Expense Logged by (NS)": pick(["PepsiCo", "Bottler"]),
+            "Audit Status": pick(["audit pass", "audit failed", None]),
+            "Audit Comments": pick(["Documents missing", None, None, None]),
+            "Pep Share (USD)": pep,
+            "Bottler Share (USD)": bottler,
+            "Total Expense (USD)": pep + bottler,
+        }
+    ).to_csv(path, index=False)
+
+
+def legacy_types(df):
+    # Column types produced before the compact schema
+    dtypes = {
+        col: object if kind != "integer" else "int64"
+        for col, kind in expense_schema.items()
+    }
+    return df.astype(dtypes)
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "expenses.csv")
+        write_expense_file(path, args.rows)
+        start = time.perf_counter()
+        compact = preprocess_expense_data(path)
+        print(f"preprocess {args.rows:,} rows: {time.perf_counter() - start:.1f}s")
+    legacy = legacy_types(compact)
+
+    mb = 1024**2
+    print(f"{'':<60} {'legacy':>10} {'compact':>10}")
+    print(
+        f"{'memory (MB)':<60} {legacy.memory_usage(deep=True).sum() / mb:>10.1f} "
+        f"{compact.memory_usage(deep=True).sum() / mb:>10.1f}"
+    )
+    for by in groupbys:
+        times = [
+            best_of(
+                lambda: df.groupby(by, observed=True)["Total Expense"].sum(),
+                args.repeat,
+            )
+            for df in (legacy, compact)
+        ]
+        label = f"groupby {', '.join(by)}"
+        label = label if len(label) <= 58 else label[:55] + "..."
+        print(f"{label:<60} {times[0]:>9.3f}s {times[1]:>9.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Cost of isolating executions from the shared datasets: passing the frame itself
+(previous behaviour, not isolated), a deep copy per execution, and the copy-on-write
+view used by `run_code_segments` (the isolation itself is tested in
+tests/test_cow_views.py).
+
+Run from the repository root:
+    python benchmarks/benchmark_cow_views.py --rows 5000000
+"""
+
+# Import Libraries
+import argparse
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("src")
+
+from helpers import enable_copy_on_write, run_code_segments
+
+read_only_code = {
+    "code": "answer_dict = {'total': float(df['Expense'].sum())}",
+    "answer": "{answer_dict['total']}",
+}
+
+
+def make_frame(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "Country": rng.choice(["Brazil", "Mexico", "India"], n_rows),
+            "Year": rng.integers(2022, 2026, n_rows),
+            "Expense": rng.random(n_rows) * 1000,
+        }
+    )
+
+
+def best_of(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5_000_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    # Same pandas mode as the app
+    enable_copy_on_write()
+
+    df = make_frame(args.rows)
+    plot_dir = tempfile.mkdtemp()
+
+    # Overhead for read-only code
+    shared = best_of(lambda: exec(read_only_code["code"], {"df": df}), args.repeat)
+    deep_copy = best_of(
+        lambda: exec(read_only_code["code"], {"df": df.copy()}), args.repeat
+    )
+    view = best_of(
+        lambda: run_code_segments(read_only_code, {"df": df}, plot_dir), args.repeat
+    )
+    print(f"{'rows':>12}: {args.rows:,}")
+    print(f"{'shared frame':>12}: {shared * 1e3:.2f} ms")
+    print(f"{'deep copy':>12}: {deep_copy * 1e3:.2f} ms")
+    print(f"{'cow view':>12}: {view * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Per-question overhead of obtaining the Insight Agent executor: rebuilding it on every
+question (previous behaviour) vs reusing the instance cached on MultiAgentSystem.
+No LLM calls are made.
+
+Run from the repository root:
+    python benchmarks/benchmark_insight_agent_overhead.py --questions 200
+"""
+
+# Import Libraries
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append("src")
+
+from benchmark_compact_schema import write_expense_file
+from data_cache import load_preprocessed_dataset
+from helpers import enable_copy_on_write, preprocess_expense_data
+from multi_agents import MultiAgentSystem
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--questions", type=int, default=200)
+    args = parser.parse_args()
+    # Same pandas mode as the app
+    enable_copy_on_write()
+
+    df_budget = load_preprocessed_dataset("budget", "src/data/Budget_RB.csv")
+    # Synthetic expense extract (the expense source file is not part of the repository)
+    expense_path = os.path.join(tempfile.mkdtemp(), "expenses.csv")
+    write_expense_file(expense_path, 10_000)
+    df_expense = preprocess_expense_data(expense_path)
+    system = MultiAgentSystem(
+        model_name="gpt-4o",
+        api_key="sk-benchmark",
+        expense_dataset=df_expense,
+        budget_dataset=df_budget,
+        plot_path=tempfile.mkdtemp(),
+    )
+
+    start = time.perf_counter()
+    for _ in range(args.questions):
+        system.build_insight_agent()
+    rebuild = (time.perf_counter() - start) / args.questions
+
+    start = time.perf_counter()
+    for _ in range(args.questions):
+        system.insight_agent()
+    reuse = (time.perf_counter() - start) / args.questions
+
+    print(f"rebuild per question: {rebuild * 1e3:.3f} ms")
+    print(f"reuse per question:   {reuse * 1e3:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""
+Wall-clock time of a budget-vs-actual question through the Insight Agent with the
+Expense and Budget tools run one after another vs concurrently. Uses FakeChatModel with
+an injected per-call latency, so no API key is needed.
+
+Run from the repository root:
+    python benchmarks/benchmark_parallel_tools.py --latency 0.5
+"""
+
+# Import Libraries
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append("src")
+
+from benchmark_compact_schema import write_expense_file
+from data_cache import load_preprocessed_dataset
+from helpers import enable_copy_on_write, preprocess_expense_data
+from fake_llm import FakeChatModel
+from multi_agents import MultiAgentSystem
+from response_cache import ResponseCache
+
+
+def run_question(parallel_tools, latency, df_expense, df_budget):
+    system = MultiAgentSystem(
+        model_name="fake",
+        api_key=None,
+        expense_dataset=df_expense,
+        budget_dataset=df_budget,
+        plot_path=tempfile.mkdtemp(),
+        parallel_tools=parallel_tools,
+        llm=FakeChatModel(latency=latency),
+        # Fresh in-memory cache: a response cached by one run must not be replayed
+        # by the next one (or by later benchmark runs through the shared cache file)
+        response_cache=ResponseCache(":memory:"),
+    )
+    start = time.perf_counter()
+    result = system.insight_step(
+        {"enriched_question": "Compare 2024 expenses vs budget for Brazil"}
+    )
+    elapsed = time.perf_counter() - start
+    return elapsed, [step.get("tool") for step in result["recorder_steps"]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--latency", type=float, default=0.5)
+    args = parser.parse_args()
+    # Same pandas mode as the app
+    enable_copy_on_write()
+
+    df_budget = load_preprocessed_dataset("budget", "src/data/Budget_RB.csv")
+    # Synthetic expense extract (the expense source file is not part of the repository)
+    expense_path = os.path.join(tempfile.mkdtemp(), "expenses.csv")
+    write_expense_file(expense_path, 10_000)
+    df_expense = preprocess_expense_data(expense_path)
+    for parallel_tools in [False, True]:
+        elapsed, tools = run_question(
+            parallel_tools, args.latency, df_expense, df_budget
+        )
+        print(f"parallel_tools={parallel_tools}: {elapsed:.2f}s, tools={tools}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Benchmark for the Tier 2/Tier 3 normalization used by `preprocess_budget_data`.
+
+Run from the repository root:
+    python benchmarks/benchmark_tier_normalization.py --max-rows 10000000
+"""
+
+# Import Libraries
+import argparse
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.append("src")
+
+from helpers import (
+    normalize_tiers,
+    budget_tier_2_mapping,
+    budget_tier_3_mapping,
+    budget_tier_2_3_mapping,
+)
+
+
+def make_budget_frame(n_rows, seed=0):
+    # Tier values drawn from the mapping tables plus untouched values, with padding
+    rng = np.random.default_rng(seed)
+    tier_2_values = list(budget_tier_2_mapping) + [
+        k[0] for k in budget_tier_2_3_mapping
+    ]
+    tier_2_values += [f" {x} " for x in tier_2_values] + ["Ad Production"]
+    tier_3_values = list(budget_tier_3_mapping) + [
+        k[1] for k in budget_tier_2_3_mapping
+    ]
+    tier_3_values += [f"{x} " for x in tier_3_values] + ["Digital Ad Production"]
+    return pd.DataFrame(
+        {
+            "Tier 2": np.array(tier_2_values, dtype=object)[
+                rng.integers(0, len(tier_2_values), n_rows)
+            ],
+            "Tier 3": np.array(tier_3_values, dtype=object)[
+                rng.integers(0, len(tier_3_values), n_rows)
+            ],
+        }
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--max-rows", type=int, default=10_000_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    n_rows = 100_000
+    print(f"{'rows':>12} {'seconds':>10} {'ns/row':>10}")
+    while n_rows <= args.max_rows:
+        df = make_budget_frame(n_rows)
+        timings = []
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            normalize_tiers(
+                df.copy(),
+                tier_2_mapping=budget_tier_2_mapping,
+                tier_3_mapping=budget_tier_3_mapping,
+                tier_2_3_mapping=budget_tier_2_3_mapping,
+            )
+            timings.append(time.perf_counter() - start)
+        best = min(timings)
+        print(f"{n_rows:>12,} {best:>10.3f} {best / n_rows * 1e9:>10.1f}")
+        n_rows *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -8,7 +8,7 @@ from langchain.schema import HumanMessage
 from langgraph.graph.message import add_messages
 
 # Import files
-from .session_state_manager import init_session_state
+from .session_state_manager import init_session_state, create_agent
 
 init_session_state()
 from .ui_helpers import (
@@ -23,7 +23,8 @@ from .ui_helpers import (
     display_content_type_1,
     display_content_type_2,
 )
-from src.multi_agents import MultiAgentSystem, extract_content_within_tag
+from src.multi_agents import extract_content_within_tag
+from src.job_queue import start_job_queue
 
 text_color = "#E30A13"
 chat_container_css_styles = """
@@ -43,6 +44,352 @@ chat_container_css_styles = """
 default_supervisor_expanded = False
 default_insight_agent_expanded = False
 show_answer = False
+# Display names of the Insight Agent tools
+tool_names = {
+    "analyze_expense_data": "Expense Tool",
+    "analyze_budget_data": "Budget Tool",
+    "graph_merger_tool": "Graph Tool",
+    "analyze_expense_and_budget_data": "Expense & Budget Tools",
+    "analyze_budget_vs_actual": "Budget vs Actual Tool",
+}
+
+
+def render_message(message):
+    if message["role"] == "user":
+        with st.chat_message("user2", avatar=chat_avatars["User_ChatGPT"]):
+            display_content_type_1(
+                message["content"],
+                chat_avatars_color_bg["User_ChatGPT"],
+            )
+    elif message["role"] == "assistant":
+        if message["error_response"] == True:
+            with st.chat_message(
+                "assistant",
+                avatar=chat_avatars["Error"],
+            ):
+                display_content_type_1(
+                    message["content"],
+                    chat_avatars_color_bg["Error"],
+                )
+        else:
+            if message["agent"] == "supervisor":
+                with st.chat_message(
+                    "assistant",
+                    avatar=chat_avatars.get(
+                        "Supervisor_ChatGPT",
+                        chat_avatars["Assistant"],
+                    ),
+                ):
+                    # Expander settings
+                    supervisor_expanded = copy.deepcopy(default_supervisor_expanded)
+                    if message["result"]["type"] in [
+                        "direct_response",
+                        "no_direct_response",
+                        "tier_mapping_error",
+                    ]:
+                        supervisor_expanded = True
+                    with st.expander(
+                        "Supervisor Agent Response",
+                        expanded=supervisor_expanded,
+                    ):
+                        supervisor_content = ""
+                        if message["result"]["type"] == "agent":
+                            supervisor_content = (
+                                "<b>Thought Process:</b>&nbsp;&nbsp;"
+                                + str(message["result"]["result"]["thought_process"])
+                                + "<br><br><b>Enriched Question:</b>&nbsp;&nbsp;"
+                                + str(message["result"]["result"]["enriched_question"])
+                            )
+                        elif message["result"]["type"] == "direct_response":
+                            supervisor_content = (
+                                "<b>Thought Process:</b>&nbsp;&nbsp;"
+                                + str(message["result"]["result"]["thought_process"])
+                                + "<br><br><b>Direct Response:</b>&nbsp;&nbsp;"
+                                + str(message["result"]["messages"][0].content)
+                            )
+                        elif message["result"]["type"] == "no_direct_response":
+                            supervisor_content = (
+                                "<b>Thought Process:</b>&nbsp;&nbsp;"
+                                + str(message["result"]["result"]["thought_process"])
+                                + "<br><br><b>Thought Process/Response:</b>&nbsp;&nbsp;"
+                                + str(message["result"]["messages"][0].content)
+                            )
+                        elif message["result"]["type"] == "tier_mapping_error":
+                            supervisor_content = (
+                                "<b>Thought Process:</b>&nbsp;&nbsp;"
+                                + str(message["result"]["result"]["thought_process"])
+                                + "<br><br><b>Tier Mapping Error:</b>&nbsp;&nbsp;"
+                                + str(message["result"]["result"]["tier_mapping_error"])
+                            )
+
+                        # Supervisor will return a though process and enriched question
+                        display_content_type_1(
+                            supervisor_content,
+                            chat_avatars_color_bg.get(
+                                "Supervisor_ChatGPT",
+                                chat_avatars_color_bg["Assistant"],
+                            ),
+                            margin_bottom="1em",
+                        )
+            elif message["agent"] == "Insight Agent":
+                # Recorder steps
+                recorder_steps = message["result"].get("recorder_steps", [])
+                # Get the non-answer steps which have some oberservation within them
+                non_answer_steps = []
+                answer_step = None
+                for step in recorder_steps:
+                    # Observation is valid and the answer is not None or blank then proceed with showing the approach
+                    if step.get("observation"):
+                        non_answer_steps.append(step)
+                    else:
+                        answer_step = step
+
+                # Show the non-answer steps
+                if len(non_answer_steps) > 0:
+                    display_response = ""
+                    # Loop through the steps to put in one container
+                    for step in non_answer_steps:
+                        # Approach
+                        approach = step["observation"]["approach"]
+                        # Answer
+                        answer = step["observation"]["answer"]
+                        # Tool Used
+                        tool_used = tool_names.get(step["tool"], "N/A")
+                        if show_answer:
+                            if display_response == "":
+                                display_response = (
+                                    "<b>Approach:</b>&nbsp;&nbsp;"
+                                    + str(approach)
+                                    + "<br><br><b>Tool(s) Used:</b>&nbsp;&nbsp;"
+                                    + tool_used
+                                    + "<br><br><b>Answer:</b>&nbsp;&nbsp;"
+                                    + str(answer)
+                                )
+                            else:
+                                display_response = (
+                                    display_response
+                                    + "<hr>"
+                                    + "<b>Approach:</b>&nbsp;&nbsp;"
+                                    + str(approach)
+                                    + "<br><br><b>Tool(s) Used:</b>&nbsp;&nbsp;"
+                                    + tool_used
+                                    + "<br><br><b>Answer:</b>&nbsp;&nbsp;"
+                                    + str(answer)
+                                )
+                        else:
+                            if display_response == "":
+                                display_response = (
+                                    "<b>Approach:</b>&nbsp;&nbsp;"
+                                    + str(approach)
+                                    + "<br><br><b>Tool(s) Used:</b>&nbsp;&nbsp;"
+                                    + tool_used
+                                )
+                            else:
+                                display_response = (
+                                    display_response
+                                    + "<hr>"
+                                    + "<b>Approach:</b>&nbsp;&nbsp;"
+                                    + str(approach)
+                                    + "<br><br><b>Tool(s) Used:</b>&nbsp;&nbsp;"
+                                    + tool_used
+                                )
+                    # Display content
+                    with st.chat_message(
+                        "assistant",
+                        avatar=chat_avatars.get(
+                            "Insight_ChatGPT",
+                            chat_avatars["Assistant"],
+                        ),
+                    ):
+                        with st.expander(
+                            "Insight Agent Approach",
+                            expanded=default_insight_agent_expanded,
+                        ):
+                            display_content_type_1(
+                                display_response,
+                                chat_avatars_color_bg.get(
+                                    "Insight_Approach_ChatGPT",
+                                    chat_avatars_color_bg["Assistant"],
+                                ),
+                                margin_bottom="1em",
+                            )
+                # Show the answer step
+                if answer_step is not None:
+                    with st.chat_message(
+                        "assistant",
+                        avatar=chat_avatars.get(
+                            "Insight_ChatGPT",
+                            chat_avatars["Assistant"],
+                        ),
+                    ):
+                        answer_content = extract_content_within_tag(
+                            answer_step["final_answer"], "answer"
+                        )
+                        graph_content = extract_content_within_tag(
+                            answer_step["final_answer"], "graph"
+                        )
+                        # Split the graphs
+                        # Filter for applicable graph content
+                        filtered_graph_content = [
+                            g.strip()
+                            for g in graph_content.split("|")
+                            if ".json" in g.strip()
+                        ]
+                        if len(filtered_graph_content) == 0:
+                            display_content_type_1(
+                                "<b>Final Answer:</b><br>" + answer_content,
+                                chat_avatars_color_bg.get(
+                                    "Insight_Answer_ChatGPT",
+                                    chat_avatars_color_bg["Assistant"],
+                                ),
+                                margin_bottom="0em",
+                            )
+                        else:
+                            display_content_type_2(
+                                "<b>Final Answer:</b><br>" + answer_content,
+                                chat_avatars_color_bg.get(
+                                    "Insight_Answer_ChatGPT",
+                                    chat_avatars_color_bg["Assistant"],
+                                ),
+                                filtered_graph_content,
+                            )
+
+
+def get_step_update_text(update):
+    # Insight Agent tool step pushed by StepRecorder
+    step = update["step"]
+    if update["status"] == "started":
+        return f"Running **{tool_names.get(step['tool'], step['tool'])}**"
+    if update["status"] == "finished":
+        observation = step.get("observation")
+        approach = (
+            observation.get("approach") if isinstance(observation, dict) else None
+        )
+        return f"**{tool_names.get(step['tool'], step['tool'])}** done" + (
+            f": {approach}" if approach else ""
+        )
+    return "Writing the final answer..."
+
+
+def answer_started(events):
+    return any(
+        mode == "custom" and chunk["status"] == "token" for mode, chunk in events
+    )
+
+
+def run_bot_response(agent_obj, question, job):
+    """
+    Job function (runs on a job queue worker, not the script thread): run the workflow
+    graph (supervisor -> Insight Agent) in one pass, emitting every streamed
+    (mode, chunk) to the job. The run stops after the Insight Agent's answer, or
+    before the next LLM/tool call once the job is cancelled.
+    """
+    graph = agent_obj.graph.with_config(
+        configurable={"check_cancelled": job.check_cancelled}
+    )
+    for mode, chunk in graph.stream(
+        {"question": question}, stream_mode=["updates", "custom"]
+    ):
+        job.emit((mode, chunk))
+        if mode == "updates" and "Insight Agent" in chunk:
+            break
+
+
+def get_job_messages(job):
+    # Chat messages of the agent updates streamed so far by the job
+    messages = []
+    for mode, chunk in list(job.events):
+        if mode != "updates":
+            continue
+        for agent, result in chunk.items():
+            if agent == "Insight Agent":
+                result["next"] = "FINISH"
+            messages.append(
+                {
+                    "role": "assistant",
+                    "agent": agent,  # Agent answering the query
+                    "content": None,
+                    "result": result,
+                    "next": result["next"],
+                    "call_bot": False,
+                    "error_response": False,
+                }
+            )
+    if job.state in ("failed", "cancelled"):
+        content = (
+            f"Error in bot response. Restart the chat session.\nError traceback: {job.error}"
+            if job.state == "failed"
+            else "Response stopped."
+        )
+        messages.append(
+            {
+                "role": "assistant",
+                "agent": messages[-1]["next"] if messages else "supervisor",
+                "content": content,
+                "result": [],
+                "next": None,
+                "call_bot": False,
+                "error_response": True,
+            }
+        )
+    return messages
+
+
+@st.fragment(run_every=0.5)
+def render_job_progress():
+    """
+    Poll the session's running agent job: render its streamed messages and the live
+    tool steps, then move the messages to the chat history once the job finishes.
+    """
+    job = st.session_state["chat_job"]
+    if job is None:
+        return
+    if job.finished:
+        st.session_state.messages.extend(get_job_messages(job))
+        st.session_state["chat_job"] = None
+        st.rerun()
+    messages = get_job_messages(job)
+    for message in messages:
+        render_message(message)
+    # Steps of the agent currently running (after its last update)
+    events = list(job.events)
+    last_update = max(
+        [i for i, (mode, _) in enumerate(events) if mode == "updates"], default=-1
+    )
+    agent = "Insight" if messages else "Supervisor"
+    # Final answer streamed so far (tokens of <answer>, <graph> paths once complete)
+    answer_content, graphs = "", []
+    with st.chat_message(
+        "assistant",
+        avatar=chat_avatars.get(f"{agent}_ChatGPT", chat_avatars["Assistant"]),
+    ):
+        label = "Waiting in queue..." if job.state == "queued" else "Generating..."
+        with st.status(label, expanded=not answer_started(events[last_update + 1 :])):
+            for mode, chunk in events[last_update + 1 :]:
+                if mode != "custom":
+                    continue
+                if chunk["status"] == "token":
+                    answer_content += chunk["step"]["answer"]
+                elif chunk["status"] == "graphs":
+                    graphs = chunk["step"]["graphs"]
+                else:
+                    st.markdown(get_step_update_text(chunk))
+        if answer_content:
+            bg_color = chat_avatars_color_bg.get(
+                "Insight_Answer_ChatGPT", chat_avatars_color_bg["Assistant"]
+            )
+            if graphs:
+                display_content_type_2(
+                    "<b>Final Answer:</b><br>" + answer_content, bg_color, graphs
+                )
+            else:
+                display_content_type_1(
+                    "<b>Final Answer:</b><br>" + answer_content,
+                    bg_color,
+                    margin_bottom="0em",
+                )
+        if st.button("Stop", icon=":material/stop_circle:", key=f"stop_{job.job_id}"):
+            job.cancel()
 
 
 def render_chat_tab():
@@ -85,36 +432,25 @@ def render_chat_tab():
             # If chat button is hit
             if chat_button:
                 # Reset session
+                if st.session_state["chat_job"] is not None:
+                    st.session_state["chat_job"].cancel()
+                    st.session_state["chat_job"] = None
                 st.session_state["messages"] = []
                 st.session_state["show_chat_session"] = True
                 st.session_state["agent_obj"] = None
                 if st.session_state["use_backend_data"] == True:
-                    st.session_state["agent_obj"] = MultiAgentSystem(
-                        model_name=st.session_state["model_name"],
-                        api_key=st.session_state["open_ai_key"],
-                        expense_dataset=pd.DataFrame(
-                            st.session_state["backend_expense_data"]
-                        ),
-                        budget_dataset=pd.DataFrame(
-                            st.session_state["backend_budget_data"]
-                        ),
-                        plot_path=st.session_state["plot_path"],
+                    st.session_state["agent_obj"] = create_agent(
+                        st.session_state["backend_expense_data"],
+                        st.session_state["backend_budget_data"],
                     )
                 else:
                     if (
                         st.session_state["expense_data_file_name"]
                         and st.session_state["budget_data_file_name"]
                     ):
-                        st.session_state["agent_obj"] = MultiAgentSystem(
-                            model_name=st.session_state["model_name"],
-                            api_key=st.session_state["open_ai_key"],
-                            expense_dataset=pd.DataFrame(
-                                st.session_state["expense_data"]
-                            ),
-                            budget_dataset=pd.DataFrame(
-                                st.session_state["budget_data"]
-                            ),
-                            plot_path=st.session_state["plot_path"],
+                        st.session_state["agent_obj"] = create_agent(
+                            st.session_state["expense_data"],
+                            st.session_state["budget_data"],
                         )
     if st.session_state["agent_obj"]:
         # Chat session container
@@ -127,274 +463,9 @@ def render_chat_tab():
                 chat_container = st.container()
                 with chat_container:
                     for message in st.session_state["messages"]:
-                        if message["role"] == "user":
-                            with st.chat_message(
-                                "user2", avatar=chat_avatars["User_ChatGPT"]
-                            ):
-                                display_content_type_1(
-                                    message["content"],
-                                    chat_avatars_color_bg["User_ChatGPT"],
-                                )
-                        elif message["role"] == "assistant":
-                            if message["error_response"] == True:
-                                with st.chat_message(
-                                    "assistant",
-                                    avatar=chat_avatars["Error"],
-                                ):
-                                    display_content_type_1(
-                                        message["content"],
-                                        chat_avatars_color_bg["Error"],
-                                    )
-                            else:
-                                if message["agent"] == "supervisor":
-                                    with st.chat_message(
-                                        "assistant",
-                                        avatar=chat_avatars.get(
-                                            "Supervisor_ChatGPT",
-                                            chat_avatars["Assistant"],
-                                        ),
-                                    ):
-                                        # Expander settings
-                                        supervisor_expanded = copy.deepcopy(
-                                            default_supervisor_expanded
-                                        )
-                                        if message["result"]["type"] in [
-                                            "direct_response",
-                                            "no_direct_response",
-                                            "tier_mapping_error",
-                                        ]:
-                                            supervisor_expanded = True
-                                        with st.expander(
-                                            "Supervisor Agent Response",
-                                            expanded=supervisor_expanded,
-                                        ):
-                                            supervisor_content = ""
-                                            if message["result"]["type"] == "agent":
-                                                supervisor_content = (
-                                                    "<b>Thought Process:</b>&nbsp;&nbsp;"
-                                                    + str(
-                                                        message["result"]["result"][
-                                                            "thought_process"
-                                                        ]
-                                                    )
-                                                    + "<br><br><b>Enriched Question:</b>&nbsp;&nbsp;"
-                                                    + str(
-                                                        message["result"]["result"][
-                                                            "enriched_question"
-                                                        ]
-                                                    )
-                                                )
-                                            elif (
-                                                message["result"]["type"]
-                                                == "direct_response"
-                                            ):
-                                                supervisor_content = (
-                                                    "<b>Thought Process:</b>&nbsp;&nbsp;"
-                                                    + str(
-                                                        message["result"]["result"][
-                                                            "thought_process"
-                                                        ]
-                                                    )
-                                                    + "<br><br><b>Direct Response:</b>&nbsp;&nbsp;"
-                                                    + str(
-                                                        message["result"]["messages"][
-                                                            0
-                                                        ].content
-                                                    )
-                                                )
-                                            elif (
-                                                message["result"]["type"]
-                                                == "no_direct_response"
-                                            ):
-                                                supervisor_content = (
-                                                    "<b>Thought Process:</b>&nbsp;&nbsp;"
-                                                    + str(
-                                                        message["result"]["result"][
-                                                            "thought_process"
-                                                        ]
-                                                    )
-                                                    + "<br><br><b>Thought Process/Response:</b>&nbsp;&nbsp;"
-                                                    + str(
-                                                        message["result"]["messages"][
-                                                            0
-                                                        ].content
-                                                    )
-                                                )
-                                            elif (
-                                                message["result"]["type"]
-                                                == "tier_mapping_error"
-                                            ):
-                                                supervisor_content = (
-                                                    "<b>Thought Process:</b>&nbsp;&nbsp;"
-                                                    + str(
-                                                        message["result"]["result"][
-                                                            "thought_process"
-                                                        ]
-                                                    )
-                                                    + "<br><br><b>Tier Mapping Error:</b>&nbsp;&nbsp;"
-                                                    + str(
-                                                        message["result"]["result"][
-                                                            "tier_mapping_error"
-                                                        ]
-                                                    )
-                                                )
-
-                                            # Supervisor will return a though process and enriched question
-                                            display_content_type_1(
-                                                supervisor_content,
-                                                chat_avatars_color_bg.get(
-                                                    "Supervisor_ChatGPT",
-                                                    chat_avatars_color_bg["Assistant"],
-                                                ),
-                                                margin_bottom="1em",
-                                            )
-                                elif message["agent"] == "Insight Agent":
-                                    # Recorder steps
-                                    recorder_steps = message["result"].get(
-                                        "recorder_steps", []
-                                    )
-                                    # Get the non-answer steps which have some oberservation within them
-                                    non_answer_steps = []
-                                    answer_step = None
-                                    for step in recorder_steps:
-                                        # Observation is valid and the answer is not None or blank then proceed with showing the approach
-                                        if step.get("observation"):
-                                            non_answer_steps.append(step)
-                                        else:
-                                            answer_step = step
-
-                                    # Show the non-answer steps
-                                    if len(non_answer_steps) > 0:
-                                        display_response = ""
-                                        # Loop through the steps to put in one container
-                                        for step in non_answer_steps:
-                                            # Approach
-                                            approach = step["observation"]["approach"]
-                                            # Answer
-                                            answer = step["observation"]["answer"]
-                                            # Tool Used
-                                            tool_used = (
-                                                "Expense Tool"
-                                                if step["tool"]
-                                                == "analyze_expense_data"
-                                                else (
-                                                    "Budget Tool"
-                                                    if step["tool"]
-                                                    == "analyze_budget_data"
-                                                    else (
-                                                        "Graph Tool"
-                                                        if step["tool"]
-                                                        == "graph_merger_tool"
-                                                        else "N/A"
-                                                    )
-                                                )
-                                            )
-                                            if show_answer:
-                                                if display_response == "":
-                                                    display_response = (
-                                                        "<b>Approach:</b>&nbsp;&nbsp;"
-                                                        + str(approach)
-                                                        + "<br><br><b>Tool(s) Used:</b>&nbsp;&nbsp;"
-                                                        + tool_used
-                                                        + "<br><br><b>Answer:</b>&nbsp;&nbsp;"
-                                                        + str(answer)
-                                                    )
-                                                else:
-                                                    display_response = (
-                                                        display_response
-                                                        + "<hr>"
-                                                        + "<b>Approach:</b>&nbsp;&nbsp;"
-                                                        + str(approach)
-                                                        + "<br><br><b>Tool(s) Used:</b>&nbsp;&nbsp;"
-                                                        + tool_used
-                                                        + "<br><br><b>Answer:</b>&nbsp;&nbsp;"
-                                                        + str(answer)
-                                                    )
-                                            else:
-                                                if display_response == "":
-                                                    display_response = (
-                                                        "<b>Approach:</b>&nbsp;&nbsp;"
-                                                        + str(approach)
-                                                        + "<br><br><b>Tool(s) Used:</b>&nbsp;&nbsp;"
-                                                        + tool_used
-                                                    )
-                                                else:
-                                                    display_response = (
-                                                        display_response
-                                                        + "<hr>"
-                                                        + "<b>Approach:</b>&nbsp;&nbsp;"
-                                                        + str(approach)
-                                                        + "<br><br><b>Tool(s) Used:</b>&nbsp;&nbsp;"
-                                                        + tool_used
-                                                    )
-                                        # Display content
-                                        with st.chat_message(
-                                            "assistant",
-                                            avatar=chat_avatars.get(
-                                                "Insight_ChatGPT",
-                                                chat_avatars["Assistant"],
-                                            ),
-                                        ):
-                                            with st.expander(
-                                                "Insight Agent Approach",
-                                                expanded=default_insight_agent_expanded,
-                                            ):
-                                                display_content_type_1(
-                                                    display_response,
-                                                    chat_avatars_color_bg.get(
-                                                        "Insight_Approach_ChatGPT",
-                                                        chat_avatars_color_bg[
-                                                            "Assistant"
-                                                        ],
-                                                    ),
-                                                    margin_bottom="1em",
-                                                )
-                                    # Show the answer step
-                                    if answer_step is not None:
-                                        with st.chat_message(
-                                            "assistant",
-                                            avatar=chat_avatars.get(
-                                                "Insight_ChatGPT",
-                                                chat_avatars["Assistant"],
-                                            ),
-                                        ):
-                                            answer_content = extract_content_within_tag(
-                                                answer_step["final_answer"], "answer"
-                                            )
-                                            graph_content = extract_content_within_tag(
-                                                answer_step["final_answer"], "graph"
-                                            )
-                                            # Split the graphs
-                                            # Filter for applicable graph content
-                                            filtered_graph_content = [
-                                                g.strip()
-                                                for g in graph_content.split("|")
-                                                if ".json" in g.strip()
-                                            ]
-                                            if len(filtered_graph_content) == 0:
-                                                display_content_type_1(
-                                                    "<b>Final Answer:</b><br>"
-                                                    + answer_content,
-                                                    chat_avatars_color_bg.get(
-                                                        "Insight_Answer_ChatGPT",
-                                                        chat_avatars_color_bg[
-                                                            "Assistant"
-                                                        ],
-                                                    ),
-                                                    margin_bottom="0em",
-                                                )
-                                            else:
-                                                display_content_type_2(
-                                                    "<b>Final Answer:</b><br>"
-                                                    + answer_content,
-                                                    chat_avatars_color_bg.get(
-                                                        "Insight_Answer_ChatGPT",
-                                                        chat_avatars_color_bg[
-                                                            "Assistant"
-                                                        ],
-                                                    ),
-                                                    filtered_graph_content,
-                                                )
+                        render_message(message)
+                    # Agent run in progress (polled, the script thread only renders)
+                    render_job_progress()
                     st.markdown("")
 
             chat_query_container_css_styles = """
@@ -413,122 +484,35 @@ def render_chat_tab():
                 css_styles=chat_query_container_css_styles,
             ):
                 # --- Chat input ---
-                if prompt := st.chat_input(
-                    "I'm your assistant. Ask me whenever you're ready!"
-                ):
-
-                    # 1️⃣ Show user message immediately
-                    st.session_state.messages.append(
-                        {
-                            "role": "user",
-                            "agent": "User",
-                            "content": prompt,
-                            "result": [],
-                            "next": "supervisor",
-                            "call_bot": True,
-                            "error_response": False,
-                        }
-                    )
-                    st.rerun()  # Refresh UI so user message appears instantly
-
-            # 2️⃣ After rerun, detect if last message is user and reply is missing
-            # Previous query must be user query
-            if (
-                st.session_state.messages
-                and st.session_state.messages[-1]["call_bot"] == True
-                and st.session_state.messages[-1]["error_response"] == False
-            ):
-                previous_message_dict = st.session_state.messages[-1]
-
-                # Get response from Bot
-                with chat_container:
-                    avatar_icon = chat_avatars["Assistant"]
-                    if previous_message_dict["next"] == "supervisor":
-                        avatar_icon = chat_avatars["Supervisor_ChatGPT"]
-                    elif previous_message_dict["next"] == "Insight Agent":
-                        avatar_icon = chat_avatars["Insight_ChatGPT"]
-                    with st.chat_message(
-                        "assistant",
-                        avatar=avatar_icon,
-                    ):
-                        with st.spinner("Generating..."):
-                            try:
-                                if previous_message_dict["next"] == "supervisor":
-                                    result = (
-                                        st.session_state["agent_obj"]
-                                        .graph.nodes[previous_message_dict["next"]]
-                                        .invoke(
-                                            {
-                                                "question": previous_message_dict[
-                                                    "content"
-                                                ]
-                                            }
-                                        )
-                                    )
-                                elif previous_message_dict["next"] == "Insight Agent":
-                                    result = (
-                                        st.session_state["agent_obj"]
-                                        .graph.nodes[previous_message_dict["next"]]
-                                        .invoke(
-                                            {
-                                                "enriched_question": previous_message_dict[
-                                                    "result"
-                                                ][
-                                                    "result"
-                                                ][
-                                                    "enriched_question"
-                                                ]
-                                            }
-                                        )
-                                    )
-                                    result["next"] = "FINISH"
-                            except Exception as e:
-                                # Add the message
-                                st.session_state.messages.append(
-                                    {
-                                        "role": "assistant",
-                                        "agent": previous_message_dict[
-                                            "next"
-                                        ],  # Agent answering the query
-                                        "content": f"Error in bot response. Restart the chat session.\nError traceback: {e}",
-                                        "result": [],
-                                        "next": None,
-                                        "call_bot": False,
-                                        "error_response": True,
-                                    }
-                                )
-                                st.rerun()
-                # Check if last previous messages are from bot (Not more than 10 responses must be from bot)
-                reversed_messages = st.session_state.messages[::-1]
-                # Base case
-                current = reversed_messages[0]
-                i = 1
-                counter = 0
-                while i < len(reversed_messages):
-                    if current == reversed_messages[i]:
-                        counter += 1
-                        i += 1
-                    else:
-                        break
+                prompt = st.chat_input(
+                    "I'm your assistant. Ask me whenever you're ready!",
+                    disabled=st.session_state["chat_job"] is not None,
+                )
 
-                # Add the message
+            if prompt:
+                # Show user message, then run the agents on the job queue
                 st.session_state.messages.append(
                     {
-                        "role": "assistant",
-                        "agent": previous_message_dict[
-                            "next"
-                        ],  # Agent answering the query
-                        "content": None,
-                        "result": result,
-                        "next": result["next"],
-                        "call_bot": (
-                            True
-                            if (result["next"] != "FINISH" and counter < 10)
-                            else False
-                        ),
+                        "role": "user",
+                        "agent": "User",
+                        "content": prompt,
+                        "result": [],
+                        "next": "supervisor",
+                        "call_bot": True,
                         "error_response": False,
                     }
                 )
-                st.rerun()
+                agent_obj = st.session_state["agent_obj"]
+                try:
+                    st.session_state["chat_job"] = start_job_queue().submit(
+                        st.session_state["session_id"],
+                        lambda job: run_bot_response(agent_obj, prompt, job),
+                    )
+                except RuntimeError as e:
+                    # Session already has a question in progress
+                    st.session_state.messages.pop()
+                    st.warning(str(e))
+                else:
+                    st.rerun()
     else:
         warning_box("Agent not available!")
@@ -1,3 +1,4 @@
+import io
 import streamlit as st
 import pandas as pd
 from PIL import Image
@@ -16,12 +17,75 @@ from .ui_helpers import (
     success_box,
     error_box,
 )
-from src.helpers import preprocess_expense_data, preprocess_budget_data
+from src.dataset_registry import registry
+from src.data_cache import load_preprocessed_dataset, upload_handle
 
 text_color = "#E30A13"
 horizontal_line_color = "#E30A13"
 
 
+def submit_uploaded_file(kind, uploaded_file):
+    """
+    Submit an uploaded file for background ingestion, once per upload: the handle is
+    memoised in the session by the uploader's file id, so reruns do not re-read or
+    re-hash the file. Identical content is ingested once per server process.
+    """
+    upload = st.session_state[f"{kind}_upload"]
+    if upload is None or upload["file_id"] != uploaded_file.file_id:
+        file_bytes = uploaded_file.getvalue()
+        file_name = uploaded_file.name
+        handle = registry.submit_upload(
+            kind,
+            file_bytes,
+            file_name,
+            lambda content_hash, progress: load_preprocessed_dataset(
+                kind,
+                io.BytesIO(file_bytes),
+                file_name=file_name,
+                content_hash=content_hash,
+                progress=progress,
+                cube_key=upload_handle(kind, content_hash),
+            ),
+        )
+        upload = {"file_id": uploaded_file.file_id, "handle": handle}
+        st.session_state[f"{kind}_upload"] = upload
+    return upload["handle"]
+
+
+def use_uploaded_dataset(kind, status):
+    # Point the session at the ingested dataset
+    if st.session_state[f"{kind}_data"] != status["handle"]:
+        st.session_state[f"{kind}_data"] = status["handle"]
+        st.session_state[f"{kind}_data_file_name"] = status["file_name"]
+
+
+@st.fragment(run_every=0.5)
+def poll_ingestion_status(kind, handle):
+    # Re-runs on its own until the ingestion finishes, then reruns the whole app
+    status = registry.ingestion_status(handle)
+    if status is not None and status["state"] == "done":
+        use_uploaded_dataset(kind, status)
+    if status is None or status["state"] in ("done", "failed"):
+        st.rerun()
+    st.progress(status["progress"], text=f"Loading {status['file_name']}")
+
+
+def render_ingestion_status(kind, handle):
+    status = registry.ingestion_status(handle)
+    if status is not None and status["state"] == "done":
+        use_uploaded_dataset(kind, status)
+        message = "All required columns are present. Proceed to 'Chat Sessions' tab!"
+        success_box(message)
+    elif status is None or status["state"] == "failed":
+        message = f"Error in file loading/pre-processing"
+        # e.g. the missing required columns
+        if status is not None and status["error"]:
+            message = f"{message}: {status['error']}"
+        error_box(message)
+    else:
+        poll_ingestion_status(kind, handle)
+
+
 def render_home():
     with stylable_container(
         key="home_title",
@@ -89,20 +153,9 @@ def render_home():
                 if (expense_file_name.endswith(".csv")) or (
                     expense_file_name.endswith((".xlsx", ".xls"))
                 ):
-                    if expense_file_name.endswith(".csv"):
-                        df_expenses = pd.read_csv(expense_uploaded_file)
-                    else:
-                        df_expenses = pd.read_excel(expense_uploaded_file)
-                    # Load file
-                    df_expenses = preprocess_expense_data(
-                        file_path=None, df_expenses=df_expenses
-                    )
-                    st.session_state["expense_data"] = df_expenses.to_dict("records")
-                    st.session_state["expense_data_file_name"] = (
-                        expense_uploaded_file.name
-                    )
-                    message = "All required columns are present. Proceed to 'Chat Sessions' tab!"
-                    success_box(message)
+                    # Ingested in the background, once per distinct file content
+                    handle = submit_uploaded_file("expense", expense_uploaded_file)
+                    render_ingestion_status("expense", handle)
                 else:
                     message = f"Invalid File Type"
                     error_box(message)
@@ -121,20 +174,9 @@ def render_home():
                 if (budget_file_name.endswith(".csv")) or (
                     budget_file_name.endswith((".xlsx", ".xls"))
                 ):
-                    if budget_file_name.endswith(".csv"):
-                        df_budget = pd.read_csv(budget_uploaded_file)
-                    else:
-                        df_budget = pd.read_excel(budget_uploaded_file)
-                    # Load file
-                    df_budget = preprocess_budget_data(
-                        file_path=None, df_budget=df_budget
-                    )
-                    st.session_state["budget_data"] = df_budget.to_dict("records")
-                    st.session_state["budget_data_file_name"] = (
-                        budget_uploaded_file.name
-                    )
-                    message = "All required columns are present. Proceed to 'Chat Sessions' tab!"
-                    success_box(message)
+                    # Ingested in the background, once per distinct file content
+                    handle = submit_uploaded_file("budget", budget_uploaded_file)
+                    render_ingestion_status("budget", handle)
                 else:
                     message = f"Invalid File Type"
                     error_box(message)
@@ -6,22 +6,61 @@ import pickle
 import sys
 from datetime import datetime
 import pandas as pd
+import uuid
 
-from src.helpers import preprocess_expense_data, preprocess_budget_data
+from src.dataset_registry import registry
+from src.sandbox import start_sandbox_pool
+from src.job_queue import start_job_queue
+from src.multi_agents import MultiAgentSystem
+from .ui_helpers import warning_box
 
 
 def init_session_state():
     # Session state
     if "backend_expense_data" not in st.session_state:
-        df_expenses = preprocess_expense_data(f"src/data/Expenses_RB.csv")
-        st.session_state["backend_expense_data"] = df_expenses.to_dict("records")
+        # Loaded once per server process and shared by all sessions
+        st.session_state["backend_expense_data"] = registry.register_file(
+            "expense", "src/data/Expenses_RB.csv", pinned=True
+        )
     if "backend_budget_data" not in st.session_state:
-        df_budget = preprocess_budget_data(f"src/data/Budget_RB.csv")
-        st.session_state["backend_budget_data"] = df_budget.to_dict("records")
+        st.session_state["backend_budget_data"] = registry.register_file(
+            "budget", "src/data/Budget_RB.csv", pinned=True
+        )
+    # Sandbox for generated code (once per process). The Streamlit server already runs
+    # threads, so its workers come from a forkserver and get the backend datasets when
+    # they start. Budgets come from the optional `sandbox` section of config.yaml
+    # (wall_seconds, cpu_seconds, memory_mb, n_workers)
+    if "sandbox_started" not in st.session_state:
+        with open("config.yaml", "r") as f:
+            sandbox_config = (yaml.safe_load(f) or {}).get("sandbox") or {}
+        start_sandbox_pool(
+            datasets=[
+                registry.get(st.session_state["backend_expense_data"]),
+                registry.get(st.session_state["backend_budget_data"]),
+            ],
+            **sandbox_config,
+        )
+        st.session_state["sandbox_started"] = True
+    # Background workers running the agents (once per process). Sized from the
+    # optional `job_queue` section of config.yaml (n_workers, max_pending_per_session)
+    if "session_id" not in st.session_state:
+        with open("config.yaml", "r") as f:
+            job_queue_config = (yaml.safe_load(f) or {}).get("job_queue") or {}
+        start_job_queue(**job_queue_config)
+        st.session_state["session_id"] = uuid.uuid4().hex
+    # Running agent job of the chat session (see src/job_queue.py)
+    if "chat_job" not in st.session_state:
+        st.session_state["chat_job"] = None
+    # Dataset handles (see src/dataset_registry.py)
     if "expense_data" not in st.session_state:
-        st.session_state["expense_data"] = []
+        st.session_state["expense_data"] = None
     if "budget_data" not in st.session_state:
-        st.session_state["budget_data"] = []
+        st.session_state["budget_data"] = None
+    # Uploader file id -> handle of the submitted upload (see home_tab.py)
+    if "expense_upload" not in st.session_state:
+        st.session_state["expense_upload"] = None
+    if "budget_upload" not in st.session_state:
+        st.session_state["budget_upload"] = None
     if "expense_data_file_name" not in st.session_state:
         st.session_state["expense_data_file_name"] = None
     if "budget_data_file_name" not in st.session_state:
@@ -36,6 +75,8 @@ def init_session_state():
         st.session_state["use_backend_data"] = True
     if "model_name" not in st.session_state:
         st.session_state["model_name"] = "gpt-4o"
+    if "parallel_tools" not in st.session_state:
+        st.session_state["parallel_tools"] = True
     if "plot_path" not in st.session_state:
         st.session_state["plot_path"] = "src/streamlit_plots"
     # Open AI key
@@ -45,3 +86,31 @@ def init_session_state():
         if llm_keys["open_ai"].strip() != "":
             os.environ["OPENAI_API_KEY"] = llm_keys["open_ai"]
         st.session_state["open_ai_key"] = llm_keys["open_ai"]
+
+
+def create_agent(expense_handle, budget_handle):
+    """
+    MultiAgentSystem over the registered datasets of the handles, or None when one of
+    them is gone (uploads are evicted from the registry once unused): the upload
+    is then forgotten by the session so that the Home tab ingests it again.
+    """
+    expense_dataset = registry.get(expense_handle)
+    budget_dataset = registry.get(budget_handle)
+    if expense_dataset is None or budget_dataset is None:
+        for kind in ("expense", "budget"):
+            st.session_state[f"{kind}_upload"] = None
+            st.session_state[f"{kind}_data"] = None
+            st.session_state[f"{kind}_data_file_name"] = None
+        warning_box(
+            "The uploaded datasets are no longer available, please re-upload them "
+            "on the Home tab."
+        )
+        return None
+    return MultiAgentSystem(
+        model_name=st.session_state["model_name"],
+        api_key=st.session_state["open_ai_key"],
+        expense_dataset=expense_dataset,
+        budget_dataset=budget_dataset,
+        plot_path=st.session_state["plot_path"],
+        parallel_tools=st.session_state["parallel_tools"],
+    )
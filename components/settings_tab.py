@@ -23,10 +23,16 @@ def render_settings_tab():
                 st.session_state["model_name"]
             ),
         )
+        st.write("")
+        parallel_tools = st.toggle(
+            "Run Expense and Budget tools in parallel",
+            value=st.session_state["parallel_tools"],
+        )
         st.markdown("")
         _, c1 = st.columns([0.92, 0.08])
         with c1:
             if st.button("Submit"):
                 st.session_state["model_name"] = model_name
                 st.session_state["open_ai_key"] = api_key
+                st.session_state["parallel_tools"] = parallel_tools
         st.write("")
@@ -0,0 +1,265 @@
+"""
+Headless HTTP service around MultiAgentSystem, for clients other than the Streamlit UI.
+
+Endpoints:
+    POST /sessions                 -> {"session_id": ...}
+    POST /sessions/{id}/ask        -> newline delimited JSON events, streamed as the
+                                      supervisor and Insight Agent run
+    GET  /sessions/{id}/history    -> questions and answers of the session
+
+The datasets are loaded once and shared (with the response/prompt caches) by all
+sessions. Each session answers one question at a time.
+"""
+
+# Steps to run the service
+# python server.py --port 8000
+# python server.py --fake-llm --fake-latency 0.5 --expense-file <csv>  (load testing)
+
+# Import Libraries
+import warnings
+
+warnings.filterwarnings("ignore")
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+import uuid
+from collections import OrderedDict
+
+import uvicorn
+import yaml
+from fastapi import FastAPI, HTTPException
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel
+
+sys.path.append("src")
+
+from dataset_registry import registry
+from helpers import enable_copy_on_write
+from multi_agents import MultiAgentSystem, extract_content_within_tag
+from sandbox import start_sandbox_pool
+from response_cache import ResponseCache
+
+
+class SessionRequest(BaseModel):
+    model_name: str = "gpt-4o"
+    parallel_tools: bool = True
+
+
+class AskRequest(BaseModel):
+    question: str
+
+
+class Session:
+    def __init__(self, agent_obj):
+        self.agent_obj = agent_obj
+        self.history = []
+        # The agents' memories are per session, one question at a time
+        self.lock = asyncio.Lock()
+        self.last_used = time.time()
+
+
+def to_event(agent, result):
+    """JSON friendly event of a graph node update."""
+    if agent == "supervisor":
+        return {
+            "type": "supervisor",
+            "route": result["type"],
+            "next": result["next"],
+            "thought_process": result["result"].get("thought_process"),
+            "enriched_question": result["result"].get("enriched_question"),
+            "message": result["messages"][0].content,
+        }
+    final_answer = result.get("output") or result.get("final_answer", "")
+    graph_content = extract_content_within_tag(final_answer, "graph")
+    return {
+        "type": "insight",
+        "answer": extract_content_within_tag(final_answer, "answer"),
+        "graphs": [g.strip() for g in graph_content.split("|") if ".json" in g],
+        "steps": [
+            {
+                "tool": step.get("tool"),
+                "tool_input": step.get("tool_input"),
+                "observation": step.get("observation"),
+            }
+            for step in result.get("recorder_steps", [])
+            if "tool" in step
+        ],
+    }
+
+
+def to_step_event(update):
+    step = update["step"]
+    # Final answer streamed token by token, graph paths once complete
+    if update["status"] == "token":
+        return {"type": "token", "answer": step["answer"]}
+    if update["status"] == "graphs":
+        return {"type": "graphs", "graphs": step["graphs"]}
+    return {
+        "type": "step",
+        "status": update["status"],
+        "tool": step.get("tool"),
+        "observation": step.get("observation"),
+    }
+
+
+def create_app(
+    expense_dataset,
+    budget_dataset,
+    api_key,
+    plot_path,
+    llm=None,
+    model_name=None,
+    response_cache=None,
+    max_sessions=1000,
+):
+    """
+    `llm`, `model_name` and `response_cache` override the per-session model (e.g.
+    FakeChatModel, its own model name and a private cache for load tests).
+    """
+    app = FastAPI(title="LIFT Bot")
+    sessions = OrderedDict()
+
+    @app.post("/sessions")
+    async def create_session(request: SessionRequest):
+        # Prompt/dataset preparation is blocking, keep it off the event loop
+        agent_obj = await run_in_threadpool(
+            MultiAgentSystem,
+            model_name=model_name or request.model_name,
+            api_key=api_key,
+            expense_dataset=registry.get(expense_dataset),
+            budget_dataset=registry.get(budget_dataset),
+            plot_path=plot_path,
+            parallel_tools=request.parallel_tools,
+            llm=llm,
+            response_cache=response_cache,
+        )
+        session_id = uuid.uuid4().hex
+        sessions[session_id] = Session(agent_obj)
+        # Least recently used sessions go first
+        while len(sessions) > max_sessions:
+            sessions.popitem(last=False)
+        return {"session_id": session_id}
+
+    def get_session(session_id):
+        session = sessions.get(session_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Unknown session")
+        sessions.move_to_end(session_id)
+        session.last_used = time.time()
+        return session
+
+    @app.post("/sessions/{session_id}/ask")
+    async def ask(session_id: str, request: AskRequest):
+        session = get_session(session_id)
+        if session.lock.locked():
+            raise HTTPException(
+                status_code=409, detail="The session is answering another question"
+            )
+
+        async def stream_events():
+            # The lock is taken here (not in `ask`) so that a client disconnecting
+            # before the stream starts cannot leave the session locked
+            if session.lock.locked():
+                message = "The session is answering another question"
+                yield json.dumps({"type": "error", "message": message}) + "\n"
+                return
+            await session.lock.acquire()
+            turn = {"question": request.question, "events": [], "seconds": None}
+            start = time.perf_counter()
+            try:
+                # Same flow as the chat tab: stop after the Insight Agent's answer
+                async for mode, chunk in session.agent_obj.graph.astream(
+                    {"question": request.question}, stream_mode=["updates", "custom"]
+                ):
+                    if mode == "custom":
+                        event = to_step_event(chunk)
+                        yield json.dumps(event, default=str) + "\n"
+                        continue
+                    for agent, result in chunk.items():
+                        event = to_event(agent, result)
+                        turn["events"].append(event)
+                        yield json.dumps(event, default=str) + "\n"
+                    if "Insight Agent" in chunk:
+                        break
+            except Exception as e:
+                event = {"type": "error", "message": str(e)}
+                turn["events"].append(event)
+                yield json.dumps(event) + "\n"
+            finally:
+                turn["seconds"] = time.perf_counter() - start
+                session.history.append(turn)
+                session.lock.release()
+            yield json.dumps({"type": "done", "seconds": turn["seconds"]}) + "\n"
+
+        return StreamingResponse(stream_events(), media_type="application/x-ndjson")
+
+    @app.get("/sessions/{session_id}/history")
+    async def history(session_id: str):
+        session = get_session(session_id)
+        return json.loads(json.dumps({"history": session.history}, default=str))
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--expense-file", default="src/data/Expenses_RB.csv")
+    parser.add_argument("--budget-file", default="src/data/Budget_RB.csv")
+    parser.add_argument("--plot-path", default="src/api_plots")
+    parser.add_argument("--max-sessions", type=int, default=1000)
+    parser.add_argument(
+        "--fake-llm",
+        action="store_true",
+        help="Answer with FakeChatModel (no API key needed, for load testing)",
+    )
+    parser.add_argument("--fake-latency", type=float, default=0.5)
+    args = parser.parse_args()
+    # Executions work on copy-on-write views of the shared datasets
+    enable_copy_on_write()
+
+    # Open AI key
+    with open("config.yaml", "r") as f:
+        config = yaml.safe_load(f) or {}
+    api_key = config.get("open_ai") or os.environ.get("OPENAI_API_KEY")
+    llm = None
+    model_name = None
+    response_cache = None
+    if args.fake_llm:
+        from fake_llm import FakeChatModel
+
+        llm = FakeChatModel(latency=args.fake_latency)
+        # Canned responses must never be replayed to real models: own model name and
+        # an in-memory response cache instead of the shared one on disk
+        model_name = "fake"
+        response_cache = ResponseCache(":memory:")
+
+    # Datasets are loaded once and shared by every session
+    expense_dataset = registry.register_file("expense", args.expense_file, pinned=True)
+    budget_dataset = registry.register_file("budget", args.budget_file, pinned=True)
+    # Sandbox workers are forked before the server starts any threads
+    start_sandbox_pool(
+        datasets=[registry.get(expense_dataset), registry.get(budget_dataset)],
+        fork=True,
+        **(config.get("sandbox") or {}),
+    )
+    app = create_app(
+        expense_dataset,
+        budget_dataset,
+        api_key,
+        args.plot_path,
+        llm=llm,
+        model_name=model_name,
+        response_cache=response_cache,
+        max_sessions=args.max_sessions,
+    )
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+# Import Libraries
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# Dimension columns of the cube (the ones present in the dataset are used)
+cube_dimensions = [
+    "Region",
+    "Country",
+    "Category",
+    "Brand",
+    "Year",
+    "Month",
+    "Tier 1",
+    "Tier 2",
+    "Tier 3",
+    "Expense Status",
+    "Expense Logged by",
+]
+# Ratio columns (e.g. of the budget vs actual dataset): their sums are meaningless
+non_additive_measures = ["Variance %", "Utilization %"]
+
+
+class AggregateCube:
+    """
+    Pre-aggregated sums of the measure columns of a dataset over its dimension columns.
+    The base table holds one row per distinct combination of dimension values (plus the
+    number of source rows), so slice/dice questions are answered from it instead of
+    scanning the full dataset. Only additive measures are aggregated. Rollups without
+    filters are memoised.
+    """
+
+    def __init__(self, df, dimensions=None, measures=None):
+        self.dimensions = [
+            c for c in (dimensions or cube_dimensions) if c in df.columns
+        ]
+        self.measures = measures or [
+            c
+            for c in df.select_dtypes("number").columns
+            if c not in self.dimensions and c not in non_additive_measures
+        ]
+        self.base = self.aggregate(df)
+        self._rollups = OrderedDict()
+        self._lock = threading.Lock()
+
+    def aggregate(self, df):
+        grouped = df.groupby(self.dimensions, dropna=False, observed=True, sort=False)
+        base = grouped[self.measures].sum()
+        base["Rows"] = grouped.size()
+        return base.reset_index()
+
+    def update(self, df):
+        """Fold new rows of the dataset (e.g. an appended upload) into the cube."""
+        combined = pd.concat([self.base, self.aggregate(df)], ignore_index=True)
+        base = (
+            combined.groupby(self.dimensions, dropna=False, observed=True, sort=False)[
+                self.measures + ["Rows"]
+            ]
+            .sum()
+            .reset_index()
+        )
+        with self._lock:
+            self.base = base
+            self._rollups.clear()
+
+    def query(self, by=(), filters=None, measures=None):
+        """
+        Sum of `measures` (default: all, plus "Rows") grouped by the `by` dimensions over
+        the rows matching `filters` ({dimension: value or list of values}, strings are
+        matched ignoring case and surrounding spaces). Same result as
+        df[mask].groupby(by)[measures].sum() on the dataset. Returns a DataFrame, or a
+        Series of totals when `by` is empty.
+        """
+        by = [by] if isinstance(by, str) else list(by)
+        filters = filters or {}
+        measures = (
+            [measures] if isinstance(measures, str) else measures
+        ) or self.measures + ["Rows"]
+        unknown = [d for d in list(by) + list(filters) if d not in self.dimensions]
+        if unknown:
+            raise KeyError(
+                f"{unknown} are not cube dimensions, available: {self.dimensions}"
+            )
+        key = (tuple(by), tuple(measures))
+        if not filters:
+            with self._lock:
+                if key in self._rollups:
+                    self._rollups.move_to_end(key)
+                    return self._rollups[key].copy(deep=False)
+
+        base = self.base
+        if filters:
+            mask = pd.Series(True, index=base.index)
+            for dimension, values in filters.items():
+                mask &= self.match(base[dimension], values)
+            base = base[mask]
+        if by:
+            result = base.groupby(by, observed=True)[measures].sum().reset_index()
+        else:
+            result = base[measures].sum()
+
+        if not filters:
+            with self._lock:
+                self._rollups[key] = result
+                while len(self._rollups) > 64:
+                    self._rollups.popitem(last=False)
+        return result.copy(deep=False)
+
+    @staticmethod
+    def match(column, values):
+        if not isinstance(values, (list, tuple, set)):
+            values = [values]
+        if any(isinstance(v, str) for v in values):
+            normalized = {str(v).strip().casefold() for v in values}
+            return column.astype(str).str.strip().str.casefold().isin(normalized)
+        return column.isin(values)
+
+
+# Cubes of the loaded datasets, keyed by dataset fingerprint
+cube_cache = OrderedDict()
+cube_cache_size = 16
+cube_cache_lock = threading.Lock()
+
+
+def get_cube(df, key):
+    """Return the AggregateCube of `df` (cached under `key`, its fingerprint)."""
+    with cube_cache_lock:
+        if key in cube_cache:
+            cube_cache.move_to_end(key)
+            return cube_cache[key]
+    cube = AggregateCube(df)
+    with cube_cache_lock:
+        cube = cube_cache.setdefault(key, cube)
+        while len(cube_cache) > cube_cache_size:
+            cube_cache.popitem(last=False)
+    return cube
+
+
+def set_cube(key, cube):
+    """Store a cube built elsewhere (e.g. incrementally during ingestion)."""
+    with cube_cache_lock:
+        cube_cache[key] = cube
+        cube_cache.move_to_end(key)
+        while len(cube_cache) > cube_cache_size:
+            cube_cache.popitem(last=False)
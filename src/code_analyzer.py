@@ -0,0 +1,395 @@
+# Import Libraries
+import ast
+import textwrap
+import threading
+
+# Methods whose result is an aggregate (no longer one row per record), loops over these
+# results are cheap and allowed
+reducing_methods = {
+    "agg",
+    "aggregate",
+    "count",
+    "crosstab",
+    "describe",
+    "groupby",
+    "head",
+    "max",
+    "mean",
+    "median",
+    "min",
+    "nlargest",
+    "nsmallest",
+    "nunique",
+    "pivot",
+    "pivot_table",
+    "resample",
+    "sample",
+    "size",
+    "std",
+    "sum",
+    "tail",
+    "unique",
+    "value_counts",
+}
+merge_key_arguments = {"on", "left_on", "right_on", "left_index", "right_index"}
+indexers = {"loc", "iloc", "at", "iat"}
+
+preflight_metrics = {"checked": 0, "rewritten": 0, "rejected": 0}
+preflight_metrics_lock = threading.Lock()
+
+
+class PreflightError(Exception):
+    """Generated code was rejected before execution (see the message for the fixes)."""
+
+    error_type = "preflight"
+
+
+class PreflightAnalyzer(ast.NodeTransformer):
+    """
+    Walks generated code in statement order, tracking which names still hold one row per
+    record of an input dataset (the datasets themselves, filters, column selections,
+    copies ...). Row-wise work over those frames is reported as an issue, except for
+    `frame.apply(lambda row: <arithmetic on row["col"]>, axis=1)` which is rewritten
+    into the equivalent column arithmetic. The dimension columns are categoricals (see
+    schema.py): groupby/pivot_table calls get observed=True and value_counts results
+    drop the labels without rows. Generated code runs with copy-on-write, where chained
+    assignments (`df[mask]["col"] = v`) and inplace methods on a column
+    (`df["col"].fillna(0, inplace=True)`) silently do nothing: they are rewritten into
+    `df.loc[mask, "col"] = v` / `df["col"] = df["col"].fillna(0)` where possible.
+    """
+
+    def __init__(self, frame_names):
+        self.frame_names = set(frame_names)
+        self.issues = []
+        self.rewrites = []
+        self.loop_depth = 0
+
+    def is_row_level(self, node):
+        if isinstance(node, ast.Name):
+            return node.id in self.frame_names
+        if isinstance(node, (ast.Subscript, ast.Attribute)):
+            return self.is_row_level(node.value)
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            if node.func.attr in reducing_methods:
+                return False
+            return self.is_row_level(node.func.value)
+        return False
+
+    def add_issue(self, node, message):
+        self.issues.append(f"line {getattr(node, 'lineno', '?')}: {message}")
+
+    # Chained assignments
+    def is_frame(self, node):
+        return isinstance(node, ast.Name) and node.id in self.frame_names
+
+    def fix_chained_target(self, node, target):
+        """`df[a]["col"]` / `df["col"][a]` -> `df.loc[a, "col"]`, other chains reported."""
+        if not isinstance(target, ast.Subscript):
+            return target
+        inner = target.value
+        if isinstance(inner, ast.Subscript) and self.is_frame(inner.value):
+            column, rows = None, None
+            if isinstance(target.slice, ast.Constant) and isinstance(
+                target.slice.value, str
+            ):
+                column, rows = target.slice, inner.slice
+            elif isinstance(inner.slice, ast.Constant) and isinstance(
+                inner.slice.value, str
+            ):
+                column, rows = inner.slice, target.slice
+            if column is not None and not (
+                isinstance(rows, ast.Constant) and isinstance(rows.value, str)
+            ):
+                self.rewrites.append(
+                    f"line {node.lineno}: chained assignment rewritten with .loc"
+                )
+                return ast.Subscript(
+                    value=ast.Attribute(value=inner.value, attr="loc", ctx=ast.Load()),
+                    slice=ast.Tuple(elts=[rows, column], ctx=ast.Load()),
+                    ctx=ast.Store(),
+                )
+            chained = True
+        else:
+            # df[a].loc[b] = v / df.loc[a][b] = v
+            chained = (
+                isinstance(inner, ast.Attribute)
+                and inner.attr in indexers
+                and isinstance(inner.value, ast.Subscript)
+                and self.is_frame(inner.value.value)
+            ) or (
+                isinstance(inner, ast.Subscript)
+                and isinstance(inner.value, ast.Attribute)
+                and inner.value.attr in indexers
+                and self.is_frame(inner.value.value)
+            )
+        if chained:
+            self.add_issue(
+                node,
+                'chained assignment (e.g. df[mask]["col"] = value) does not modify '
+                'the dataframe, assign in one step with df.loc[mask, "col"] = value',
+            )
+        return target
+
+    def visit_AugAssign(self, node):
+        self.generic_visit(node)
+        node.target = self.fix_chained_target(node, node.target)
+        return node
+
+    # Inplace methods on a column
+    def visit_Expr(self, node):
+        self.generic_visit(node)
+        call = node.value
+        if not (
+            isinstance(call, ast.Call)
+            and isinstance(call.func, ast.Attribute)
+            and isinstance(call.func.value, ast.Subscript)
+            and self.is_frame(call.func.value.value)
+        ):
+            return node
+        inplace = [
+            kw
+            for kw in call.keywords
+            if kw.arg == "inplace"
+            and isinstance(kw.value, ast.Constant)
+            and kw.value.value is True
+        ]
+        if not inplace:
+            return node
+        column = call.func.value
+        call.keywords = [kw for kw in call.keywords if kw.arg != "inplace"]
+        self.rewrites.append(
+            f"line {node.lineno}: inplace {call.func.attr} on a column rewritten as "
+            "an assignment"
+        )
+        return ast.copy_location(
+            ast.Assign(
+                targets=[
+                    ast.Subscript(
+                        value=column.value, slice=column.slice, ctx=ast.Store()
+                    )
+                ],
+                value=call,
+            ),
+            node,
+        )
+
+    # Assignments update which names are row level
+    def visit_Assign(self, node):
+        self.generic_visit(node)
+        node.targets = [self.fix_chained_target(node, t) for t in node.targets]
+        row_level = self.is_row_level(node.value)
+        for target in node.targets:
+            if isinstance(target, ast.Name):
+                if row_level:
+                    self.frame_names.add(target.id)
+                else:
+                    self.frame_names.discard(target.id)
+        return node
+
+    # Loops
+    def check_loop_iter(self, node, iterable):
+        if (
+            isinstance(iterable, ast.Call)
+            and isinstance(iterable.func, ast.Name)
+            and iterable.func.id == "range"
+            and len(iterable.args) == 1
+            and isinstance(iterable.args[0], ast.Call)
+            and isinstance(iterable.args[0].func, ast.Name)
+            and iterable.args[0].func.id == "len"
+            and iterable.args[0].args
+            and self.is_row_level(iterable.args[0].args[0])
+        ):
+            self.add_issue(
+                node,
+                "Python loop over range(len(...)) of the dataset rows, use vectorised "
+                "column operations, boolean masks or groupby().agg() instead",
+            )
+        elif (
+            isinstance(iterable, ast.Attribute)
+            and iterable.attr in ("index", "values")
+            and self.is_row_level(iterable.value)
+        ):
+            self.add_issue(
+                node,
+                f"Python loop over .{iterable.attr} of the dataset rows, use vectorised "
+                "column operations, boolean masks or groupby().agg() instead",
+            )
+
+    def visit_loop(self, node):
+        if isinstance(node, ast.For):
+            self.check_loop_iter(node, node.iter)
+        self.loop_depth += 1
+        self.generic_visit(node)
+        self.loop_depth -= 1
+        return node
+
+    visit_For = visit_loop
+    visit_While = visit_loop
+
+    def visit_comprehension(self, node):
+        self.check_loop_iter(node.iter, node.iter)
+        self.generic_visit(node)
+        return node
+
+    # Method calls
+    def visit_Call(self, node):
+        self.generic_visit(node)
+        if not isinstance(node.func, ast.Attribute):
+            return node
+        method = node.func.attr
+        receiver = node.func.value
+        keywords = {kw.arg: kw.value for kw in node.keywords if kw.arg}
+
+        # Dimension columns are categoricals: only group by observed combinations
+        if (
+            method in ("groupby", "pivot_table")
+            and "observed" not in keywords
+            and not (isinstance(receiver, ast.Name) and receiver.id == "itertools")
+        ):
+            node.keywords.append(ast.keyword(arg="observed", value=ast.Constant(True)))
+            self.rewrites.append(f"line {node.lineno}: observed=True added to {method}")
+
+        # ... and value_counts lists every category, including those without rows
+        if method == "value_counts" and "bins" not in keywords:
+            self.rewrites.append(f"line {node.lineno}: zero counts dropped")
+            return ast.copy_location(
+                ast.Subscript(
+                    value=ast.Attribute(value=node, attr="loc", ctx=ast.Load()),
+                    slice=ast.parse("lambda counts: counts > 0", mode="eval").body,
+                    ctx=ast.Load(),
+                ),
+                node,
+            )
+
+        if method in ("iterrows", "itertuples") and self.is_row_level(receiver):
+            self.add_issue(
+                node,
+                f"row-wise iteration with {method}() over the dataset, use vectorised "
+                "column operations, np.where or groupby().agg() instead",
+            )
+        elif method == "apply" and self.is_row_level(receiver):
+            axis = keywords.get("axis")
+            if isinstance(axis, ast.Constant) and axis.value in (1, "columns"):
+                rewritten = self.vectorise_row_apply(node, receiver)
+                if rewritten is not None:
+                    self.rewrites.append(
+                        f"line {node.lineno}: apply(axis=1) rewritten as column arithmetic"
+                    )
+                    return ast.copy_location(rewritten, node)
+                self.add_issue(
+                    node,
+                    "row-wise apply(axis=1) over the dataset, compute the new column "
+                    "from whole columns (arithmetic, np.where, .str / .dt accessors)",
+                )
+        elif method == "copy" and self.loop_depth and self.is_row_level(receiver):
+            self.add_issue(
+                node,
+                "copy() of the dataset inside a loop, copy once before the loop or "
+                "filter without copying",
+            )
+        elif method == "merge":
+            # DataFrame.merge(right, how, on, ...) / pd.merge(left, right, how, on, ...)
+            how_position = (
+                2 if isinstance(receiver, ast.Name) and receiver.id == "pd" else 1
+            )
+            key_position = how_position + 1
+            how = keywords.get("how")
+            if len(node.args) > how_position:
+                how = node.args[how_position]
+            if isinstance(how, ast.Constant) and how.value == "cross":
+                self.add_issue(
+                    node,
+                    "cross merge (every row with every row), merge on the shared key "
+                    "columns after aggregating both sides",
+                )
+            elif not (merge_key_arguments & set(keywords)) and (
+                len(node.args) <= key_position
+            ):
+                self.add_issue(
+                    node,
+                    "merge without explicit keys, pass on=[...] (or left_on/right_on) "
+                    "with the shared key columns",
+                )
+        return node
+
+    def vectorise_row_apply(self, node, receiver):
+        """`df.apply(lambda r: r["a"] * r["b"], axis=1)` -> `df["a"] * df["b"]`."""
+        if not isinstance(receiver, ast.Name) or not node.args:
+            return None
+        func = node.args[0]
+        if not (
+            isinstance(func, ast.Lambda)
+            and len(func.args.args) == 1
+            and not func.args.vararg
+            and not func.args.kwarg
+        ):
+            return None
+        row = func.args.args[0].arg
+
+        def convert(expr):
+            if isinstance(expr, ast.Constant) and isinstance(expr.value, (int, float)):
+                return expr
+            if (
+                isinstance(expr, ast.Subscript)
+                and isinstance(expr.value, ast.Name)
+                and expr.value.id == row
+                and isinstance(expr.slice, ast.Constant)
+                and isinstance(expr.slice.value, str)
+            ):
+                return ast.Subscript(
+                    value=ast.Name(id=receiver.id, ctx=ast.Load()),
+                    slice=ast.Constant(value=expr.slice.value),
+                    ctx=ast.Load(),
+                )
+            if isinstance(expr, ast.BinOp):
+                left, right = convert(expr.left), convert(expr.right)
+                if left is None or right is None:
+                    return None
+                return ast.BinOp(left=left, op=expr.op, right=right)
+            if isinstance(expr, ast.UnaryOp) and isinstance(
+                expr.op, (ast.USub, ast.UAdd)
+            ):
+                operand = convert(expr.operand)
+                return None if operand is None else ast.UnaryOp(expr.op, operand)
+            return None
+
+        return convert(func.body)
+
+
+def preflight_check(code, frame_names):
+    """
+    Check (and where possible rewrite) one generated code segment before it is
+    executed. Returns the code to run, raises PreflightError listing the hazards found.
+    Code that does not parse is returned unchanged (exec reports the syntax error).
+    """
+    try:
+        tree = ast.parse(textwrap.dedent(code).strip())
+    except SyntaxError:
+        return code
+    analyzer = PreflightAnalyzer(frame_names)
+    tree = ast.fix_missing_locations(analyzer.visit(tree))
+    with preflight_metrics_lock:
+        preflight_metrics["checked"] += 1
+        if analyzer.issues:
+            preflight_metrics["rejected"] += 1
+        elif analyzer.rewrites:
+            preflight_metrics["rewritten"] += 1
+    if analyzer.issues:
+        raise PreflightError(
+            "Generated code was rejected before execution for performance reasons. "
+            "Retry the tool asking for vectorised pandas code without: "
+            + "; ".join(analyzer.issues)
+        )
+    if analyzer.rewrites:
+        print("Pre-flight rewrites: " + "; ".join(analyzer.rewrites))
+        return ast.unparse(tree)
+    return code
+
+
+def preflight_segments(segments, frame_names):
+    """Run preflight_check over the <code> and <chart> segments."""
+    checked = dict(segments)
+    for key in ("code", "chart"):
+        if key in checked:
+            checked[key] = preflight_check(checked[key], frame_names)
+    return checked
@@ -0,0 +1,135 @@
+# Import Libraries
+import hashlib
+import json
+import os
+import traceback
+import pandas as pd
+
+# Import Support Files
+import helpers
+from helpers import preprocess_expense_data, preprocess_budget_data
+from ingestion import ingest, read_ingested
+
+DEFAULT_CACHE_DIR = "src/data_cache"
+
+# Preprocessor and the tables it depends on, per dataset kind
+preprocessors = {
+    "expense": (
+        preprocess_expense_data,
+        [
+            "expense_tier_2_mapping",
+            "expense_tier_3_mapping",
+            "expense_tier_2_3_mapping",
+        ],
+    ),
+    "budget": (
+        preprocess_budget_data,
+        [
+            "budget_tier_2_mapping",
+            "budget_tier_3_mapping",
+            "budget_tier_2_3_mapping",
+        ],
+    ),
+}
+
+
+def file_sha256(file_path, chunk_size=1 << 20):
+    """Content hash of a file (path or binary file object), read in chunks."""
+    digest = hashlib.sha256()
+    if hasattr(file_path, "read"):
+        file_path.seek(0)
+        for chunk in iter(lambda: file_path.read(chunk_size), b""):
+            digest.update(chunk)
+        file_path.seek(0)
+        return digest.hexdigest()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def upload_handle(kind, content_hash):
+    """Registry handle of an uploaded dataset (see DatasetRegistry.submit_upload)."""
+    return f"{kind}_{content_hash[:32]}"
+
+
+def preprocessing_fingerprint(kind):
+    """
+    Hash of everything that determines the preprocessed output apart from the source:
+    the preprocessing version and the tier mapping tables used for `kind`.
+    """
+    _, table_names = preprocessors[kind]
+    tables = {
+        name: sorted(
+            [list(k) if isinstance(k, tuple) else k, v]
+            for k, v in getattr(helpers, name).items()
+        )
+        for name in table_names
+    }
+    payload = json.dumps(
+        {"version": helpers.PREPROCESSING_VERSION, "tables": tables},
+        sort_keys=True,
+        default=str,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def get_cache_path(kind, file_path, cache_dir=DEFAULT_CACHE_DIR, content_hash=None):
+    content_hash = content_hash or file_sha256(file_path)
+    key = hashlib.sha256(
+        f"{content_hash}:{preprocessing_fingerprint(kind)}".encode("utf-8")
+    ).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{kind}_{key}.parquet")
+
+
+def preprocess_source(kind, source, file_name):
+    # Whole-file fallback (e.g. .xls workbooks, no Parquet support)
+    preprocess, _ = preprocessors[kind]
+    if hasattr(source, "seek"):
+        source.seek(0)
+    if file_name.lower().endswith(".csv"):
+        return preprocess(None, pd.read_csv(source))
+    return preprocess(None, pd.read_excel(source))
+
+
+def load_preprocessed_dataset(
+    kind,
+    file_path,
+    cache_dir=DEFAULT_CACHE_DIR,
+    file_name=None,
+    content_hash=None,
+    progress=None,
+    cube_key=None,
+):
+    """
+    Return the preprocessed `kind` ("expense"/"budget") dataset for `file_path` (a path,
+    or a binary file object such as an upload, named `file_name`).
+    The output is cached as Parquet keyed by the source content hash and the
+    preprocessing fingerprint, so warm starts skip parsing and preprocessing entirely
+    and a changed source file or mapping table misses the cache automatically.
+    Cache misses are ingested chunk by chunk (see ingestion.py), reporting
+    `progress(fraction)`.
+    """
+    file_name = file_name or str(file_path)
+    try:
+        cache_path = get_cache_path(kind, file_path, cache_dir, content_hash)
+        if os.path.exists(cache_path):
+            return read_ingested(kind, cache_path)
+    except Exception as e:
+        print(f"Unable to read cached {kind} data: {e} \n{traceback.format_exc()}")
+        cache_path = None
+    if cache_path is not None and not file_name.lower().endswith(".xls"):
+        # Write to a temporary file first so readers never see a partial file
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(cache_dir, exist_ok=True)
+            if hasattr(file_path, "seek"):
+                file_path.seek(0)
+            ingest(kind, file_path, file_name, tmp_path, progress, cube_key)
+            os.replace(tmp_path, cache_path)
+            return read_ingested(kind, cache_path)
+        except Exception as e:
+            print(f"Unable to ingest {kind} data: {e} \n{traceback.format_exc()}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    return preprocess_source(kind, file_path, file_name)
@@ -0,0 +1,193 @@
+# Import Libraries
+import hashlib
+import os
+import threading
+import traceback
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+# Import Support Files
+from helpers import dataset_fingerprint, isolated_copy, remember_fingerprint
+from data_cache import load_preprocessed_dataset, upload_handle
+from aggregates import get_cube
+
+
+class IngestionJob:
+    """
+    Background ingestion of one uploaded dataset, shared by identical uploads. Its
+    fields are only changed and read under the registry lock (see _update_job).
+    """
+
+    def __init__(self, handle, file_name):
+        self.handle = handle
+        self.file_name = file_name
+        self.state = "pending"  # pending -> running -> done / failed
+        self.progress = 0.0
+        self.error = None
+
+    def status(self):
+        return {
+            "handle": self.handle,
+            "file_name": self.file_name,
+            "state": self.state,
+            "progress": self.progress,
+            "error": self.error,
+        }
+
+
+class DatasetRegistry:
+    """
+    Process-wide store holding one columnar (DataFrame) copy per dataset version.
+    Sessions keep only the returned handle and resolve it with `get` when needed, so
+    the memory used by datasets does not grow with the number of sessions.
+    Datasets are treated as read-only once registered, `get` hands out copies.
+    Ingestion jobs are dropped with their datasets; failed ones (kept so that the UI
+    can show the error) are capped at `max_failed_jobs`.
+    """
+
+    def __init__(self, max_unpinned=16, max_failed_jobs=64):
+        self._datasets = OrderedDict()
+        self._pinned = set()
+        self._sources = {}
+        self._lock = threading.Lock()
+        # Serialises loads so concurrent sessions do not parse the same source twice
+        self._load_lock = threading.Lock()
+        self.max_unpinned = max_unpinned
+        self.max_failed_jobs = max_failed_jobs
+        # Background ingestion of uploads (see submit_upload)
+        self._jobs = {}
+        self._ingestion_executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="ingestion"
+        )
+
+    def register(self, df, key=None, pinned=False):
+        """Store `df` (if not already present) and return its handle."""
+        handle = key or dataset_fingerprint(df)
+        remember_fingerprint(df, handle)
+        # Build the aggregate cube at load time, before any question needs it
+        get_cube(df, handle)
+        with self._lock:
+            if handle not in self._datasets:
+                self._datasets[handle] = df
+            self._datasets.move_to_end(handle)
+            if pinned:
+                self._pinned.add(handle)
+            self._evict()
+        return handle
+
+    def register_file(self, kind, file_path, pinned=False):
+        """
+        Load the preprocessed `kind` dataset from `file_path` once per server process
+        (or again if the file changes on disk) and return its handle.
+        """
+        stat = os.stat(file_path)
+        source_key = (
+            kind,
+            os.path.abspath(file_path),
+            stat.st_mtime_ns,
+            stat.st_size,
+        )
+        with self._load_lock:
+            handle = self._sources.get(source_key)
+            if handle in self:
+                return handle
+            df = load_preprocessed_dataset(kind, file_path)
+            handle = self.register(df, pinned=pinned)
+            self._sources[source_key] = handle
+        return handle
+
+    def submit_upload(self, kind, file_bytes, file_name, load_fn):
+        """
+        Start ingesting an uploaded `kind` dataset in the background and return its
+        handle right away, poll `ingestion_status(handle)` until it is "done".
+        Content already ingested (or being ingested) is not processed again, failed or
+        evicted uploads are retried. `load_fn(content_hash, progress)` parses and
+        preprocesses the file, reporting `progress(fraction)`.
+        """
+        content_hash = hashlib.sha256(file_bytes).hexdigest()
+        handle = upload_handle(kind, content_hash)
+        with self._lock:
+            job = self._jobs.get(handle)
+            if job is not None and (
+                job.state in ("pending", "running") or handle in self._datasets
+            ):
+                return handle
+            # A retried job counts as the newest one
+            self._jobs.pop(handle, None)
+            job = IngestionJob(handle, file_name)
+            self._jobs[handle] = job
+        self._ingestion_executor.submit(self._run_ingestion, job, content_hash, load_fn)
+        return handle
+
+    def _update_job(self, job, **fields):
+        # ingestion_status reads the job from other threads
+        with self._lock:
+            for name, value in fields.items():
+                setattr(job, name, value)
+
+    def _run_ingestion(self, job, content_hash, load_fn):
+        self._update_job(job, state="running")
+        try:
+            df = load_fn(
+                content_hash,
+                lambda fraction: self._update_job(
+                    job, progress=min(max(fraction, 0.0), 1.0)
+                ),
+            )
+            self.register(df, key=job.handle)
+            self._update_job(job, state="done", progress=1.0)
+        except Exception as e:
+            print(f"Unable to ingest {job.file_name}: {e} \n{traceback.format_exc()}")
+            self._update_job(job, state="failed", error=str(e))
+            with self._lock:
+                self._evict()
+
+    def ingestion_status(self, handle):
+        """
+        Status of the upload ingestion job of `handle`: dict with state ("pending",
+        "running", "done", "failed"), progress (0-1), error and file_name, or None if
+        no job is known for the handle. Constant time, meant to be polled by the UI.
+        """
+        with self._lock:
+            job = self._jobs.get(handle)
+            if job is None:
+                return None
+            return job.status()
+
+    def get(self, handle):
+        """
+        Copy of the registered dataset, or None for an unknown/evicted handle. Writes to
+        the copy (column additions, .loc assignments, ...) never reach the registered
+        dataset: it is a shallow view under copy-on-write (enabled at startup, see
+        helpers.enable_copy_on_write), a full copy otherwise.
+        """
+        with self._lock:
+            df = self._datasets.get(handle)
+            if df is None:
+                return None
+            self._datasets.move_to_end(handle)
+        view = isolated_copy(df)
+        remember_fingerprint(view, handle)
+        return view
+
+    def __contains__(self, handle):
+        return handle in self._datasets
+
+    def _evict(self):
+        # Least recently used, unpinned datasets go first
+        unpinned = [h for h in self._datasets if h not in self._pinned]
+        for handle in unpinned[: max(0, len(unpinned) - self.max_unpinned)]:
+            del self._datasets[handle]
+            job = self._jobs.get(handle)
+            if job is not None:
+                # The upload has to be submitted again
+                job.state = "failed"
+                job.error = "Dataset was evicted, upload the file again"
+        # Oldest failed jobs go first
+        failed = [h for h, job in self._jobs.items() if job.state == "failed"]
+        for handle in failed[: max(0, len(failed) - self.max_failed_jobs)]:
+            del self._jobs[handle]
+
+
+# Shared registry for the server process
+registry = DatasetRegistry()
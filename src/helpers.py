@@ -5,6 +5,15 @@ warnings.filterwarnings("ignore")
 import re
 import os
 import uuid
+import hashlib
+import copy
+import contextvars
+import threading
+import textwrap
+import time
+import weakref
+from collections import OrderedDict
+import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
@@ -16,29 +25,210 @@ import plotly.io as pio
 # Langchain Imports
 from langchain_core.tools import tool
 
+# Import Support Files
+from code_analyzer import preflight_segments
+from aggregates import cube_dimensions, get_cube
+from schema import apply_schema, expense_schema, budget_schema
+from job_queue import JobCancelled
+
+# Copy-on-write: shallow copies of a DataFrame share memory until one of them is written
+# to, so every execution can work on its own view of the datasets (see run_code_segments).
+# pandas options are process-wide and must not be toggled at runtime, so the entry
+# points (app, server, batch runner, sandbox workers) enable it once at startup
+
+
+def enable_copy_on_write():
+    """Enable pandas copy-on-write for the whole process, once at startup."""
+    pd.set_option("mode.copy_on_write", True)
+
+
+def isolated_copy(df):
+    """
+    Copy of `df` that can be written to without affecting `df`: a shallow copy under
+    copy-on-write, a deep copy otherwise.
+    """
+    return df.copy(deep=not pd.get_option("mode.copy_on_write"))
+
+
+# Bump whenever the preprocessing logic changes so that cached outputs are invalidated
+PREPROCESSING_VERSION = 4
+
+# Tier normalization tables
+# Expense data
+expense_tier_2_mapping = {
+    "In Store & POS Execution": "In-Store and POS Execution",
+    "Capability Building/Other": "Capability Building/Others",
+}
+expense_tier_3_mapping = {
+    "Stands/ Racks, Other Trade Equipment": "Stands / Racks, Other Trade Equipment"
+}
+expense_tier_2_3_mapping = {}
+# Budget data
+budget_tier_2_mapping = {
+    "All Other Non-Working": "Other Non Working",
+    "All Other Working": "Other Working",
+    "In Store & POS Execution": "In-Store and POS Execution",
+    "Capability Building/Other": "Capability Building/Others",
+}
+budget_tier_3_mapping = {
+    "TV, Print, Radio, OOH, Production": "TV Print Radio OOH Prod",
+    "In Store & POS Design / Development": "In Store and POS Design/Development",
+    "Social Media / Influence Marketing": "Media Agency Fees",
+    "Social Media/Influence Marketing": "Media Agency Fees",
+    "Administrative fees": "All Other Non Working",
+    "Agency out of pocket": "All Other Non Working",
+    "CP out of pocket admin": "All Other Non Working",
+    "Grassroots/experiential out of pocket": "All Other Non Working",
+    "League/property- rights fee/options": "All Other Non Working",
+    "Non-allocated NW": "All Other Non Working",
+    "Other Non Working-non itemised talent": "All Other Non Working",
+    "PR out of pocket administrative": "All Other Non Working",
+    "Innovations": "Innovation",
+    "Out of Scope Countries ( D8 Gastos)": "Future Use",
+    "Package development": "Package Design",
+    "Other Working - activation": "All Other Working",
+    "Other Working - non allocated working": "All Other Working",
+    "Other Working - PR execution": "All Other Working",
+    "Coupons": "Coupons (Redemption)",
+    "Sampling Execution": "Sample Executing",
+    "Sponsorships-in game/ in show": "Sponsorships",
+    "Sports-athlete/team contracts": "Sponsorships",
+    "Sports-on field or in show props": "Sponsorships",
+    "Sports-stadium contracts": "Sponsorships",
+    "Capability Building Other": "Capability Building",
+    "Capability Building/Other-Other": "Capability Building",
+    "Stands/ Racks, Other Trade Equipment": "Stands / Racks, Other Trade Equipment",
+    "Trade Equipment-Other": "Other",
+    "Package design": "Package Design",
+    "Post Mix / Pre Mix Equip.": "Other",
+    "In-Store & POS Execution": "In-Store and POS Execution",
+}
+# (Tier 2, Tier 3) pair rules, applied after the single column renames
+budget_tier_2_3_mapping = {
+    ("Agency Fees", "Other"): ("Agency Fees", "Other Agency Fees"),
+    ("All Other Non-Working", "Market Research"): (
+        "Innovation and Insight",
+        "Market Research",
+    ),
+    ("Other Non Working", "Market Research"): (
+        "Innovation and Insight",
+        "Market Research",
+    ),
+    ("Consumer Promotions", "Other"): (
+        "Consumer Promotions",
+        "Other Consumer Promotions",
+    ),
+    ("Media Placements", "Cinema"): ("Media Placements", "Media Placements"),
+    ("Media Placements", "OOH - Out Of Home"): (
+        "Media Placements",
+        "Media Placements",
+    ),
+    ("Media Placements", "Print"): ("Media Placements", "Media Placements"),
+    ("Media Placements", "Radio"): ("Media Placements", "Media Placements"),
+    ("Media Placements", "TV"): ("Media Placements", "Media Placements"),
+    ("Media Placements", "Digital"): ("Media Placements", "Digital Media"),
+    ("Media Placements", "Other"): ("Media Placements", "Other Media"),
+    ("Other Investments", "Capital (Coolers)"): ("Unilateral", "Capital Equipment"),
+    ("Other Investments", "CDA's"): ("Unilateral", "CDAs"),
+    ("Other Investments", "Price Support"): ("Unilateral", "Price Support"),
+    ("Other Investments", "Vending / Racks"): (
+        "Trade Equipment",
+        "Stands / Racks, Other Trade Equipment",
+    ),
+    ("Other Trade", "Frozen Funds"): ("Trade Programs", "Future Use"),
+    ("Other Trade", "Other Trade"): ("Trade Equipment", "Other"),
+    ("Trade Equipment", "Coolers - New"): (
+        "Trade Equipment",
+        "On Premise Equipment",
+    ),
+    ("Trade Equipment", "Coolers - Refurbished"): (
+        "Trade Equipment",
+        "On Premise Equipment",
+    ),
+    ("Trade Equipment", "Vending / Racks"): (
+        "Trade Equipment",
+        "Stands / Racks, Other Trade Equipment",
+    ),
+}
+
+
+def _normalize_tier_value(value, mapping):
+    # Same semantics as `.str.strip()` followed by a dict lookup
+    if not isinstance(value, str):
+        return np.nan
+    value = value.strip()
+    return mapping.get(value) or value
+
+
+def normalize_tiers(
+    df,
+    tier_2_mapping,
+    tier_3_mapping,
+    tier_2_3_mapping=None,
+    tier_2_col="Tier 2",
+    tier_3_col="Tier 3",
+):
+    """
+    Apply the Tier 2, Tier 3 and (Tier 2, Tier 3) renaming rules in one vectorized pass.
+    Both columns are factorized once, the rules are resolved on the distinct values/pairs
+    only and the result is broadcast back with a single take, so the cost is O(rows)
+    irrespective of the number of mapping entries.
+    """
+    tier_2_codes, tier_2_uniques = pd.factorize(df[tier_2_col], use_na_sentinel=False)
+    tier_3_codes, tier_3_uniques = pd.factorize(df[tier_3_col], use_na_sentinel=False)
+    # Single column renames (on distinct values only)
+    tier_2_values = np.array(
+        [_normalize_tier_value(x, tier_2_mapping) for x in tier_2_uniques],
+        dtype=object,
+    )
+    tier_3_values = np.array(
+        [_normalize_tier_value(x, tier_3_mapping) for x in tier_3_uniques],
+        dtype=object,
+    )
+    if not tier_2_3_mapping:
+        df[tier_2_col] = tier_2_values.take(tier_2_codes)
+        df[tier_3_col] = tier_3_values.take(tier_3_codes)
+        return df
+    # Pair renames (on distinct (Tier 2, Tier 3) combinations only)
+    pair_codes, pair_uniques = pd.factorize(
+        tier_2_codes.astype(np.int64) * len(tier_3_uniques) + tier_3_codes
+    )
+    pair_tier_2 = tier_2_values.take(pair_uniques // len(tier_3_uniques))
+    pair_tier_3 = tier_3_values.take(pair_uniques % len(tier_3_uniques))
+    for i, key in enumerate(zip(pair_tier_2, pair_tier_3)):
+        if key in tier_2_3_mapping:
+            pair_tier_2[i], pair_tier_3[i] = tier_2_3_mapping[key]
+    df[tier_2_col] = pair_tier_2.take(pair_codes)
+    df[tier_3_col] = pair_tier_3.take(pair_codes)
+    return df
+
 
 # Preprocess data
+# Columns read from the expense source
+expense_source_columns = [
+    "Region",
+    "Country",
+    "Category",
+    "Brand",
+    "Year",
+    "Time Month",
+    "Tier 1",
+    "Tier 2",
+    "Tier 3",
+    "Expense Status",
+    "Pending At",
+    "Expense Logged by (NS)",
+    "Audit Status",
+    "Audit Comments",
+    "Pep Share (USD)",
+    "Bottler Share (USD)",
+    "Total Expense (USD)",
+]
+
+
 def preprocess_expense_data(file_path, df_expenses=None):
     # Columns
-    usecols = [
-        "Region",
-        "Country",
-        "Category",
-        "Brand",
-        "Year",
-        "Time Month",
-        "Tier 1",
-        "Tier 2",
-        "Tier 3",
-        "Expense Status",
-        "Pending At",
-        "Expense Logged by (NS)",
-        "Audit Status",
-        "Audit Comments",
-        "Pep Share (USD)",
-        "Bottler Share (USD)",
-        "Total Expense (USD)",
-    ]
+    usecols = expense_source_columns
     if df_expenses is None:
         # Load data (MODIFIED for new structure)
         df_expenses = pd.read_csv(
@@ -46,7 +236,10 @@ def preprocess_expense_data(file_path, df_expenses=None):
             usecols=usecols,
         )
     else:
-        df_expenses = df_expenses[usecols]
+        # Same columns and order as read_csv(usecols=...)
+        df_expenses = df_expenses[
+            [col for col in df_expenses.columns if col in usecols]
+        ]
     # Preprocessing
     for col in ["Pep Share (USD)", "Bottler Share (USD)", "Total Expense (USD)"]:
         df_expenses[col] = df_expenses[col].fillna(0)
@@ -63,169 +256,161 @@ def preprocess_expense_data(file_path, df_expenses=None):
             "Total Expense (USD)": "Total Expense",
         }
     )
-    # Tier 3 renaming
-    tier_3_mapping = {
-        "Stands/ Racks, Other Trade Equipment": "Stands / Racks, Other Trade Equipment"
-    }
-    # Tier 2 renaming
-    tier_2_mapping = {
-        "In Store & POS Execution": "In-Store and POS Execution",
-        "Capability Building/Other": "Capability Building/Others",
-    }
-    df_expenses["Tier 2"] = (
-        df_expenses["Tier 2"]
-        .str.strip()
-        .apply(lambda x: tier_2_mapping[x] if tier_2_mapping.get(x) else x)
-    )
-    df_expenses["Tier 3"] = (
-        df_expenses["Tier 3"]
-        .str.strip()
-        .apply(lambda x: tier_3_mapping[x] if tier_3_mapping.get(x) else x)
+    # Tier 2/3 renaming
+    df_expenses = normalize_tiers(
+        df_expenses,
+        tier_2_mapping=expense_tier_2_mapping,
+        tier_3_mapping=expense_tier_3_mapping,
+        tier_2_3_mapping=expense_tier_2_3_mapping,
     )
+    # Compact column types (categorical dimensions, downcast amounts)
+    df_expenses = apply_schema(df_expenses, expense_schema)
 
     return df_expenses
 
 
+# Columns read from the budget source
+budget_source_columns = [
+    "Region",
+    "Country",
+    "Year",
+    "Category",
+    "Brand",
+    "Tier 1",
+    "Tier 2",
+    "Tier 3",
+    "Pep Budget",
+    "Bottler Budget",
+    "Budget",
+]
+
+
 def preprocess_budget_data(file_path, df_budget=None):
     # Columns
-    usecols = [
-        "Region",
-        "Country",
-        "Year",
-        "Category",
-        "Brand",
-        "Tier 1",
-        "Tier 2",
-        "Tier 3",
-        "Pep Budget",
-        "Bottler Budget",
-        "Budget",
-    ]
+    usecols = budget_source_columns
     if df_budget is None:
         df_budget = pd.read_csv(
             file_path,
             usecols=usecols,
         )
     else:
-        # Select relevant columns
-        df_budget = df_budget[usecols]
+        # Select relevant columns (same order as read_csv(usecols=...))
+        df_budget = df_budget[[col for col in df_budget.columns if col in usecols]]
     # Preprocessing
     for col in ["Pep Budget", "Bottler Budget", "Budget"]:
         df_budget[col] = df_budget[col].fillna(0)
         df_budget[col] = df_budget[col].astype(int)
     # Renaming columns
     df_budget = df_budget.rename(columns={"Budget": "Total Budget"})
-    # Tier 3 renaming
-    tier_3_expense_mapping = {
-        "TV, Print, Radio, OOH, Production": "TV Print Radio OOH Prod",
-        "In Store & POS Design / Development": "In Store and POS Design/Development",
-        "Social Media / Influence Marketing": "Media Agency Fees",
-        "Social Media/Influence Marketing": "Media Agency Fees",
-        "Administrative fees": "All Other Non Working",
-        "Agency out of pocket": "All Other Non Working",
-        "CP out of pocket admin": "All Other Non Working",
-        "Grassroots/experiential out of pocket": "All Other Non Working",
-        "League/property- rights fee/options": "All Other Non Working",
-        "Non-allocated NW": "All Other Non Working",
-        "Other Non Working-non itemised talent": "All Other Non Working",
-        "PR out of pocket administrative": "All Other Non Working",
-        "Innovations": "Innovation",
-        "Out of Scope Countries ( D8 Gastos)": "Future Use",
-        "Package development": "Package Design",
-        "Other Working - activation": "All Other Working",
-        "Other Working - non allocated working": "All Other Working",
-        "Other Working - PR execution": "All Other Working",
-        "Coupons": "Coupons (Redemption)",
-        "Sampling Execution": "Sample Executing",
-        "Sponsorships-in game/ in show": "Sponsorships",
-        "Sports-athlete/team contracts": "Sponsorships",
-        "Sports-on field or in show props": "Sponsorships",
-        "Sports-stadium contracts": "Sponsorships",
-        "Capability Building Other": "Capability Building",
-        "Capability Building/Other-Other": "Capability Building",
-        "Stands/ Racks, Other Trade Equipment": "Stands / Racks, Other Trade Equipment",
-        "Trade Equipment-Other": "Other",
-        "Package design": "Package Design",
-        "Post Mix / Pre Mix Equip.": "Other",
-        "In-Store & POS Execution": "In-Store and POS Execution",
-    }
-    # Tier 2 renaming
-    tier_2_expense_mapping = {
-        "All Other Non-Working": "Other Non Working",
-        "All Other Working": "Other Working",
-        "In Store & POS Execution": "In-Store and POS Execution",
-        "Capability Building/Other": "Capability Building/Others",
-    }
-    # Tier 2 & 3 renaming
-    tier_2_3_expense_mapping = {
-        ("Agency Fees", "Other"): ("Agency Fees", "Other Agency Fees"),
-        ("All Other Non-Working", "Market Research"): (
-            "Innovation and Insight",
-            "Market Research",
-        ),
-        ("Other Non Working", "Market Research"): (
-            "Innovation and Insight",
-            "Market Research",
-        ),
-        ("Consumer Promotions", "Other"): (
-            "Consumer Promotions",
-            "Other Consumer Promotions",
-        ),
-        ("Media Placements", "Cinema"): ("Media Placements", "Media Placements"),
-        ("Media Placements", "OOH - Out Of Home"): (
-            "Media Placements",
-            "Media Placements",
-        ),
-        ("Media Placements", "Print"): ("Media Placements", "Media Placements"),
-        ("Media Placements", "Radio"): ("Media Placements", "Media Placements"),
-        ("Media Placements", "TV"): ("Media Placements", "Media Placements"),
-        ("Media Placements", "Digital"): ("Media Placements", "Digital Media"),
-        ("Media Placements", "Other"): ("Media Placements", "Other Media"),
-        ("Other Investments", "Capital (Coolers)"): ("Unilateral", "Capital Equipment"),
-        ("Other Investments", "CDA's"): ("Unilateral", "CDAs"),
-        ("Other Investments", "Price Support"): ("Unilateral", "Price Support"),
-        ("Other Investments", "Vending / Racks"): (
-            "Trade Equipment",
-            "Stands / Racks, Other Trade Equipment",
-        ),
-        ("Other Trade", "Frozen Funds"): ("Trade Programs", "Future Use"),
-        ("Other Trade", "Other Trade"): ("Trade Equipment", "Other"),
-        ("Trade Equipment", "Coolers - New"): (
-            "Trade Equipment",
-            "On Premise Equipment",
-        ),
-        ("Trade Equipment", "Coolers - Refurbished"): (
-            "Trade Equipment",
-            "On Premise Equipment",
-        ),
-        ("Trade Equipment", "Vending / Racks"): (
-            "Trade Equipment",
-            "Stands / Racks, Other Trade Equipment",
-        ),
-    }
-    df_budget["Tier 2"] = (
-        df_budget["Tier 2"]
-        .str.strip()
-        .apply(
-            lambda x: tier_2_expense_mapping[x] if tier_2_expense_mapping.get(x) else x
-        )
-    )
-    df_budget["Tier 3"] = (
-        df_budget["Tier 3"]
-        .str.strip()
-        .apply(
-            lambda x: tier_3_expense_mapping[x] if tier_3_expense_mapping.get(x) else x
-        )
+    # Tier 2/3 renaming
+    df_budget = normalize_tiers(
+        df_budget,
+        tier_2_mapping=budget_tier_2_mapping,
+        tier_3_mapping=budget_tier_3_mapping,
+        tier_2_3_mapping=budget_tier_2_3_mapping,
     )
-    for key in tier_2_3_expense_mapping:
-        df_budget.loc[
-            (df_budget["Tier 2"].str.strip() == key[0])
-            & ((df_budget["Tier 3"].str.strip() == key[1])),
-            ["Tier 2", "Tier 3"],
-        ] = tier_2_3_expense_mapping[key]
+    # Compact column types (categorical dimensions, downcast amounts)
+    df_budget = apply_schema(df_budget, budget_schema)
     return df_budget
 
 
+# Keys shared by the expense and budget datasets (budgets are yearly)
+budget_vs_actual_keys = [
+    "Region",
+    "Country",
+    "Category",
+    "Brand",
+    "Year",
+    "Tier 1",
+    "Tier 2",
+    "Tier 3",
+]
+
+
+def build_budget_vs_actual(df_expenses, df_budget):
+    """
+    Join the preprocessed expense and budget datasets on their shared keys: one row per
+    Region/Country/Category/Brand/Year/Tier cut present in either dataset, with the
+    expenses (all statuses, and approved only), the budgets, the variance and the
+    utilization of the budget.
+    """
+    expenses = df_expenses.assign(
+        **{
+            "Approved Expense": df_expenses["Total Expense"].where(
+                df_expenses["Expense Status"] == "Approved", 0
+            )
+        }
+    )
+    expense_columns = [
+        "Pep Expense",
+        "Bottler Expense",
+        "Total Expense",
+        "Approved Expense",
+    ]
+    budget_columns = ["Pep Budget", "Bottler Budget", "Total Budget"]
+    actual = expenses.groupby(budget_vs_actual_keys, observed=True)[
+        expense_columns
+    ].sum()
+    budget = df_budget.groupby(budget_vs_actual_keys, observed=True)[
+        budget_columns
+    ].sum()
+    df = actual.join(budget, how="outer")
+    df[expense_columns + budget_columns] = (
+        df[expense_columns + budget_columns].fillna(0).astype("int64")
+    )
+    df["Variance"] = df["Total Expense"] - df["Total Budget"]
+    # Percentages are undefined (NaN) where there is no budget
+    total_budget = df["Total Budget"].where(df["Total Budget"] != 0)
+    df["Variance %"] = (df["Variance"] / total_budget * 100).round(2)
+    df["Utilization %"] = (df["Total Expense"] / total_budget * 100).round(2)
+    df = df.sort_index().reset_index()
+    # Same compact dimension types as the source datasets (see schema.py)
+    return df.astype(
+        {key: "category" for key in budget_vs_actual_keys if key != "Year"}
+    )
+
+
+# Fingerprints by frame identity (id -> fingerprint), dropped when the frame is garbage
+# collected. Not kept in `df.attrs`: pandas propagates attrs to derived frames (filters,
+# column selections, ...), which would then share the fingerprint of their parent
+dataset_fingerprints = {}
+dataset_fingerprints_lock = threading.Lock()
+
+
+def remember_fingerprint(df, fingerprint):
+    """Record `fingerprint` for this frame object (e.g. a registry handle for its views)."""
+    with dataset_fingerprints_lock:
+        if id(df) not in dataset_fingerprints:
+            weakref.finalize(df, dataset_fingerprints.pop, id(df), None)
+        dataset_fingerprints[id(df)] = fingerprint
+
+
+def dataset_fingerprint(df):
+    """
+    Content hash of a dataframe (column names, dtypes and values).
+    The result is memoised per frame object so repeated lookups on the same frame are
+    free; frames are treated as read-only once fingerprinted.
+    """
+    fingerprint = dataset_fingerprints.get(id(df))
+    if fingerprint is not None:
+        return fingerprint
+    digest = hashlib.sha256()
+    digest.update(
+        repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8")
+    )
+    digest.update(pd.util.hash_pandas_object(df, index=False).values.tobytes())
+    fingerprint = digest.hexdigest()[:32]
+    remember_fingerprint(df, fingerprint)
+    return fingerprint
+
+
+def schema_fingerprint(df):
+    """Hash of the column names and dtypes of a dataframe (not its values)."""
+    return hashlib.sha256(
+        repr([(str(c), str(t)) for c, t in df.dtypes.items()]).encode("utf-8")
+    ).hexdigest()[:32]
+
+
 def extract_code_segments(response_text):
     """Extract code segments from the API response using regex."""
     segments = {}
@@ -261,15 +446,164 @@ def display_saved_plot(plot_path: str) -> None:
         print(f"Plot not found at {plot_path}")
 
 
+# Where generated code runs: None executes in this process, otherwise an object with a
+# run(segments, input_dict, PLOT_DIR, check_cancelled) method (see sandbox.SandboxPool)
+execution_sandbox = None
+# Cancellation check of the job answering the current question (set by the Insight
+# Agent step), polled by the sandbox while generated code runs
+execution_cancel_check = contextvars.ContextVar("execution_cancel_check", default=None)
+
+
+def set_execution_sandbox(sandbox):
+    global execution_sandbox
+    execution_sandbox = sandbox
+
+
+# Process-wide cache of execution results, keyed by code + dataset version
+analysis_result_cache = OrderedDict()
+analysis_result_cache_size = 256
+analysis_result_cache_lock = threading.Lock()
+analysis_result_cache_metrics = {"hits": 0, "misses": 0}
+
+
+def get_analysis_cache_key(segments, input_dict, PLOT_DIR):
+    """
+    Content address of an execution: the code, answer template and chart code plus the
+    fingerprint of every input dataset. None if an input cannot be fingerprinted.
+    """
+    digest = hashlib.sha256()
+    for name in ["code", "answer", "chart"]:
+        digest.update(f"{name}\x1f{segments.get(name, '')}\x1e".encode("utf-8"))
+    for name in sorted(input_dict):
+        value = input_dict[name]
+        if not isinstance(value, pd.DataFrame):
+            return None
+        digest.update(f"{name}\x1f{dataset_fingerprint(value)}\x1e".encode("utf-8"))
+    digest.update(str(PLOT_DIR).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def save_figure(fig, PLOT_DIR):
+    """
+    Save a plotly figure as JSON, named after its content so identical figures are
+    stored once on disk. Returns the path.
+    """
+    fig_json = pio.to_json(fig, remove_uids=True)
+    plot_path = os.path.join(
+        PLOT_DIR,
+        f"plot_{hashlib.sha256(fig_json.encode('utf-8')).hexdigest()[:32]}.json",
+    )
+    if not os.path.exists(plot_path):
+        tmp_path = f"{plot_path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(fig_json)
+        os.replace(tmp_path, plot_path)
+    return plot_path
+
+
+def dedent_code(code):
+    # Properly dedent the code before execution
+    return textwrap.dedent(code).strip()
+
+
+# Compiled code objects shared by all sessions, keyed by the hash of the source, so that
+# replayed code (cached LLM responses, chat re-runs) is not parsed and compiled again.
+# Sandbox workers keep their own cache and report its metrics back (add_compile_metrics)
+compiled_code_cache = OrderedDict()
+compiled_code_cache_size = 512
+compiled_code_cache_lock = threading.Lock()
+compiled_code_cache_metrics = {"hits": 0, "misses": 0, "compile_seconds_saved": 0.0}
+
+
+def compile_cached(source):
+    """Return the compiled code object for `source` (LRU cache)."""
+    key = hashlib.sha256(source.encode("utf-8")).hexdigest()
+    with compiled_code_cache_lock:
+        entry = compiled_code_cache.get(key)
+        if entry is not None:
+            compiled_code_cache.move_to_end(key)
+            compiled_code_cache_metrics["hits"] += 1
+            compiled_code_cache_metrics["compile_seconds_saved"] += entry[1]
+            return entry[0]
+    start = time.perf_counter()
+    code_object = compile(source, "<analysis>", "exec")
+    compile_seconds = time.perf_counter() - start
+    with compiled_code_cache_lock:
+        compiled_code_cache_metrics["misses"] += 1
+        compiled_code_cache[key] = (code_object, compile_seconds)
+        while len(compiled_code_cache) > compiled_code_cache_size:
+            compiled_code_cache.popitem(last=False)
+    return code_object
+
+
+def add_compile_metrics(metrics):
+    """Fold the compile cache metrics of another process (sandbox worker) into ours."""
+    with compiled_code_cache_lock:
+        for key, value in metrics.items():
+            compiled_code_cache_metrics[key] += value
+
+
+def run_code_segments(segments, input_dict, PLOT_DIR):
+    """Execute the <code>/<answer> and <chart> segments and collect the outputs."""
+    outputs = {"answer": None, "answer_dict": None, "figure": None}
+    # Create a single namespace for all executions
+    namespace = {"pd": pd, "px": px, "go": go, "pio": pio}
+    # Each execution gets its own view of the datasets: generated code that mutates `df`
+    # cannot leak into later answers, and (under copy-on-write) columns it does not
+    # write are never copied
+    namespace.update(
+        {
+            k: isolated_copy(v) if isinstance(v, (pd.DataFrame, pd.Series)) else v
+            for k, v in input_dict.items()
+        }
+    )
+    # Pre-aggregated cube of the dataset (see aggregates.py)
+    dataset = input_dict.get("df")
+    if (
+        isinstance(dataset, pd.DataFrame)
+        and dataset.columns.isin(cube_dimensions).any()
+    ):
+        namespace["cube"] = get_cube(dataset, dataset_fingerprint(dataset))
+
+    # Execute analysis code and answer template
+    if "code" in segments and "answer" in segments:
+        dedented_code = dedent_code(segments["code"])
+
+        # Combine code with answer template
+        combined_code = f"""
+{dedented_code}
+
+# Format the answer template
+answer_text = f'''{segments['answer']}'''
+"""
+        exec(compile_cached(combined_code), namespace)
+        outputs["answer"] = namespace.get("answer_text")
+        outputs["answer_dict"] = namespace.get("answer_dict")
+
+    # Execute chart code if present
+    if "chart" in segments and "fig" in segments["chart"]:
+        chart_code = "\n".join(
+            x for x in segments["chart"].strip().split("\n") if "fig.show" not in x
+        )
+        dedented_chart = dedent_code(chart_code)
+        # Run code
+        exec(compile_cached(dedented_chart), namespace)
+        # Save figure path
+        outputs["figure"] = save_figure(namespace["fig"], PLOT_DIR)
+    return outputs
+
+
 @tool
 def execute_analysis(input_dict, response_text, PLOT_DIR):
     """Execute the extracted code segments on the provided dataframe and store formatted answer."""
     results = {
         "approach": None,
         "answer": None,
+        "answer_dict": None,
         "figure": None,
         "code": None,
         "chart_code": None,
+        "error": None,
     }
 
     try:
@@ -293,57 +627,62 @@ def execute_analysis(input_dict, response_text, PLOT_DIR):
         if "chart" in segments:
             results["chart_code"] = segments["chart"]
 
-        # Create a single namespace for all executions
-        namespace = {"pd": pd, "px": px, "go": go, "pio": pio}
-        namespace = {**namespace, **input_dict}
-
-        # Execute analysis code and answer template
-        if "code" in segments and "answer" in segments:
-            # Properly dedent the code before execution
-            code_lines = segments["code"].strip().split("\n")
-            min_indent = float("inf")
-            for line in code_lines:
-                if line.strip():
-                    indent = len(line) - len(line.lstrip())
-                    min_indent = min(min_indent, indent)
-
-            dedented_code = "\n".join(
-                line[min_indent:] if line.strip() else "" for line in code_lines
-            )
+        # Reject or rewrite known performance hazards before anything runs
+        segments = preflight_segments(
+            segments,
+            [k for k, v in input_dict.items() if isinstance(v, pd.DataFrame)],
+        )
+        if "code" in segments:
+            results["code"] = segments["code"]
+        if "chart" in segments:
+            results["chart_code"] = segments["chart"]
 
-            # Combine code with answer template
-            combined_code = f"""
-{dedented_code}
+        # Reuse the outputs of an identical execution on the same dataset version
+        cache_key = get_analysis_cache_key(segments, input_dict, PLOT_DIR)
+        with analysis_result_cache_lock:
+            cached = analysis_result_cache.get(cache_key)
+            if (
+                cached is not None
+                and cached["figure"] is not None
+                and not os.path.exists(cached["figure"])
+            ):
+                # Figure deleted since, the code has to run again
+                del analysis_result_cache[cache_key]
+                cached = None
+            if cached is not None:
+                analysis_result_cache.move_to_end(cache_key)
+                analysis_result_cache_metrics["hits"] += 1
+            else:
+                analysis_result_cache_metrics["misses"] += 1
+        if cached is not None:
+            print("Execution result served from cache")
+            results.update(copy.deepcopy(cached))
+            return results
 
-# Format the answer template
-answer_text = f'''{segments['answer']}'''
-"""
-            exec(combined_code, namespace)
-            results["answer"] = namespace.get("answer_text")
-
-        # Execute chart code if present
-        if "chart" in segments and "fig" in segments["chart"]:
-            # Properly dedent the code before execution
-            chart_lines = segments["chart"].strip().split("\n")
-            chart_lines = [x for x in chart_lines if "fig.show" not in x]
-            min_indent = float("inf")
-            for line in chart_lines:
-                if line.strip():
-                    indent = len(line) - len(line.lstrip())
-                    min_indent = min(min_indent, indent)
-
-            dedented_chart = "\n".join(
-                line[min_indent:] if line.strip() else "" for line in chart_lines
+        if execution_sandbox is not None:
+            outputs = execution_sandbox.run(
+                segments,
+                input_dict,
+                PLOT_DIR,
+                check_cancelled=execution_cancel_check.get(),
             )
-            # Save the figure
-            plot_path = os.path.join(PLOT_DIR, f"plot_{uuid.uuid4().hex}.json")
-            dedented_chart += f"\npio.write_json(fig, '{plot_path}')"
-            # Run code
-            exec(dedented_chart, namespace)
-            # Save figure path
-            results["figure"] = plot_path
+        else:
+            outputs = run_code_segments(segments, input_dict, PLOT_DIR)
+        results.update(outputs)
+        if cache_key is not None and outputs["answer"] is not None:
+            with analysis_result_cache_lock:
+                analysis_result_cache[cache_key] = copy.deepcopy(outputs)
+                while len(analysis_result_cache) > analysis_result_cache_size:
+                    analysis_result_cache.popitem(last=False)
         return results
 
+    except JobCancelled:
+        raise
     except Exception as e:
         print(f"Error during execution: {str(e)} \n{traceback.format_exc()}")
+        # Structured error for the agent (sandbox errors carry their error_type)
+        results["error"] = {
+            "type": getattr(e, "error_type", "execution"),
+            "message": str(e),
+        }
         return results
@@ -0,0 +1,176 @@
+# Import Libraries
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from openpyxl import load_workbook
+
+# Import Support Files
+from helpers import (
+    expense_source_columns,
+    budget_source_columns,
+    preprocess_expense_data,
+    preprocess_budget_data,
+)
+from schema import apply_schema, expense_schema, budget_schema
+from aggregates import AggregateCube, set_cube
+
+# Source columns, preprocessor and schema per dataset kind
+ingestion_specs = {
+    "expense": (expense_source_columns, preprocess_expense_data, expense_schema),
+    "budget": (budget_source_columns, preprocess_budget_data, budget_schema),
+}
+default_chunk_rows = 250_000
+
+
+def source_size(source):
+    if hasattr(source, "seek"):
+        position = source.tell()
+        size = source.seek(0, os.SEEK_END)
+        source.seek(position)
+        return size
+    return os.path.getsize(source)
+
+
+def iter_csv_chunks(source, usecols, chunk_rows, progress=None):
+    """Yield the `usecols` of a CSV file (path or binary file object) in chunks."""
+    size = source_size(source) or 1
+    handle = source if hasattr(source, "read") else open(source, "rb")
+    try:
+        for chunk in pd.read_csv(handle, usecols=usecols, chunksize=chunk_rows):
+            if progress is not None:
+                progress(min(handle.tell() / size, 1.0))
+            yield chunk
+    finally:
+        if handle is not source:
+            handle.close()
+
+
+def iter_xlsx_chunks(source, usecols, chunk_rows, progress=None):
+    """
+    Yield the `usecols` of the first sheet of an XLSX workbook in chunks, streaming
+    the rows with openpyxl's read-only mode instead of loading the whole sheet.
+    """
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = list(next(rows, []))
+        missing = [col for col in usecols if col not in header]
+        if missing:
+            raise ValueError(f"Missing required columns: {', '.join(missing)}")
+        # Columns in sheet order, as read_csv(usecols=...) returns them
+        usecols = [col for col in header if col in usecols]
+        positions = [header.index(col) for col in usecols]
+        total_rows = max((sheet.max_row or 0) - 1, 1)
+        batch, n_rows = [], 0
+        for row in rows:
+            batch.append([row[i] if i < len(row) else None for i in positions])
+            if len(batch) == chunk_rows:
+                n_rows += len(batch)
+                if progress is not None:
+                    progress(min(n_rows / total_rows, 1.0))
+                yield pd.DataFrame(batch, columns=usecols)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=usecols)
+    finally:
+        workbook.close()
+
+
+def storage_columns(df, schema):
+    # Schema columns in the order the preprocessor outputs them, so that the file reads
+    # back with the same column order as preprocess_* on the whole source
+    return [col for col in df.columns if col in schema]
+
+
+def storage_schema(schema, columns=None):
+    """Arrow schema the chunks are written with (dimensions as plain strings)."""
+    return pa.schema(
+        [
+            (col, pa.int64() if schema[col] == "integer" else pa.string())
+            for col in columns or schema
+        ]
+    )
+
+
+def to_storage(df, schema):
+    # Per-chunk categories and integer widths differ, so chunks are written with
+    # uniform types and the compact schema is applied once when reading back
+    return df[storage_columns(df, schema)].astype(
+        {
+            col: "Int64" if kind == "integer" else "string[pyarrow]"
+            for col, kind in schema.items()
+        }
+    )
+
+
+def ingest(
+    kind,
+    source,
+    file_name,
+    parquet_path,
+    progress=None,
+    cube_key=None,
+    chunk_rows=default_chunk_rows,
+):
+    """
+    Stream the `kind` ("expense"/"budget") source (CSV or XLSX, path or binary file
+    object) into a Parquet file: each chunk is read, preprocessed (tier normalization,
+    schema validation) and appended, so memory stays bounded by the chunk size.
+    `progress(fraction)` is called after every chunk. When `cube_key` is given the
+    aggregate cube is updated chunk by chunk and stored under that key.
+    """
+    usecols, preprocess, schema = ingestion_specs[kind]
+    if file_name.lower().endswith(".csv"):
+        chunks = iter_csv_chunks(source, usecols, chunk_rows, progress)
+    else:
+        chunks = iter_xlsx_chunks(source, usecols, chunk_rows, progress)
+    cube = None
+    writer = None
+    try:
+        for chunk in chunks:
+            chunk = preprocess(None, chunk)
+            table = pa.Table.from_pandas(
+                to_storage(chunk, schema),
+                schema=storage_schema(schema, storage_columns(chunk, schema)),
+                preserve_index=False,
+            )
+            # Opened on the first chunk, whose column order the file keeps
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_path, table.schema)
+            writer.write_table(table)
+            if cube_key is not None:
+                if cube is None:
+                    cube = AggregateCube(chunk)
+                else:
+                    cube.update(chunk)
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        # Source without rows
+        pq.write_table(storage_schema(schema).empty_table(), parquet_path)
+    if progress is not None:
+        progress(1.0)
+    if cube is not None:
+        set_cube(cube_key, cube)
+
+
+def read_ingested(kind, parquet_path):
+    """Read an ingested Parquet file back with the compact schema of `kind`."""
+    _, _, schema = ingestion_specs[kind]
+    table = pq.read_table(
+        parquet_path,
+        read_dictionary=[c for c, c_kind in schema.items() if c_kind == "category"],
+    )
+    df = apply_schema(table.to_pandas(), schema)
+    # Dictionaries are in order of first appearance, preprocess_* sorts the categories
+    return df.assign(
+        **{
+            col: df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+            for col, kind in schema.items()
+            if kind == "category"
+        }
+    )
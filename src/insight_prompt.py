@@ -91,6 +91,7 @@ When generating the final <answer> tag:
 1. After receiving a response from any tool:
     - Check if the output is **relevant, complete, and non-empty**. 
     - If the response is empty, irrelevant, or inconsistent with the query, you MUST retry the same tool with a clearer instruction (up to 2 retries).
+    - If the output contains an `error` (e.g. the `timeout` or `memory` budget of the execution was exceeded), do not repeat the same instruction: retry with a cheaper one as suggested in the error message (filter and aggregate before joining or plotting, avoid row-wise operations).
     - If after retries the tool still fails, explicitly state in the final answer which dataset could not be retrieved, instead of assuming values.
 2. When multiple tools are required:
     - Do not summarize until **both outputs are valid**.
@@ -150,19 +151,19 @@ Here is an example of expense dataset what one row of the data looks like in jso
 
 <column data type>
 {{{{
-    "Region": "String",
-    "Country": "String",
-    "Category": "String",
-    "Brand": "String",
+    "Region": "Categorical",
+    "Country": "Categorical",
+    "Category": "Categorical",
+    "Brand": "Categorical",
     "Year": "Integer", 
     "Month": "Integer",
-    "Tier 1": "String",
-    "Tier 2": "String",
-    "Tier 3": "String",
-    "Expense Status": "String",
-    "Pending At": "String",
-    "Expense Logged by": "String",
-    "Audit Status": "String",
+    "Tier 1": "Categorical",
+    "Tier 2": "Categorical",
+    "Tier 3": "Categorical",
+    "Expense Status": "Categorical",
+    "Pending At": "Categorical",
+    "Expense Logged by": "Categorical",
+    "Audit Status": "Categorical",
     "Audit Comments": "String",
     "Pep Expense": "Integer",
     "Bottler Expense": "Integer",
@@ -356,14 +357,14 @@ Here is an example of what one row of the data looks like in json format but I w
 
 <column data type>
 {{{{
-    "Region": "String",
-    "Country": "String",
+    "Region": "Categorical",
+    "Country": "Categorical",
     "Year": "Integer",
-    "Category": "String",
-    "Brand": "String",
-    "Tier 1": "String",
-    "Tier 2": "String",
-    "Tier 3": "String",
+    "Category": "Categorical",
+    "Brand": "Categorical",
+    "Tier 1": "Categorical",
+    "Tier 2": "Categorical",
+    "Tier 3": "Categorical",
     "Pep Budget": "Integer",
     "Bottler Budget": "Integer",
     "Total Budget": "Integer"
@@ -630,3 +631,217 @@ When chart/figure is provided ensure that the numbers are also mentioned in the
     2. Verify that every number, metric, or dataframe mentioned in <answer> is referenced via `{{{{answer_dict["..."]}}}}`.  
     3. If any value in <answer> is not linked to `answer_dict`, regenerate the output until the rule is satisfied.
 """
+
+# Appended to insight_agent_prompt when the parallel Expense/Budget tool is enabled
+insight_agent_parallel_tools_prompt = """
+[PARALLEL EXPENSE & BUDGET TOOL]
+You also have access to a FOURTH tool:
+4. analyze_expense_and_budget_data(expense_query, budget_query) → Runs the Expense Tool and the Budget Tool at the same time
+    - Whenever a query needs BOTH the expense and the budget dataset (comparisons, variance, overspending, plan vs actual), call this tool ONCE instead of calling analyze_expense_data and then analyze_budget_data.
+    - Pass the structured expense subtask as expense_query and the structured budget subtask as budget_query.
+    - Its output contains "expense_output" and "budget_output", each with the approach, answer and figure of the corresponding tool.
+    - Then call graph_merger_tool with both outputs, exactly as you would after calling the two tools one by one.
+"""
+
+# Budget vs Actual Tool (joined expense/budget fact table, see helpers.build_budget_vs_actual)
+insight_agent_budget_vs_actual_tool_prompt = """
+You are Budget vs Actual Tool of AI Insight Agent. Following are the details on the dataset and the instructions to be followed while answering the question.
+
+[BUDGET VS ACTUAL DATASET DETAILS]
+The dataset joins the expense dataset with the budget dataset. It has one row per "Region", "Country", "Category", "Brand", "Year", "Tier 1", "Tier 2", "Tier 3" cut present in either of them. Here is an example of what one row of the data looks like in json format but I will provide you with first 5 rows of the dataframe inside <data> tags.also you will receive data type of each column in <column data type> tags:
+{{{{
+    "Region": "LAB Mexico",
+    "Country": "Mexico",
+    "Category": "CSD",
+    "Brand": "Pepsi",
+    "Year": 2025,
+    "Tier 1": "Pull-Non-Working",
+    "Tier 2": "Ad Production",
+    "Tier 3": "Digital Ad Production",
+    "Pep Expense": 120000,
+    "Bottler Expense": 60000,
+    "Total Expense": 180000,
+    "Approved Expense": 150000,
+    "Pep Budget": 100000,
+    "Bottler Budget": 50000,
+    "Total Budget": 150000,
+    "Variance": 30000,
+    "Variance %": 20.0,
+    "Utilization %": 120.0
+}}}}
+<data>
+{budget_vs_actual_df}
+</data>
+
+<column data type>
+{{{{
+    "Region": "Categorical",
+    "Country": "Categorical",
+    "Category": "Categorical",
+    "Brand": "Categorical",
+    "Year": "Integer",
+    "Tier 1": "Categorical",
+    "Tier 2": "Categorical",
+    "Tier 3": "Categorical",
+    "Pep Expense": "Integer",
+    "Bottler Expense": "Integer",
+    "Total Expense": "Integer",
+    "Approved Expense": "Integer",
+    "Pep Budget": "Integer",
+    "Bottler Budget": "Integer",
+    "Total Budget": "Integer",
+    "Variance": "Integer",
+    "Variance %": "Float",
+    "Utilization %": "Float"
+}}}}
+</column data type>
+
+Some key things to note about the data:
+- "Region", "Country", "Category", "Brand", "Year", "Tier 1", "Tier 2", "Tier 3" have the same meaning and values as in the expense and budget datasets. User can sometimes refer the countries as markets. When user mentions market, you should consider "Country" column.
+- The data is yearly. There is no "Month" column because budgets are allocated per year.
+- "Pep Expense", "Bottler Expense", "Total Expense" are the sums of the expenses of the cut (all expense statuses). "Approved Expense" is the part of "Total Expense" whose "Expense Status" is 'Approved'.
+- "Pep Budget", "Bottler Budget", "Total Budget" are the budgets of the cut. "Total Budget" column can also be referred to as "Budget" by user.
+- A cut without expenses has 0 expense columns, a cut without budget has 0 budget columns.
+- "Variance" is "Total Expense" - "Total Budget". A positive variance is overspending, a negative variance is underspending.
+- "Variance %" is "Variance" / "Total Budget" * 100 and "Utilization %" is "Total Expense" / "Total Budget" * 100. They are empty (NaN) when "Total Budget" is 0.
+- "Variance %" and "Utilization %" must never be summed or averaged across rows. After filtering and grouping, sum "Total Expense" and "Total Budget" and compute them again from the sums.
+
+To answer the query which Insight Agent has asked for, first think through your approach inside <approach> tags. Break down the steps you
+will need to take and consider which columns of the data will be most relevant. Here is an example:
+<approach>
+To answer this question, I will need to:
+1. Filter the rows to the requested Country, Brand, Year and Tier.
+2. Sum "Total Expense" and "Total Budget" per requested dimension.
+3. Recompute the variance and utilization from the sums.
+4. Identify the items which are over or under budget.
+</approach>
+
+Then, write the Python code needed to analyze the data and calculate the final answer inside <code> tags. Always assume input dataframe as 'df'. Do not assume or generate any sample data. 
+Be sure to include any necessary data manipulation, aggregations, filtering, etc. Return only the Python code without any explanation or markdown formatting.
+In the code, before comparing any string column in the dataset with a user-provided value, first normalize both by:
+1. Stripping leading/trailing spaces.
+2. Converting them to either all uppercase or all lowercase. (Use the normalized values for comparison to prevent mismatches caused by case differences.)
+3. Always use Pandas `.sum()`, `.mean()`, or other aggregation functions instead of concatenating strings.
+4. Never treat numeric columns as strings.
+5. For the integer or float columns, I have provided the values in correct format. Do not apply any conversion on top of them.
+
+Generate Python code using Plotly Express (not matplotlib or seaborn) to create an appropriate chart to visualize the relevant data and support your answer. Always make an effort to provide a Plotly graph wherever possible. The user typically likes to visualize results.
+For example, if the user is asking which 'Tier 2' items overspent, then a relevant chart can be a grouped bar chart showing "Total Expense" and "Total Budget" for each 'Tier 2' item arranged in decreasing order of variance.
+Specify the chart code inside <chart> tags.
+
+When working with dates:
+Always convert dates to datetime using pd.to_datetime() with explicit format
+*When concatenating year, month, or day columns to form a date string, first cast each column to string using astype(str) before concatenating to avoid type errors*
+*The dataset contains a Year column but does not contain a Date column by default.Whenever a calculation requires year-based grouping or filtering, use the Year column directly. 
+Do not attempt to reference a Date column unless explicitly created in the code from Year and Month.*
+*If asked about the current year in the context of the dataset: Do not assume the actual calendar year.If unsure or ambiguous, determine the maximum year value from the Year column 
+in the dataset and consider that as the "latest" or "current" year for calculations and reporting.*
+For grouping by month, use dt.strftime('%Y-%m') instead of dt.to_period()
+Sort date-based results chronologically before plotting
+The visualization code should follow these guidelines:
+
+Start with these required imports:
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+The chart object must be named fig
+
+Use standard chart setup:
+Always include a clear chart title, x-axis label, and y-axis label (via labels or update_layout).
+For large numbers on the y-axis, format with K/M suffixes using:
+fig.update_layout(yaxis_tickformat=",.0s")
+Use update_layout for better styling:
+fig.update_layout(
+    template="plotly_white",
+    xaxis_title="...",
+    yaxis_title="...",
+    title="..."
+)
+
+Add text labels directly on the chart:
+For bar/line charts → text=... in px.bar() or px.line()
+Format numbers in the text labels with `$` symbol and comma separators.
+Then format text position:
+fig.update_traces(textposition="auto")
+
+For time-based charts:
+Use string dates on x-axis (converted using strftime)
+Use px.line() with markers enabled (markers=True).
+Ensure chronological order on the x-axis.
+
+For rankings (e.g., top N categories):
+Use px.bar() with categories sorted in descending order.
+
+For comparisons:
+Use px.bar() (grouped or stacked) or px.box().
+
+For distributions:
+Use px.histogram() or px.density_contour() / px.density_heatmap()
+
+Return only the Python code without any explanation or markdown formatting.
+
+⚠️ IMPORTANT INSTRUCTIONS ABOUT NUMBERS (In writing Python Code for generating answer and generating graph):
+1. Always treat numerical values as **numeric types**, not strings.
+2. Do not concatenate numbers or output them as continuous strings.
+3. When grouping or summing, use proper numeric operations (e.g., sum, mean, etc.), never string concatenation.
+4. Output numbers without extra commas inside the value (e.g., use 105123 not 1,05,123 or "105123").
+5. If you output JSON, ensure numbers are written as numbers, not strings:
+   ✅ {{{{"value": 105123}}}}
+   ❌ {{{{"value": "105123"}}}}
+6. For the numerical values for the expense, budget and "Variance" columns do not provide any decimals values. It must be integer. 
+7. For the numerical values for percentages ("Variance %", "Utilization %") provide values upto 2 decimals.
+
+Finally, provide the answer to the question in natural language inside <answer> tags. 
+When chart/figure is provided ensure that the numbers are also mentioned in the final answer. This will help user to better interpret the graph.
+
+[**CRITICAL**] For <code> tags:
+    - You must always create a Python dictionary named `answer_dict` (keys in snake_case).
+    - Values must be plain int/float/pandas DataFrame.  
+    - Example: answer_dict = {{{{"total_expense": int(result_df["Total Expense"].sum()), "total_budget": int(result_df["Total Budget"].sum()), "variance_pct": float(variance_pct), "output_df": result_df}}}}
+    - Never provide the code for chart/visualization within <code> tags. It must always be within <chart> tags.
+
+[**CRITICAL**] For <answer> tags:
+    - Every number, metric, or dataframe mentioned in <answer> must be referenced **directly from `answer_dict` inside <code>**.
+    - You must use the explicit form: {{{{answer_dict["key_name"]}}}} where `key_name` exists inside answer_dict.
+    - Example: The expenses for Mexico in 2025 are {{{{answer_dict["total_expense"]}}}} against a budget of {{{{answer_dict["total_budget"]}}}}.
+    - If you need to show a dataframe, reference it as: The detailed breakdown is available in {{{{answer_dict["output_df"]}}}}.
+    - Do NOT hardcode values or invent placeholders like value1, value2, etc.
+    - Any <answer> without explicit references to `answer_dict` is invalid and must be regenerated.
+
+[**MANDATORY SELF-CHECK BEFORE FINAL OUTPUT**]:
+    1. Verify that `answer_dict` exists in <code> and contains all required keys.  
+    2. Verify that every number, metric, or dataframe mentioned in <answer> is referenced via `{{{{answer_dict["..."]}}}}`.  
+    3. If any value in <answer> is not linked to `answer_dict`, regenerate the output until the rule is satisfied.
+"""
+
+# Appended to the Insight Agent prompt
+insight_agent_budget_vs_actual_prompt = """
+[BUDGET VS ACTUAL TOOL]
+You also have access to the analyze_budget_vs_actual(query) tool → Works on the BUDGET VS ACTUAL dataset, the expense dataset already joined with the budget dataset per Region, Country, Category, Brand, Year, Tier 1, Tier 2 and Tier 3, with the variance and the utilization of the budget.
+    - Example columns: Region, Country, Category, Brand, Year, Tier 1, Tier 2, Tier 3, Pep Expense, Bottler Expense, Total Expense, Approved Expense, Pep Budget, Bottler Budget, Total Budget, Variance, Variance %, Utilization %
+    - Whenever a query compares expenses with budgets (variance, overspending, underspending, utilization, plan vs actual) on these columns, call this tool ONCE instead of the Expense Tool, Budget Tool and Graph Merger sequence. Its output is final, do not call graph_merger_tool after it.
+    - The data is yearly: if the expense side of the comparison needs a month filter (e.g. "till July") or any other expense column (e.g. "Expense Logged by", "Audit Status"), use the Expense Tool, Budget Tool and Graph Merger sequence instead.
+"""
+
+# Appended to the Expense, Budget and Budget vs Actual tool prompts
+insight_agent_categorical_prompt = """
+[CATEGORICAL COLUMNS]
+The columns with the "Categorical" data type are pandas categoricals of strings. They are filtered, compared and grouped like strings (==, isin, .str accessors, groupby, sort_values), with these differences:
+- .min() and .max() of the labels raise "Categorical is not ordered". Convert first, e.g. df["Country"].astype(str).max().
+- Assigning a label which does not exist in the column yet (e.g. df.loc[mask, "Tier 2"] = "Other", .fillna("Unknown"), .replace(...)) raises "Cannot setitem on a Categorical with a new category". Convert the column with .astype(str) before assigning.
+- groupby and pivot_table only return the combinations present in the data, and value_counts only returns labels with at least one row.
+- Do not convert these columns to strings for anything else, filtering and grouping them as they are is faster.
+"""
+
+# Appended to the Expense and Budget tool prompts
+insight_agent_cube_prompt = """
+[AGGREGATE CUBE]
+Besides 'df', the code can use `cube`, a pre-aggregated version of 'df' holding the sums of the measure columns {measures} (plus "Rows", the number of records) for every combination of the dimension columns {dimensions}.
+- Whenever the question only needs sums or record counts of these measures filtered and/or grouped by these dimensions, use `cube.query(by=[...], filters={{{{...}}}})` instead of filtering and grouping 'df'. It returns the same numbers without scanning the dataset.
+    - `by`: list of dimension columns to group by. The result is a DataFrame with these columns and the measure columns.
+    - `filters`: dict of dimension column → value or list of values. String values are matched ignoring case and surrounding spaces.
+    - Without `by`, the result is a pandas Series of totals indexed by measure column.
+    - Example: cube.query(by=["Tier 1"], filters={{{{"Country": "Brazil", "Year": [2024, 2025]}}}})
+- For anything else (ratios of individual records, text columns, non-dimension columns) use 'df'.
+"""
@@ -0,0 +1,207 @@
+# Import Libraries
+import atexit
+import itertools
+import threading
+import time
+import traceback
+from collections import OrderedDict, deque
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobHandle:
+    """
+    One background job (e.g. an agent run for a chat question). The job function
+    reports progress with `emit`, the UI polls `status`/`events` and may `cancel`.
+    Cancellation is cooperative: queued jobs never start, running jobs stop at their
+    next `emit`/`check_cancelled`.
+    """
+
+    def __init__(self, job_id, session_id, fn):
+        self.job_id = job_id
+        self.session_id = session_id
+        self.fn = fn
+        self.state = "queued"  # queued -> running -> done / failed / cancelled
+        self.events = []
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+
+    def emit(self, event):
+        """Append a progress event (raises JobCancelled once the job is cancelled)."""
+        self.check_cancelled()
+        self.events.append(event)
+
+    def check_cancelled(self):
+        if self._cancel_event.is_set():
+            raise JobCancelled(f"Job {self.job_id} was cancelled")
+
+    def cancel(self):
+        self._cancel_event.set()
+
+    @property
+    def cancelled(self):
+        return self._cancel_event.is_set()
+
+    @property
+    def finished(self):
+        return self.state in ("done", "failed", "cancelled")
+
+    def status(self):
+        return {
+            "job_id": self.job_id,
+            "session_id": self.session_id,
+            "state": self.state,
+            "events": len(self.events),
+            "error": self.error,
+            "queued_seconds": (self.started_at or time.time()) - self.created_at,
+            "run_seconds": (
+                (self.finished_at or time.time()) - self.started_at
+                if self.started_at
+                else None
+            ),
+        }
+
+
+class JobQueue:
+    """
+    Bounded pool of worker threads running jobs submitted per session.
+    Sessions are served round robin (one job per session in turn), so a session with
+    many queued jobs cannot starve the others, and each session may only have
+    `max_pending_per_session` unfinished jobs.
+    """
+
+    def __init__(self, n_workers=4, max_pending_per_session=1, max_finished=256):
+        self.n_workers = n_workers
+        self.max_pending_per_session = max_pending_per_session
+        self.max_finished = max_finished
+        self._pending = OrderedDict()  # session id -> deque of queued jobs
+        self._jobs = OrderedDict()  # job id -> JobHandle
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._closed = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            for i in range(n_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, session_id, fn):
+        """
+        Queue `fn(job)` for `session_id` and return its JobHandle. Raises RuntimeError
+        when the session already has `max_pending_per_session` unfinished (and not
+        cancelled) jobs.
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Job queue is closed")
+            unfinished = sum(
+                1
+                for job in self._jobs.values()
+                if job.session_id == session_id and not job.finished
+                # Cancelled jobs only linger until their next emit / dequeue
+                and not job.cancelled
+            )
+            if unfinished >= self.max_pending_per_session:
+                raise RuntimeError(
+                    f"Session already has {unfinished} jobs in progress, wait for "
+                    "them to finish or cancel them"
+                )
+            job = JobHandle(f"job-{next(self._ids)}", session_id, fn)
+            self._jobs[job.job_id] = job
+            self._pending.setdefault(session_id, deque()).append(job)
+            self._evict_finished()
+            self._condition.notify()
+        return job
+
+    def get(self, job_id):
+        with self._condition:
+            return self._jobs.get(job_id)
+
+    def cancel_session(self, session_id):
+        """Cancel every unfinished job of `session_id` (e.g. on chat reset)."""
+        with self._condition:
+            for job in self._jobs.values():
+                if job.session_id == session_id and not job.finished:
+                    job.cancel()
+
+    def get_metrics(self):
+        with self._condition:
+            states = [job.state for job in self._jobs.values()]
+        return {state: states.count(state) for state in set(states)}
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            for job in self._jobs.values():
+                if not job.finished:
+                    job.cancel()
+            self._condition.notify_all()
+
+    def _next_job(self):
+        # Round robin: take the head job of the first session, then move the session
+        # to the back of the line
+        while self._pending:
+            session_id, jobs = next(iter(self._pending.items()))
+            job = jobs.popleft()
+            if jobs:
+                self._pending.move_to_end(session_id)
+            else:
+                del self._pending[session_id]
+            if job.cancelled:
+                job.state = "cancelled"
+                job.finished_at = time.time()
+                continue
+            return job
+        return None
+
+    def _work(self):
+        while True:
+            with self._condition:
+                job = self._next_job()
+                while job is None and not self._closed:
+                    self._condition.wait()
+                    job = self._next_job()
+                if job is None:
+                    return
+                job.state = "running"
+                job.started_at = time.time()
+            try:
+                job.result = job.fn(job)
+                job.state = "cancelled" if job.cancelled else "done"
+            except JobCancelled:
+                job.state = "cancelled"
+            except Exception as e:
+                print(f"Job {job.job_id} failed: {e} \n{traceback.format_exc()}")
+                job.error = str(e)
+                job.state = "failed"
+            job.finished_at = time.time()
+
+    def _evict_finished(self):
+        # Keep only the most recent finished jobs
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+# Process-wide queue (see start_job_queue)
+_job_queue = None
+_job_queue_lock = threading.Lock()
+
+
+def start_job_queue(n_workers=4, max_pending_per_session=1):
+    """Start the process-wide job queue (once) and return it."""
+    global _job_queue
+    with _job_queue_lock:
+        if _job_queue is None:
+            _job_queue = JobQueue(
+                n_workers=n_workers, max_pending_per_session=max_pending_per_session
+            )
+            atexit.register(_job_queue.close)
+    return _job_queue
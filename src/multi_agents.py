@@ -2,6 +2,7 @@
 import warnings
 
 warnings.filterwarnings("ignore")
+import asyncio
 import functools
 import traceback
 import os
@@ -11,11 +12,15 @@ from typing import TypedDict, Annotated
 from typing import Dict, Any
 import re
 import copy
+import time
+import threading
+from collections import OrderedDict, deque
 
 # LangGraph imports
 from langgraph.graph import StateGraph, END
 from langgraph.checkpoint.memory import MemorySaver
 from langgraph.graph.message import add_messages
+from langgraph.config import get_stream_writer
 
 # LangChain imports
 from langchain_core.messages import (
@@ -31,7 +36,9 @@ from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder
 from langchain_core.tools import tool
 from langchain_openai import ChatOpenAI
 from langchain.memory import ConversationBufferMemory, ConversationSummaryBufferMemory
-from langchain_core.tools import Tool
+from langchain_core.tools import Tool, StructuredTool
+from langchain_core.runnables import RunnableLambda
+from langchain_core.runnables.config import ContextThreadPoolExecutor
 from langchain.agents import create_openai_functions_agent, AgentExecutor
 from langchain.callbacks.base import BaseCallbackHandler
 
@@ -42,12 +49,25 @@ from supervisor import (
     tier_mapping_system_prompt,
     tier_mapping_user_prompt,
 )
-from helpers import execute_analysis
+from helpers import (
+    execute_analysis,
+    execution_cancel_check,
+    dataset_fingerprint,
+    schema_fingerprint,
+    build_budget_vs_actual,
+)
+from response_cache import get_response_cache
+from aggregates import get_cube
 from insight_prompt import (
     insight_agent_prompt,
     insight_agent_expense_tool_prompt,
     insight_agent_budget_tool_prompt,
     insight_agent_graph_merger_tool_prompt,
+    insight_agent_parallel_tools_prompt,
+    insight_agent_cube_prompt,
+    insight_agent_categorical_prompt,
+    insight_agent_budget_vs_actual_tool_prompt,
+    insight_agent_budget_vs_actual_prompt,
 )
 
 
@@ -62,14 +82,68 @@ def extract_content_within_tag(text: str, tag: str) -> str:
     return text.strip()
 
 
+class AnswerStream:
+    """
+    Tag-aware buffer over the tokens of the final answer: text inside <answer> is
+    released as it arrives (holding back a possibly incomplete closing tag), the
+    <graph> paths only once their tag is closed. `feed` returns the new
+    ("answer", text) and ("graphs", [paths]) events.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.tag = None
+
+    def feed(self, token):
+        self.buffer += token
+        events = []
+        while self.buffer:
+            if self.tag is None:
+                start = self.buffer.find("<")
+                end = self.buffer.find(">", start)
+                if start == -1:
+                    self.buffer = ""
+                if start == -1 or end == -1:
+                    break
+                name = self.buffer[start + 1 : end].strip()
+                self.buffer = self.buffer[end + 1 :]
+                if name in ("answer", "graph"):
+                    self.tag = name
+                continue
+            closing_tag = f"</{self.tag}>"
+            end = self.buffer.find(closing_tag)
+            if end == -1:
+                if self.tag == "answer":
+                    keep = next(
+                        n
+                        for n in range(len(closing_tag) - 1, -1, -1)
+                        if self.buffer.endswith(closing_tag[:n])
+                    )
+                    text = self.buffer[: len(self.buffer) - keep]
+                    if text:
+                        events.append(("answer", text))
+                    self.buffer = self.buffer[len(text) :]
+                break
+            content = self.buffer[:end]
+            if self.tag == "answer" and content:
+                events.append(("answer", content))
+            elif self.tag == "graph":
+                events.append(
+                    ("graphs", [g.strip() for g in content.split("|") if ".json" in g])
+                )
+            self.buffer = self.buffer[end + len(closing_tag) :]
+            self.tag = None
+        return events
+
+
 def get_string_formatted_tier_mapping(df, tier_1_col, tier_2_col, tier_3_col):
     final_str = ""
-    for tier_1_item, tier_1_grp in df.groupby(tier_1_col):
+    for tier_1_item, tier_1_grp in df.groupby(tier_1_col, observed=True):
         if final_str == "":
             final_str = f"- {tier_1_item}"
         else:
             final_str = f"{final_str}\n- {tier_1_item}"
-        for tier_2_item, tier_2_grp in tier_1_grp.groupby(tier_2_col):
+        for tier_2_item, tier_2_grp in tier_1_grp.groupby(tier_2_col, observed=True):
             final_str = f"{final_str}\n\t- {tier_2_item}"
             for _, row in tier_2_grp.iterrows():
                 final_str = f"{final_str}\n\t\t- {row[tier_3_col]}"
@@ -80,8 +154,48 @@ def get_string_formatted_tier_mapping(df, tier_1_col, tier_2_col, tier_3_col):
 # Custom Callback for Step Tracing
 # ------------------------------
 class StepRecorder(BaseCallbackHandler):
-    def __init__(self):
+    """
+    Records the Insight Agent steps. When run inside the workflow graph, every step is
+    also pushed to the graph's "custom" stream as {"agent", "status", "step"}
+    ("started"/"finished" tool steps, "answered" final step) as it happens, and so
+    are the tokens of the final answer ("token" with the new <answer> text, "graphs"
+    once the <graph> paths are complete, see AnswerStream).
+    `check_cancelled()` (e.g. JobHandle.check_cancelled) is called before every LLM
+    call, tool call and streamed token, so a cancelled job stops at the next one.
+    """
+
+    # Called in the caller's thread (also for async runs), steps stay ordered
+    run_inline = True
+    # Exceptions raised in the callbacks (JobCancelled) abort the run
+    raise_error = True
+
+    def __init__(self, agent="Insight Agent", check_cancelled=None):
         self.steps = []
+        self.tool_runs = set()
+        # run id -> parent run id, to tell the agent's own LLM calls from the tools' ones
+        self.parent_runs = {}
+        self.answer_streams = {}
+        self.agent = agent
+        self.check_cancelled = check_cancelled
+        try:
+            self.writer = get_stream_writer()
+        except RuntimeError:
+            # Not run inside a graph (e.g. insight_step called directly)
+            self.writer = None
+
+    def cancel_point(self):
+        if self.check_cancelled is not None:
+            self.check_cancelled()
+
+    def on_llm_start(self, serialized, prompts, **kwargs):
+        self.cancel_point()
+
+    def on_chat_model_start(self, serialized, messages, **kwargs):
+        self.cancel_point()
+
+    def push(self, status, step):
+        if self.writer is not None:
+            self.writer({"agent": self.agent, "status": status, "step": dict(step)})
 
     def on_agent_action(self, action, **kwargs):
         self.steps.append(
@@ -91,13 +205,230 @@ class StepRecorder(BaseCallbackHandler):
                 "tool_input": action.tool_input,
             }
         )
+        self.push("started", self.steps[-1])
+
+    def on_chain_start(
+        self, serialized, inputs, run_id=None, parent_run_id=None, **kwargs
+    ):
+        self.parent_runs[run_id] = parent_run_id
 
-    def on_tool_end(self, output, **kwargs):
+    def on_tool_start(
+        self, serialized, input_str, run_id=None, parent_run_id=None, **kwargs
+    ):
+        self.cancel_point()
+        self.parent_runs[run_id] = parent_run_id
+        self.tool_runs.add(run_id)
+
+    def in_tool(self, run_id):
+        while run_id is not None:
+            if run_id in self.tool_runs:
+                return True
+            run_id = self.parent_runs.get(run_id)
+        return False
+
+    def on_llm_new_token(self, token, run_id=None, parent_run_id=None, **kwargs):
+        # Also stops a streamed call half way
+        self.cancel_point()
+        # Only the agent's own calls write the final answer
+        if self.writer is None or self.in_tool(parent_run_id):
+            return
+        stream = self.answer_streams.setdefault(run_id, AnswerStream())
+        for kind, value in stream.feed(token):
+            if kind == "answer":
+                self.push("token", {"answer": value})
+            else:
+                self.push("graphs", {"graphs": value})
+
+    def on_tool_end(self, output, parent_run_id=None, **kwargs):
+        # Tools invoked from inside a tool (execute_analysis) are not agent steps
+        if parent_run_id in self.tool_runs:
+            return
         if self.steps:
             self.steps[-1]["observation"] = output
+            self.push("finished", self.steps[-1])
 
     def on_agent_finish(self, finish, **kwargs):
         self.steps.append({"final_answer": finish.log})
+        self.push("answered", self.steps[-1])
+
+
+# ------------------------------
+# Shared (process-wide) caches
+# ------------------------------
+def get_tool_prompt_template(system_prompt):
+    # System prompt contains the data description, the question goes in "messages"
+    return ChatPromptTemplate.from_messages(
+        [
+            ("system", system_prompt),
+            MessagesPlaceholder(variable_name="messages"),
+        ]
+    )
+
+
+# Dataset independent prompt templates, compiled once per process
+graph_merger_tool_prompt_template = get_tool_prompt_template(
+    insight_agent_graph_merger_tool_prompt
+)
+tier_mapping_prompt_template = ChatPromptTemplate.from_messages(
+    [
+        ("system", tier_mapping_system_prompt.strip()),  # System message
+        ("human", tier_mapping_user_prompt.strip()),  # Human question placeholder
+    ]
+)
+
+
+@functools.lru_cache(maxsize=8)
+def get_llm(model_name, api_key):
+    # ChatOpenAI clients are stateless and thread-safe, so one per model/key is enough
+    return ChatOpenAI(model=model_name, api_key=api_key, temperature=0)
+
+
+def build_supervisor_chain(llm):
+    return (
+        supervisor_prompt
+        | llm.bind_functions(functions=[supervisor_function_def], function_call="route")
+        | JsonOutputFunctionsParser()
+    )
+
+
+@functools.lru_cache(maxsize=8)
+def get_supervisor_chain(model_name, api_key):
+    return build_supervisor_chain(get_llm(model_name, api_key))
+
+
+def get_cube_prompt(df):
+    """Describe the aggregate cube exposed as `cube` to the code of the analysis tools."""
+    cube = get_cube(df, dataset_fingerprint(df))
+    return insight_agent_cube_prompt.format(
+        measures=", ".join(f'"{c}"' for c in cube.measures),
+        dimensions=", ".join(f'"{c}"' for c in cube.dimensions),
+    )
+
+
+dataset_artefacts_cache = OrderedDict()
+dataset_artefacts_cache_size = 32
+dataset_artefacts_lock = threading.Lock()
+
+
+def get_dataset_artefacts(expense_dataset, budget_dataset, model_name):
+    """
+    Dataset dependent artefacts (budget vs actual dataset, formatted prompts, compiled
+    tool prompt templates and tier mapping string), cached by
+    dataset fingerprint and model name so that new chat sessions on the same data skip
+    the prompt formatting and tier hierarchy computation.
+    """
+    key = (
+        dataset_fingerprint(expense_dataset),
+        dataset_fingerprint(budget_dataset),
+        model_name,
+    )
+    with dataset_artefacts_lock:
+        if key in dataset_artefacts_cache:
+            dataset_artefacts_cache.move_to_end(key)
+            return dataset_artefacts_cache[key]
+    # Expenses joined with budgets, computed once per dataset pair
+    budget_vs_actual_dataset = build_budget_vs_actual(expense_dataset, budget_dataset)
+    artefacts = {
+        "budget_vs_actual_dataset": budget_vs_actual_dataset,
+        "insight_agent_prompt": insight_agent_prompt.format(
+            expense_df=expense_dataset.head().to_string(),
+            budget_df=budget_dataset.head().to_string(),
+        ),
+        "insight_agent_expense_tool_prompt": insight_agent_expense_tool_prompt.format(
+            expense_df=expense_dataset.head().to_string()
+        )
+        + insight_agent_categorical_prompt
+        + get_cube_prompt(expense_dataset),
+        "insight_agent_budget_tool_prompt": insight_agent_budget_tool_prompt.format(
+            budget_df=budget_dataset.head().to_string()
+        )
+        + insight_agent_categorical_prompt
+        + get_cube_prompt(budget_dataset),
+        "insight_agent_budget_vs_actual_tool_prompt": insight_agent_budget_vs_actual_tool_prompt.format(
+            budget_vs_actual_df=budget_vs_actual_dataset.head().to_string()
+        )
+        + insight_agent_categorical_prompt,
+        # Tier mapping string
+        "tier_mapping_str": get_string_formatted_tier_mapping(
+            pd.concat([expense_dataset, budget_dataset]).drop_duplicates(
+                subset=["Tier 1", "Tier 2", "Tier 3"]
+            ),
+            tier_1_col="Tier 1",
+            tier_2_col="Tier 2",
+            tier_3_col="Tier 3",
+        ),
+    }
+    # Compiled tool prompt templates
+    artefacts["expense_tool_prompt_template"] = get_tool_prompt_template(
+        artefacts["insight_agent_expense_tool_prompt"]
+    )
+    artefacts["budget_tool_prompt_template"] = get_tool_prompt_template(
+        artefacts["insight_agent_budget_tool_prompt"]
+    )
+    artefacts["budget_vs_actual_tool_prompt_template"] = get_tool_prompt_template(
+        artefacts["insight_agent_budget_vs_actual_tool_prompt"]
+    )
+    with dataset_artefacts_lock:
+        dataset_artefacts_cache[key] = artefacts
+        while len(dataset_artefacts_cache) > dataset_artefacts_cache_size:
+            dataset_artefacts_cache.popitem(last=False)
+    return artefacts
+
+
+@functools.lru_cache(maxsize=1)
+def get_compiled_workflow_graph():
+    """
+    Compile the supervisor/insight workflow once per process.
+    Nodes are dataset and session independent: they dispatch to the MultiAgentSystem
+    passed in config["configurable"]["multi_agent_system"]. An optional
+    config["configurable"]["check_cancelled"] stops the run of a cancelled job before
+    its next LLM/tool call (see StepRecorder).
+    """
+
+    def check_cancelled(config):
+        check = config["configurable"].get("check_cancelled")
+        if check is not None:
+            check()
+        return check
+
+    # Supervisor Agent Node
+    def supervisor_step(state: Dict[str, Any], config):
+        check_cancelled(config)
+        return config["configurable"]["multi_agent_system"].supervisor_step(state)
+
+    async def asupervisor_step(state: Dict[str, Any], config):
+        check_cancelled(config)
+        return await config["configurable"]["multi_agent_system"].asupervisor_step(
+            state
+        )
+
+    # Insight Agent Node
+    def insight_step(state: Dict[str, Any], config):
+        return config["configurable"]["multi_agent_system"].insight_step(
+            state, check_cancelled(config)
+        )
+
+    async def ainsight_step(state: Dict[str, Any], config):
+        return await config["configurable"]["multi_agent_system"].ainsight_step(
+            state, check_cancelled(config)
+        )
+
+    # Build the workflow graph (invoke/stream run the sync nodes, ainvoke/astream the
+    # async ones)
+    workflow = StateGraph(Dict[str, Any])
+    workflow.add_node("Insight Agent", RunnableLambda(insight_step, ainsight_step))
+    workflow.add_node("supervisor", RunnableLambda(supervisor_step, asupervisor_step))
+
+    # Workers always return to supervisor
+    workflow.add_edge("Insight Agent", "supervisor")
+
+    # Supervisor decides the next step
+    # Add conditional edges
+    conditional_map = {"Insight Agent": "Insight Agent", "FINISH": END}
+    workflow.add_conditional_edges("supervisor", lambda x: x["next"], conditional_map)
+    workflow.set_entry_point("supervisor")
+
+    return workflow.compile()
 
 
 class MultiAgentSystem:
@@ -109,45 +440,56 @@ class MultiAgentSystem:
         expense_dataset,
         budget_dataset,
         plot_path,
+        parallel_tools=False,
+        llm=None,
+        response_cache=None,
     ):
-        # Initialise model
-        self.llm = ChatOpenAI(model=model_name, api_key=api_key, temperature=0)
+        # Initialise model (shared across sessions), unless a model is injected
+        self.llm = llm if llm is not None else get_llm(model_name, api_key)
+        self.model_name = model_name
+        # Cache of generated tool responses (shared, persistent by default)
+        self.response_cache = (
+            response_cache if response_cache is not None else get_response_cache()
+        )
+        # Run the Expense and Budget tools concurrently for comparison questions
+        self.parallel_tools = parallel_tools
         # Datasets
         self.expense_dataset = expense_dataset
         self.budget_dataset = budget_dataset
-        self.insight_agent_prompt = insight_agent_prompt.format(
-            expense_df=expense_dataset.head().to_string(),
-            budget_df=budget_dataset.head().to_string(),
-        )
-        self.insight_agent_expense_tool_prompt = (
-            insight_agent_expense_tool_prompt.format(
-                expense_df=expense_dataset.head().to_string()
-            )
-        )
-        self.insight_agent_budget_tool_prompt = insight_agent_budget_tool_prompt.format(
-            budget_df=budget_dataset.head().to_string()
-        )
+        # Prompts, tier mapping string and budget vs actual dataset (shared across
+        # sessions on the same data)
+        artefacts = get_dataset_artefacts(expense_dataset, budget_dataset, model_name)
+        self.budget_vs_actual_dataset = artefacts["budget_vs_actual_dataset"]
+        self.insight_agent_prompt = artefacts["insight_agent_prompt"]
+        self.insight_agent_expense_tool_prompt = artefacts[
+            "insight_agent_expense_tool_prompt"
+        ]
+        self.insight_agent_budget_tool_prompt = artefacts[
+            "insight_agent_budget_tool_prompt"
+        ]
         self.insight_agent_graph_merger_tool_prompt = (
             insight_agent_graph_merger_tool_prompt
         )
         self.tier_mapping_system_prompt = tier_mapping_system_prompt
         self.tier_mapping_user_prompt = tier_mapping_user_prompt
-        # Tier mapping string
-        self.tier_mapping_str = get_string_formatted_tier_mapping(
-            pd.concat([expense_dataset, budget_dataset]).drop_duplicates(
-                subset=["Tier 1", "Tier 2", "Tier 3"]
-            ),
-            tier_1_col="Tier 1",
-            tier_2_col="Tier 2",
-            tier_3_col="Tier 3",
-        )
+        self.tier_mapping_str = artefacts["tier_mapping_str"]
+        # Compiled prompt templates
+        self.expense_tool_prompt_template = artefacts["expense_tool_prompt_template"]
+        self.budget_tool_prompt_template = artefacts["budget_tool_prompt_template"]
+        self.budget_vs_actual_tool_prompt_template = artefacts[
+            "budget_vs_actual_tool_prompt_template"
+        ]
+        self.graph_merger_tool_prompt_template = graph_merger_tool_prompt_template
+        self.tier_mapping_prompt_template = tier_mapping_prompt_template
+        # Per-call tool timings (seconds) of the most recent calls
+        self.tool_timings = deque(maxlen=500)
         # Execute analysis
         self.execute_analysis = execute_analysis
         # Plot path
         # Create folder if not available
         os.makedirs(plot_path, exist_ok=True)
         self.plot_path = plot_path
-        # Initialise memory with summarisation capability
+        # Initialise memory with summarisation capability (the only per-session state)
         # Supervisor Agent Memory
         self.supervisor_agent_memory = ConversationSummaryBufferMemory(
             llm=self.llm,
@@ -164,39 +506,125 @@ class MultiAgentSystem:
         )
         # Supervisor chain
         self.supervisor_chain = (
-            supervisor_prompt
-            | self.llm.bind_functions(
-                functions=[supervisor_function_def], function_call="route"
-            )
-            | JsonOutputFunctionsParser()
+            build_supervisor_chain(llm)
+            if llm is not None
+            else get_supervisor_chain(model_name, api_key)
         )
+        # Insight Agent executor (built on first use, then reused for every question)
+        self.insight_agent_executor = None
+        self.insight_agent_lock = threading.Lock()
         # Initialise graph
         self.graph = self.get_workflow_graph()
 
     # Tools
-    def expense_data_tool(self, query: str) -> Dict[str, Any]:
-        # Prompt template
-        prompt_temp = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    self.insight_agent_expense_tool_prompt,
-                ),  # This contains the data description and the question
-                MessagesPlaceholder(variable_name="messages"),
-            ]
-        )
-        # Invoke LLM
-        result = self.llm.invoke(
-            prompt_temp.invoke({"messages": [HumanMessage(content=query)]})
-        )
+    def run_analysis_tool(self, tool_name, prompt_template, message, input_dict):
+        """
+        Shared path of the analysis tools: ask the LLM for the <approach>/<code>/<chart>/
+        <answer> response (or replay it from the response cache) and run it through
+        execute_analysis, timing both stages.
+        """
+        # Replay a cached response for the same question/tool/schema/model if available
+        cache_key = self.get_analysis_cache_key(tool_name, message, input_dict)
+        start = time.perf_counter()
+        response_text = self.response_cache.get(cache_key)
+        cache_hit = response_text is not None
+        if not cache_hit:
+            # Invoke LLM
+            result = self.llm.invoke(
+                prompt_template.invoke({"messages": [HumanMessage(content=message)]})
+            )
+            response_text = result.content
+        llm_seconds = time.perf_counter() - start
         # Response
+        start = time.perf_counter()
         response = self.execute_analysis.invoke(
+            self.get_execution_input(input_dict, response_text)
+        )
+        execution_seconds = time.perf_counter() - start
+        return self.finish_analysis_tool(
+            tool_name,
+            cache_key,
+            cache_hit,
+            response_text,
+            response,
+            llm_seconds,
+            execution_seconds,
+        )
+
+    async def arun_analysis_tool(self, tool_name, prompt_template, message, input_dict):
+        """Async run_analysis_tool: awaits the LLM, runs the code on a worker thread."""
+        cache_key = self.get_analysis_cache_key(tool_name, message, input_dict)
+        start = time.perf_counter()
+        response_text = self.response_cache.get(cache_key)
+        cache_hit = response_text is not None
+        if not cache_hit:
+            # Invoke LLM
+            result = await self.llm.ainvoke(
+                await prompt_template.ainvoke(
+                    {"messages": [HumanMessage(content=message)]}
+                )
+            )
+            response_text = result.content
+        llm_seconds = time.perf_counter() - start
+        # Response (exec of the generated code is CPU bound, keep it off the event loop)
+        start = time.perf_counter()
+        response = await asyncio.to_thread(
+            self.execute_analysis.invoke,
+            self.get_execution_input(input_dict, response_text),
+        )
+        execution_seconds = time.perf_counter() - start
+        return self.finish_analysis_tool(
+            tool_name,
+            cache_key,
+            cache_hit,
+            response_text,
+            response,
+            llm_seconds,
+            execution_seconds,
+        )
+
+    def get_analysis_cache_key(self, tool_name, message, input_dict):
+        return self.response_cache.make_key(
+            message,
+            tool_name,
+            ",".join(schema_fingerprint(df) for df in input_dict.values()),
+            self.model_name,
+        )
+
+    def get_execution_input(self, input_dict, response_text):
+        return {
+            "input_dict": input_dict,
+            "response_text": response_text,
+            "PLOT_DIR": self.plot_path,
+        }
+
+    def finish_analysis_tool(
+        self,
+        tool_name,
+        cache_key,
+        cache_hit,
+        response_text,
+        response,
+        llm_seconds,
+        execution_seconds,
+    ):
+        # Only responses whose code ran successfully are worth replaying
+        if not cache_hit and response["answer"] is not None:
+            self.response_cache.set(cache_key, tool_name, response_text)
+        self.tool_timings.append(
             {
-                "input_dict": {"df": self.expense_dataset},
-                "response_text": result.content,
-                "PLOT_DIR": self.plot_path,
+                "tool": tool_name,
+                "cache_hit": cache_hit,
+                "llm_seconds": llm_seconds,
+                "execution_seconds": execution_seconds,
             }
         )
+        print(
+            f"{tool_name} timings: LLM {llm_seconds:.2f}s (cache hit: {cache_hit}), execution {execution_seconds:.2f}s"
+        )
+        # The raw answer_dict (may hold DataFrames) is not passed on to the agent, so the
+        # tool observation stays JSON serialisable
+        response.pop("answer_dict", None)
         # Keys present in response (All these extracted from the llm response)
         # approach
         # answer
@@ -205,101 +633,137 @@ class MultiAgentSystem:
         # chart_code
         return response
 
+    def expense_data_tool(self, query: str) -> Dict[str, Any]:
+        return self.run_analysis_tool(
+            "analyze_expense_data",
+            self.expense_tool_prompt_template,
+            query,
+            {"df": self.expense_dataset},
+        )
+
+    async def aexpense_data_tool(self, query: str) -> Dict[str, Any]:
+        return await self.arun_analysis_tool(
+            "analyze_expense_data",
+            self.expense_tool_prompt_template,
+            query,
+            {"df": self.expense_dataset},
+        )
+
     def budget_data_tool(self, query: str) -> Dict[str, Any]:
-        # Prompt template
-        prompt_temp = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    self.insight_agent_budget_tool_prompt,
-                ),  # This contains the data description and the question
-                MessagesPlaceholder(variable_name="messages"),
-            ]
+        return self.run_analysis_tool(
+            "analyze_budget_data",
+            self.budget_tool_prompt_template,
+            query,
+            {"df": self.budget_dataset},
         )
-        # Invoke LLM
-        result = self.llm.invoke(
-            prompt_temp.invoke({"messages": [HumanMessage(content=query)]})
+
+    async def abudget_data_tool(self, query: str) -> Dict[str, Any]:
+        return await self.arun_analysis_tool(
+            "analyze_budget_data",
+            self.budget_tool_prompt_template,
+            query,
+            {"df": self.budget_dataset},
         )
-        # Response
-        response = self.execute_analysis.invoke(
-            {
-                "input_dict": {"df": self.budget_dataset},
-                "response_text": result.content,
-                "PLOT_DIR": self.plot_path,
-            }
+
+    def budget_vs_actual_tool(self, query: str) -> Dict[str, Any]:
+        return self.run_analysis_tool(
+            "analyze_budget_vs_actual",
+            self.budget_vs_actual_tool_prompt_template,
+            query,
+            {"df": self.budget_vs_actual_dataset},
+        )
+
+    async def abudget_vs_actual_tool(self, query: str) -> Dict[str, Any]:
+        return await self.arun_analysis_tool(
+            "analyze_budget_vs_actual",
+            self.budget_vs_actual_tool_prompt_template,
+            query,
+            {"df": self.budget_vs_actual_dataset},
         )
-        # Keys present in response (All these extracted from the llm response)
-        # approach
-        # answer
-        # figure
-        # code
-        # chart_code
-        return response
 
     def graph_merger_tool(self, query: str) -> Dict[str, Any]:
-        # Prompt template
-        prompt_temp = ChatPromptTemplate.from_messages(
-            [
-                (
-                    "system",
-                    self.insight_agent_graph_merger_tool_prompt,
-                ),  # This contains the description
-                MessagesPlaceholder(variable_name="messages"),
-            ]
+        return self.run_analysis_tool(
+            "graph_merger_tool",
+            self.graph_merger_tool_prompt_template,
+            f"Output(s) from Expense/Budget Tool: {query}",
+            {},
+        )
+
+    async def agraph_merger_tool(self, query: str) -> Dict[str, Any]:
+        return await self.arun_analysis_tool(
+            "graph_merger_tool",
+            self.graph_merger_tool_prompt_template,
+            f"Output(s) from Expense/Budget Tool: {query}",
+            {},
+        )
+
+    def expense_and_budget_data_tool(
+        self, expense_query: str, budget_query: str
+    ) -> Dict[str, Any]:
+        # Both tools are independent (LLM round trip + execution), so run them together.
+        # The threads keep the run's context (callbacks, cancellation check)
+        with ContextThreadPoolExecutor(max_workers=2) as executor:
+            expense_future = executor.submit(self.expense_data_tool, expense_query)
+            budget_future = executor.submit(self.budget_data_tool, budget_query)
+            expense_response = expense_future.result()
+            budget_response = budget_future.result()
+        return self.merge_expense_and_budget_responses(
+            expense_response, budget_response
         )
-        # Invoke LLM
+
+    async def aexpense_and_budget_data_tool(
+        self, expense_query: str, budget_query: str
+    ) -> Dict[str, Any]:
+        expense_response, budget_response = await asyncio.gather(
+            self.aexpense_data_tool(expense_query),
+            self.abudget_data_tool(budget_query),
+        )
+        return self.merge_expense_and_budget_responses(
+            expense_response, budget_response
+        )
+
+    def merge_expense_and_budget_responses(self, expense_response, budget_response):
+        # Fan the results back in, keeping the keys used by the other tools
+        return {
+            "approach": f"Expense Tool: {expense_response['approach']}<br>Budget Tool: {budget_response['approach']}",
+            "answer": f"Expense Tool: {expense_response['answer']}<br>Budget Tool: {budget_response['answer']}",
+            "figure": None,
+            "code": None,
+            "chart_code": None,
+            "expense_output": expense_response,
+            "budget_output": budget_response,
+        }
+
+    def extract_tier_hierarchy(self, query):
+        # Invoke the LLM
         result = self.llm.invoke(
-            prompt_temp.invoke(
+            self.tier_mapping_prompt_template.invoke(
                 {
-                    "messages": [
-                        HumanMessage(
-                            content=f"Output(s) from Expense/Budget Tool: {query}"
-                        )
-                    ]
+                    "tier_hierarchy": self.tier_mapping_str,
+                    "user_question": query,
                 }
             )
         )
-        # Response
-        response = self.execute_analysis.invoke(
-            {
-                "input_dict": {},
-                "response_text": result.content,
-                "PLOT_DIR": self.plot_path,
-            }
-        )
-        # Keys present in response (All these extracted from the llm response)
-        # approach
-        # answer
-        # figure
-        # code
-        # chart_code
-        return response
+        return self.parse_tier_hierarchy(result.content)
 
-    def extract_tier_hierarchy(self, query):
-        # Define the prompt with placeholders for variables
-        tier_mapping_prompt = ChatPromptTemplate.from_messages(
-            [
-                ("system", self.tier_mapping_system_prompt.strip()),  # System message
-                (
-                    "human",
-                    self.tier_mapping_user_prompt.strip(),
-                ),  # Human question placeholder
-            ]
-        )
+    async def aextract_tier_hierarchy(self, query):
         # Invoke the LLM
-        result = self.llm.invoke(
-            tier_mapping_prompt.invoke(
+        result = await self.llm.ainvoke(
+            await self.tier_mapping_prompt_template.ainvoke(
                 {
                     "tier_hierarchy": self.tier_mapping_str,
                     "user_question": query,
                 }
             )
         )
+        return self.parse_tier_hierarchy(result.content)
+
+    def parse_tier_hierarchy(self, content):
         # Parse the output
         try:
             # Parse json
             json_input = re.sub(
-                r"^```json\s*|\s*```$", "", result.content.strip(), flags=re.MULTILINE
+                r"^```json\s*|\s*```$", "", content.strip(), flags=re.MULTILINE
             )
             # Get Python dict
             parsed = json.loads(json_input)
@@ -318,6 +782,31 @@ class MultiAgentSystem:
                 "chat_history": chat_history,  # Chat history placeholder
             }
         )
+        # Tier mapping information for the enriched question (agent routing only)
+        tier_mapping_response = None
+        if result["next"] != "SELF_RESPONSE" and result.get("enriched_question"):
+            tier_mapping_response = self.extract_tier_hierarchy(
+                query=result["enriched_question"]
+            )
+        return self.get_supervisor_response(result, tier_mapping_response)
+
+    async def asupervisor_agent(self, query, chat_history):
+        # Invoke chain with enhanced context
+        result = await self.supervisor_chain.ainvoke(
+            {
+                "question": query,  # Human question
+                "chat_history": chat_history,  # Chat history placeholder
+            }
+        )
+        # Tier mapping information for the enriched question (agent routing only)
+        tier_mapping_response = None
+        if result["next"] != "SELF_RESPONSE" and result.get("enriched_question"):
+            tier_mapping_response = await self.aextract_tier_hierarchy(
+                query=result["enriched_question"]
+            )
+        return self.get_supervisor_response(result, tier_mapping_response)
+
+    def get_supervisor_response(self, result, tier_mapping_response):
         if result["next"] == "SELF_RESPONSE":
             # Response provided by supervisor
             if "direct_response" in result:
@@ -359,14 +848,10 @@ class MultiAgentSystem:
                     "type": "no_direct_response",
                 }
         else:
-            # Call the Tier hierarchy extractor
+            # Tier hierarchy extractor output
             tier_mapping_query = result.get("enriched_question")
             # Check for enriched question
             if tier_mapping_query:
-                # Get Tier mapping information
-                tier_mapping_response = self.extract_tier_hierarchy(
-                    query=tier_mapping_query
-                )
                 print("Tier mapping response:")
                 print(tier_mapping_response)
                 print(110 * "-")
@@ -406,145 +891,197 @@ class MultiAgentSystem:
 
     # Agent
     def insight_agent(self):
+        # The executor holds no per-call state (step recording is done through the
+        # callbacks passed at invoke time), so one instance serves every question
+        if self.insight_agent_executor is None:
+            with self.insight_agent_lock:
+                if self.insight_agent_executor is None:
+                    self.insight_agent_executor = self.build_insight_agent()
+        return self.insight_agent_executor
+
+    def build_insight_agent(self):
         # Tools for this insight agent
         expense_tool = Tool.from_function(
             func=self.expense_data_tool,
+            coroutine=self.aexpense_data_tool,
             name="analyze_expense_data",
             description="Analyze expense data (both historical and current year) based on the question.",
         )
         budget_tool = Tool.from_function(
             func=self.budget_data_tool,
+            coroutine=self.abudget_data_tool,
             name="analyze_budget_data",
             description="Analyze budget data based on the question.",
         )
         graph_merge_tool = Tool.from_function(
             func=self.graph_merger_tool,
+            coroutine=self.agraph_merger_tool,
             name="graph_merger_tool",
             description="Combines outputs from Expense and Budget tools into a single merged answer_dict, consolidated insight, and one unified plotly chart.",
         )
+        budget_vs_actual_tool = Tool.from_function(
+            func=self.budget_vs_actual_tool,
+            coroutine=self.abudget_vs_actual_tool,
+            name="analyze_budget_vs_actual",
+            description="Compare expenses with budgets (variance, utilization) in one pass, based on the question.",
+        )
         # Tools
-        tools = [expense_tool, budget_tool, graph_merge_tool]
+        tools = [expense_tool, budget_tool, graph_merge_tool, budget_vs_actual_tool]
+        system_prompt = (
+            self.insight_agent_prompt + insight_agent_budget_vs_actual_prompt
+        )
+        if self.parallel_tools:
+            tools.append(
+                StructuredTool.from_function(
+                    func=self.expense_and_budget_data_tool,
+                    coroutine=self.aexpense_and_budget_data_tool,
+                    name="analyze_expense_and_budget_data",
+                    description="Analyze expense data and budget data at the same time, each based on its own question.",
+                )
+            )
+            system_prompt = system_prompt + insight_agent_parallel_tools_prompt
 
         prompt = ChatPromptTemplate.from_messages(
             [
-                ("system", self.insight_agent_prompt),
+                ("system", system_prompt),
                 MessagesPlaceholder("history"),  # Past user/agent conversation
                 ("human", "{input}"),
                 MessagesPlaceholder("agent_scratchpad"),  # Tool reasoning trace
             ]
         )
-        agent = create_openai_functions_agent(self.llm, tools, prompt)
+        # Streamed, so that the final answer reaches the UI token by token (StepRecorder)
+        agent = create_openai_functions_agent(self.llm.bind(stream=True), tools, prompt)
         return AgentExecutor(
             agent=agent, tools=tools, verbose=True, return_intermediate_steps=True
         )
 
-    # Function to create the workflow graph
-    def get_workflow_graph(
-        self,
-    ):
+    # Supervisor Agent Node
+    def supervisor_step(self, state: Dict[str, Any]):
+        query = self.get_supervisor_query(state)
+        if query is None:
+            print(f"Invalid output received from agent {state['agent']}")
+            return copy.deepcopy(state)
+        # Memory
+        # Messages, truncated/summarized if needed
+        memory_vars = self.supervisor_agent_memory.load_memory_variables({})
+        result = self.supervisor_agent(query, memory_vars["chat_history"])
+        self.remember_supervisor_turn(query, result)
+        return result
 
-        # Supervisor Agent Node
-        def supervisor_step(state: Dict[str, Any]):
-            # When supervisor agent is run
-            if "question" in state:
-                # Memory
-                # Messages, truncated/summarized if needed
-                memory_vars = self.supervisor_agent_memory.load_memory_variables({})
-                result = self.supervisor_agent(
-                    state["question"], memory_vars["chat_history"]
-                )
-                # Add input to supervisor in the memory
-                # Input message
-                self.supervisor_agent_memory.chat_memory.add_user_message(
-                    state["question"]
-                )
-                # Output message
-                self.supervisor_agent_memory.chat_memory.add_ai_message(
-                    result["messages"][0].content
-                )
-            # When graph chain is run
-            elif "output" in state:
-                # Memory
-                # Messages, truncated/summarized if needed
-                memory_vars = self.supervisor_agent_memory.load_memory_variables({})
-                output_from_agent = extract_content_within_tag(
-                    state["output"], "answer"
-                )
-                result = self.supervisor_agent(
-                    f"Final answer by '{state['agent']}' agent: {output_from_agent}",
-                    memory_vars["chat_history"],
-                )
-                # Add output to supervisor in the memory
-                # Input message
-                self.supervisor_agent_memory.chat_memory.add_user_message(
-                    f"Final answer by '{state['agent']}' agent: {output_from_agent}",
-                )
-                # Output message
-                self.supervisor_agent_memory.chat_memory.add_ai_message(
-                    result["messages"][0].content
-                )
-            else:
-                print(f"Invalid output received from agent {state['agent']}")
-                result = copy.deepcopy(state)
-            return result
-
-        # Insight Agent Node
-        def insight_step(state: Dict[str, Any]):
-            question = None
-            # Enriched question
-            if state.get("enriched_question"):
-                question = state["enriched_question"]
-            else:
-                if state.get("result"):
-                    if state["result"].get("enriched_question"):
-                        question = state["result"]["enriched_question"]
-            # If question is not available
-            if question is not None:
-                agent = self.insight_agent()
-                # Memory
-                # Messages, truncated/summarized if needed
-                memory_vars = self.insight_agent_memory.load_memory_variables({})
-                # Attach custom step recorder
-                recorder = StepRecorder()
-                # Invoke the agent
-                result = agent.invoke(
-                    {
-                        "input": f"{question}",
-                        "history": memory_vars["chat_history"],
-                    },
-                    config={"callbacks": [recorder]},
-                )
-                # Add to memory the input and output
-                # Input message
-                self.insight_agent_memory.chat_memory.add_user_message(result["input"])
-                # Output messsage
-                self.insight_agent_memory.chat_memory.add_ai_message(result["output"])
-                result["recorder_steps"] = recorder.steps
-                result["agent"] = "Insight Agent"
-                return result
-            else:
-                print("Insight Agent did not receive the enriched question")
-                result["final_answer"] = (
-                    "I did not receive the question from the Supervisor. I'm unable to provide the answer"
-                )
-                result["agent"] = "Insight Agent"
-                return result
+    async def asupervisor_step(self, state: Dict[str, Any]):
+        query = self.get_supervisor_query(state)
+        if query is None:
+            print(f"Invalid output received from agent {state['agent']}")
+            return copy.deepcopy(state)
+        # Memory
+        # Messages, truncated/summarized if needed
+        memory_vars = self.supervisor_agent_memory.load_memory_variables({})
+        result = await self.asupervisor_agent(query, memory_vars["chat_history"])
+        self.remember_supervisor_turn(query, result)
+        return result
 
-        # Build the workflow graph
-        workflow = StateGraph(Dict[str, Any])
-        workflow.add_node("Insight Agent", insight_step)
-        workflow.add_node("supervisor", supervisor_step)
+    def get_supervisor_query(self, state):
+        # When supervisor agent is run
+        if "question" in state:
+            return state["question"]
+        # When graph chain is run
+        if "output" in state:
+            output_from_agent = extract_content_within_tag(state["output"], "answer")
+            return f"Final answer by '{state['agent']}' agent: {output_from_agent}"
+        return None
 
-        # Workers always return to supervisor
-        workflow.add_edge("Insight Agent", "supervisor")
+    def remember_supervisor_turn(self, query, result):
+        # Add input to supervisor in the memory
+        # Input message
+        self.supervisor_agent_memory.chat_memory.add_user_message(query)
+        # Output message
+        self.supervisor_agent_memory.chat_memory.add_ai_message(
+            result["messages"][0].content
+        )
 
-        # Supervisor decides the next step
-        # Add conditional edges
-        conditional_map = {"Insight Agent": "Insight Agent", "FINISH": END}
-        workflow.add_conditional_edges(
-            "supervisor", lambda x: x["next"], conditional_map
+    # Insight Agent Node
+    def insight_step(self, state: Dict[str, Any], check_cancelled=None):
+        question = self.get_insight_question(state)
+        # If question is not available
+        if question is None:
+            return self.get_missing_question_result()
+        agent = self.insight_agent()
+        # Memory
+        # Messages, truncated/summarized if needed
+        memory_vars = self.insight_agent_memory.load_memory_variables({})
+        # Attach custom step recorder
+        recorder = StepRecorder(check_cancelled=check_cancelled)
+        # Invoke the agent (the sandbox polls the cancellation check while code runs)
+        token = execution_cancel_check.set(check_cancelled)
+        try:
+            result = agent.invoke(
+                {
+                    "input": f"{question}",
+                    "history": memory_vars["chat_history"],
+                },
+                config={"callbacks": [recorder]},
+            )
+        finally:
+            execution_cancel_check.reset(token)
+        return self.finish_insight_step(result, recorder)
+
+    async def ainsight_step(self, state: Dict[str, Any], check_cancelled=None):
+        question = self.get_insight_question(state)
+        # If question is not available
+        if question is None:
+            return self.get_missing_question_result()
+        agent = self.insight_agent()
+        # Memory
+        # Messages, truncated/summarized if needed
+        memory_vars = self.insight_agent_memory.load_memory_variables({})
+        # Attach custom step recorder
+        recorder = StepRecorder(check_cancelled=check_cancelled)
+        # Invoke the agent (tools run through their coroutines)
+        token = execution_cancel_check.set(check_cancelled)
+        try:
+            result = await agent.ainvoke(
+                {
+                    "input": f"{question}",
+                    "history": memory_vars["chat_history"],
+                },
+                config={"callbacks": [recorder]},
+            )
+        finally:
+            execution_cancel_check.reset(token)
+        return self.finish_insight_step(result, recorder)
+
+    def get_insight_question(self, state):
+        # Enriched question
+        if state.get("enriched_question"):
+            return state["enriched_question"]
+        if state.get("result"):
+            if state["result"].get("enriched_question"):
+                return state["result"]["enriched_question"]
+        return None
+
+    def finish_insight_step(self, result, recorder):
+        # Add to memory the input and output
+        # Input message
+        self.insight_agent_memory.chat_memory.add_user_message(result["input"])
+        # Output messsage
+        self.insight_agent_memory.chat_memory.add_ai_message(result["output"])
+        result["recorder_steps"] = recorder.steps
+        result["agent"] = "Insight Agent"
+        return result
+
+    def get_missing_question_result(self):
+        print("Insight Agent did not receive the enriched question")
+        result = {}
+        result["final_answer"] = (
+            "I did not receive the question from the Supervisor. I'm unable to provide the answer"
         )
-        workflow.set_entry_point("supervisor")
+        result["agent"] = "Insight Agent"
+        return result
 
-        # Use the passed memory instance
-        return workflow.compile()
+    # Workflow graph (compiled once per process, bound to this session)
+    def get_workflow_graph(
+        self,
+    ):
+        return get_compiled_workflow_graph().with_config(
+            configurable={"multi_agent_system": self}
+        )
@@ -0,0 +1,121 @@
+# Import Libraries
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "src/data_cache/llm_responses.sqlite"
+
+
+def normalize_question(question):
+    """Case/whitespace insensitive form of a question, used in the cache key."""
+    question = re.sub(r"\s+", " ", str(question)).strip().lower()
+    return question.rstrip(" ?.!")
+
+
+class ResponseCache:
+    """
+    Persistent (SQLite) cache of LLM generated tool responses, keyed by
+    (normalized question, tool, dataset schema fingerprint, model).
+    Entries expire after `ttl_seconds`; beyond `max_entries` the least recently used
+    entries are evicted. Hit/miss counters are kept per process.
+    """
+
+    def __init__(
+        self, path=DEFAULT_CACHE_PATH, ttl_seconds=7 * 24 * 3600, max_entries=5000
+    ):
+        self.path = path
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.metrics = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        self._lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                tool TEXT,
+                response_text TEXT,
+                created_at REAL,
+                last_access REAL
+            )
+            """)
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(question, tool, schema_fingerprint, model):
+        payload = "\x1f".join(
+            [normalize_question(question), tool, schema_fingerprint or "", model or ""]
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response_text, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.metrics["misses"] += 1
+                return None
+            if now - row[1] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self.metrics["expired"] += 1
+                self.metrics["misses"] += 1
+                return None
+            self._conn.execute(
+                "UPDATE responses SET last_access = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+            self.metrics["hits"] += 1
+            return row[0]
+
+    def set(self, key, tool, response_text):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                (key, tool, response_text, now, now),
+            )
+            # LRU eviction
+            n_entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[
+                0
+            ]
+            if n_entries > self.max_entries:
+                n_evict = n_entries - self.max_entries
+                self._conn.execute(
+                    "DELETE FROM responses WHERE key IN "
+                    "(SELECT key FROM responses ORDER BY last_access LIMIT ?)",
+                    (n_evict,),
+                )
+                self.metrics["evictions"] += n_evict
+            self._conn.commit()
+
+    def get_metrics(self):
+        with self._lock:
+            n_entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[
+                0
+            ]
+            lookups = self.metrics["hits"] + self.metrics["misses"]
+            return {
+                **self.metrics,
+                "entries": n_entries,
+                "hit_rate": self.metrics["hits"] / lookups if lookups else 0.0,
+            }
+
+
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Process-wide response cache, created on first use."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+    return _response_cache
@@ -0,0 +1,337 @@
+# Import Libraries
+import atexit
+import multiprocessing
+import os
+import queue
+import resource
+import signal
+import sys
+import threading
+import time
+import traceback
+from collections import OrderedDict
+
+import pandas as pd
+
+# Import Support Files
+import helpers
+from helpers import (
+    dataset_fingerprint,
+    enable_copy_on_write,
+    remember_fingerprint,
+    run_code_segments,
+)
+from job_queue import JobCancelled
+
+# Datasets received at runtime are kept per worker, least recently used evicted first
+worker_dataset_cache_size = 8
+
+
+class SandboxError(Exception):
+    """Generated code failed inside the sandbox (error_type: cpu_time, memory, ...)."""
+
+    def __init__(self, error_type, message):
+        super().__init__(message)
+        self.error_type = error_type
+
+
+class CPUTimeExceeded(Exception):
+    pass
+
+
+# Appended to budget errors so the agent retries with a cheaper query
+retry_hint = (
+    "Retry with a cheaper query: filter the rows and aggregate before joining or "
+    "plotting, avoid row-wise operations (iterrows, apply(axis=1)) and merges "
+    "without keys."
+)
+
+
+def _raise_cpu_time_exceeded(signum, frame):
+    raise CPUTimeExceeded("CPU time limit exceeded")
+
+
+def _set_cpu_budget(cpu_seconds):
+    # RLIMIT_CPU counts the whole process lifetime, so the soft limit is moved forward
+    # by the budget before every execution (and reset afterwards)
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if cpu_seconds is None:
+        resource.setrlimit(resource.RLIMIT_CPU, (hard, hard))
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    soft = int(usage.ru_utime + usage.ru_stime + cpu_seconds) + 1
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _worker_main(conn, preloaded, cpu_seconds, memory_mb):
+    # Ctrl+C is handled by the server process
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGXCPU, _raise_cpu_time_exceeded)
+    # Inherited after fork, not when started by a forkserver
+    enable_copy_on_write()
+    if memory_mb:
+        _, hard = resource.getrlimit(resource.RLIMIT_AS)
+        resource.setrlimit(resource.RLIMIT_AS, (memory_mb * 1024 * 1024, hard))
+    # Preloaded datasets are shared with the server process (copy-on-write after fork)
+    # or were sent with the start request (forkserver)
+    datasets = OrderedDict(preloaded)
+    pinned = set(preloaded)
+    for fingerprint, df in preloaded.items():
+        remember_fingerprint(df, fingerprint)
+    # Start-up (imports, preloaded datasets) is not part of any execution's budget
+    conn.send(("ready",))
+    while True:
+        try:
+            message = conn.recv()
+        except (EOFError, OSError):
+            break
+        if message[0] == "load":
+            _, fingerprint, df = message
+            datasets[fingerprint] = df
+            # Same fingerprint (cube key) as in the server process
+            remember_fingerprint(df, fingerprint)
+            unpinned = [fp for fp in datasets if fp not in pinned]
+            for fp in unpinned[: max(0, len(unpinned) - worker_dataset_cache_size)]:
+                del datasets[fp]
+            continue
+        # Run request
+        _, segments, refs, inline, PLOT_DIR = message
+        missing = [fp for fp in refs.values() if fp not in datasets]
+        if missing:
+            conn.send(("missing", missing))
+            continue
+        input_dict = {name: datasets[fp] for name, fp in refs.items()}
+        input_dict.update(inline)
+        compile_metrics = dict(helpers.compiled_code_cache_metrics)
+        try:
+            _set_cpu_budget(cpu_seconds)
+            reply = ("ok", run_code_segments(segments, input_dict, PLOT_DIR))
+        except CPUTimeExceeded:
+            reply = (
+                "error",
+                "cpu_time",
+                f"Execution exceeded the CPU time budget of {cpu_seconds}s. {retry_hint}",
+            )
+        except MemoryError:
+            reply = (
+                "error",
+                "memory",
+                f"Execution exceeded the memory budget of {memory_mb} MB. {retry_hint}",
+            )
+        except Exception as e:
+            reply = ("error", "execution", f"{e} \n{traceback.format_exc()}")
+        finally:
+            _set_cpu_budget(None)
+        # Compile cache metrics of this execution, for the server's totals
+        compile_metrics = {
+            key: helpers.compiled_code_cache_metrics[key] - value
+            for key, value in compile_metrics.items()
+        }
+        try:
+            conn.send(reply + (compile_metrics,))
+        except Exception as e:
+            message = f"Unable to return the result: {e}"
+            conn.send(("error", "serialization", message, compile_metrics))
+
+
+class SandboxWorker:
+    def __init__(self, ctx, preloaded, cpu_seconds, memory_mb):
+        self.conn, child_conn = ctx.Pipe()
+        self.process = ctx.Process(
+            target=_worker_main,
+            args=(child_conn, preloaded, cpu_seconds, memory_mb),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout):
+        """Wait until the worker has started (raises OSError after `timeout`)."""
+        if self.ready:
+            return
+        if not self.conn.poll(timeout):
+            raise OSError(f"Sandbox worker did not start within {timeout}s")
+        self.conn.recv()
+        self.ready = True
+
+    def stop(self):
+        self.conn.close()
+        if self.process.is_alive():
+            self.process.kill()
+        self.process.join(timeout=1)
+
+
+class SandboxPool:
+    """
+    Pre-forked pool of worker processes that execute generated analysis code outside
+    the server process, each execution with a wall-clock, CPU time and address space
+    budget. A worker that overruns the wall-clock budget is killed and replaced.
+    Workers are started by a forkserver (spawn where unavailable): forking a server that
+    already runs threads can deadlock the child. Only a caller that has not started any
+    thread yet may pass `fork=True`, the initial workers then inherit the datasets
+    passed at construction copy-on-write; otherwise (and for replacements) these are
+    sent to the worker when it starts. Other datasets are sent once per worker (by
+    fingerprint) and cached there. The budget of an execution starts once its worker
+    is ready. Outputs come back pickled over a pipe and figures are written to the
+    shared plot directory.
+    """
+
+    def __init__(
+        self,
+        n_workers=2,
+        wall_seconds=60,
+        cpu_seconds=60,
+        memory_mb=4096,
+        datasets=(),
+        fork=False,
+        startup_seconds=120,
+    ):
+        methods = multiprocessing.get_all_start_methods()
+        self.ctx = multiprocessing.get_context(
+            "forkserver" if "forkserver" in methods else "spawn"
+        )
+        self.fork_ctx = (
+            multiprocessing.get_context("fork") if fork and "fork" in methods else None
+        )
+        self.startup_seconds = startup_seconds
+        self.wall_seconds = wall_seconds
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.preloaded = {dataset_fingerprint(df): df for df in datasets}
+        self.metrics = {
+            "executions": 0,
+            "errors": 0,
+            "timeout": 0,
+            "cpu_time": 0,
+            "memory": 0,
+            "crash": 0,
+            "cancelled": 0,
+        }
+        self.metrics_lock = threading.Lock()
+        self.idle_workers = queue.Queue()
+        for _ in range(n_workers):
+            self.idle_workers.put(self.start_worker(self.fork_ctx or self.ctx))
+
+    def start_worker(self, ctx=None):
+        return SandboxWorker(
+            ctx or self.ctx, self.preloaded, self.cpu_seconds, self.memory_mb
+        )
+
+    def receive(self, worker, deadline, check_cancelled=None):
+        # Wake up regularly to notice a cancelled job
+        while not worker.conn.poll(min(0.1, max(0, deadline - time.monotonic()))):
+            if time.monotonic() >= deadline:
+                raise TimeoutError
+            if check_cancelled is not None:
+                check_cancelled()
+        return worker.conn.recv()
+
+    def count(self, key):
+        with self.metrics_lock:
+            self.metrics[key] += 1
+
+    def get_metrics(self):
+        with self.metrics_lock:
+            return dict(self.metrics)
+
+    def run(self, segments, input_dict, PLOT_DIR, check_cancelled=None):
+        """
+        Execute `segments` in a worker; returns run_code_segments outputs or raises
+        SandboxError (error_type: timeout, cpu_time, memory, crash, execution, ...).
+        `check_cancelled()` is polled while the code runs; when it raises JobCancelled
+        the worker is killed (and replaced) and the exception is re-raised.
+        """
+        frames = {
+            name: df for name, df in input_dict.items() if isinstance(df, pd.DataFrame)
+        }
+        refs = {name: dataset_fingerprint(df) for name, df in frames.items()}
+        inline = {k: v for k, v in input_dict.items() if k not in frames}
+        self.count("executions")
+        worker = self.idle_workers.get()
+        try:
+            worker.wait_ready(self.startup_seconds)
+            deadline = time.monotonic() + self.wall_seconds
+            worker.conn.send(("run", segments, refs, inline, PLOT_DIR))
+            reply = self.receive(worker, deadline, check_cancelled)
+            if reply[0] == "missing":
+                by_fingerprint = {refs[name]: df for name, df in frames.items()}
+                for fp in reply[1]:
+                    worker.conn.send(("load", fp, by_fingerprint[fp]))
+                # Sending the datasets is not part of the execution budget either
+                deadline = time.monotonic() + self.wall_seconds
+                worker.conn.send(("run", segments, refs, inline, PLOT_DIR))
+                reply = self.receive(worker, deadline, check_cancelled)
+            # Code is compiled (and cached) in the worker, report it in this process
+            reply, compile_metrics = reply[:-1], reply[-1]
+            helpers.add_compile_metrics(compile_metrics)
+        except JobCancelled:
+            # The job no longer needs the result, stop paying for it
+            worker.stop()
+            worker = self.start_worker()
+            self.count("cancelled")
+            raise
+        except TimeoutError:
+            # Cancel the execution by killing the worker, then replace it
+            worker.stop()
+            worker = self.start_worker()
+            reply = (
+                "error",
+                "timeout",
+                f"Execution exceeded the time budget of {self.wall_seconds}s. {retry_hint}",
+            )
+        except (EOFError, OSError) as e:
+            # Worker died (e.g. killed by the OS), replace it
+            worker.stop()
+            worker = self.start_worker()
+            reply = ("error", "crash", f"Sandbox worker terminated: {e}")
+        finally:
+            self.idle_workers.put(worker)
+        if reply[0] == "ok":
+            return reply[1]
+        self.count("errors")
+        if reply[1] in self.metrics:
+            self.count(reply[1])
+        raise SandboxError(reply[1], reply[2])
+
+    def close(self):
+        while not self.idle_workers.empty():
+            self.idle_workers.get().stop()
+
+
+_sandbox_pool = None
+_sandbox_pool_lock = threading.Lock()
+
+
+def start_sandbox_pool(
+    datasets=(),
+    n_workers=None,
+    wall_seconds=60,
+    cpu_seconds=60,
+    memory_mb=4096,
+    fork=False,
+):
+    """
+    Start the process-wide sandbox pool (once) and route execute_analysis through it.
+    Falls back to in-process execution where the pool cannot be started. `fork=True`
+    only before the calling process starts any thread (see SandboxPool).
+    """
+    global _sandbox_pool
+    with _sandbox_pool_lock:
+        if _sandbox_pool is None and sys.platform != "win32":
+            try:
+                _sandbox_pool = SandboxPool(
+                    n_workers=n_workers or min(4, os.cpu_count() or 1),
+                    wall_seconds=wall_seconds,
+                    cpu_seconds=cpu_seconds,
+                    memory_mb=memory_mb,
+                    datasets=datasets,
+                    fork=fork,
+                )
+                helpers.set_execution_sandbox(_sandbox_pool)
+                atexit.register(_sandbox_pool.close)
+            except Exception as e:
+                print(f"Unable to start sandbox pool: {e} \n{traceback.format_exc()}")
+    return _sandbox_pool
@@ -0,0 +1,91 @@
+# Import Libraries
+import numpy as np
+import pandas as pd
+
+# Declared column types of the preprocessed datasets
+# - "category": dimension columns (few distinct values), stored as pandas categoricals
+# - "text": free text, stored as nullable (Arrow) strings
+# - "integer": whole numbers, downcast to the smallest integer type keeping headroom
+#   (nullable Int* when values are missing)
+expense_schema = {
+    "Region": "category",
+    "Country": "category",
+    "Category": "category",
+    "Brand": "category",
+    "Year": "integer",
+    "Month": "integer",
+    "Tier 1": "category",
+    "Tier 2": "category",
+    "Tier 3": "category",
+    "Expense Status": "category",
+    "Pending At": "category",
+    "Expense Logged by": "category",
+    "Audit Status": "category",
+    "Audit Comments": "text",
+    "Pep Expense": "integer",
+    "Bottler Expense": "integer",
+    "Total Expense": "integer",
+}
+budget_schema = {
+    "Region": "category",
+    "Country": "category",
+    "Year": "integer",
+    "Category": "category",
+    "Brand": "category",
+    "Tier 1": "category",
+    "Tier 2": "category",
+    "Tier 3": "category",
+    "Pep Budget": "integer",
+    "Bottler Budget": "integer",
+    "Total Budget": "integer",
+}
+
+# Downcast integers only where |value| * headroom still fits, so that row-wise arithmetic
+# in generated code (e.g. Year * 100 + Month, share * 100) cannot overflow
+integer_headroom = 1024
+integer_types = ["int8", "int16", "int32", "int64"]
+
+
+def compact_integer_dtype(series):
+    """Smallest integer dtype holding `series` with headroom (nullable if needed)."""
+    largest = series.abs().max()
+    largest = 0 if pd.isna(largest) else int(largest)
+    for dtype in integer_types:
+        if largest * integer_headroom <= np.iinfo(dtype).max:
+            break
+    return dtype.capitalize() if series.isna().any() else dtype
+
+
+def validate_schema(df, schema):
+    """Raise ValueError when `df` cannot be stored with `schema`."""
+    errors = []
+    missing = [col for col in schema if col not in df.columns]
+    if missing:
+        errors.append(f"missing columns {missing}")
+    for col, kind in schema.items():
+        if kind != "integer" or col not in df.columns:
+            continue
+        values = pd.to_numeric(df[col], errors="coerce")
+        invalid = values.isna() & df[col].notna()
+        invalid |= values.notna() & (values % 1 != 0)
+        if invalid.any():
+            errors.append(
+                f"column '{col}' has non-integer values, e.g. {df.loc[invalid, col].iloc[0]!r}"
+            )
+    if errors:
+        raise ValueError("Dataset does not match the schema: " + "; ".join(errors))
+
+
+def apply_schema(df, schema):
+    """Validate `df` and return it with the compact column types of `schema`."""
+    validate_schema(df, schema)
+    columns = {}
+    for col, kind in schema.items():
+        if kind == "category":
+            columns[col] = df[col].astype("category")
+        elif kind == "text":
+            columns[col] = df[col].astype("string[pyarrow]")
+        else:
+            values = pd.to_numeric(df[col])
+            columns[col] = values.astype(compact_integer_dtype(values))
+    return df.assign(**columns)
@@ -0,0 +1,54 @@
+# Import Libraries
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+# The src modules import each other by bare name (as when run from app.py)
+repo_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(os.path.join(repo_root, "src"))
+sys.path.append(os.path.join(repo_root, "benchmarks"))
+
+from helpers import enable_copy_on_write
+
+# Same pandas mode as the app, server and batch runner
+enable_copy_on_write()
+
+
+@pytest.fixture(scope="session")
+def budget_path():
+    return os.path.join(repo_root, "src", "data", "Budget_RB.csv")
+
+
+@pytest.fixture(scope="session")
+def expense_path(tmp_path_factory):
+    # Synthetic expense extract (the expense source file is not part of the repository)
+    from benchmark_compact_schema import write_expense_file
+
+    path = str(tmp_path_factory.mktemp("data") / "expenses.csv")
+    write_expense_file(path, 5_000)
+    return path
+
+
+@pytest.fixture
+def frame():
+    """Small synthetic expense frame (fresh per test, tests may write to it)."""
+    rng = np.random.default_rng(0)
+    n_rows = 1_000
+    return pd.DataFrame(
+        {
+            "Country": rng.choice(["Brazil", "Mexico", "India"], n_rows),
+            "Year": rng.integers(2022, 2026, n_rows),
+            "Expense": rng.random(n_rows) * 1000,
+        }
+    )
+
+
+@pytest.fixture(scope="session")
+def datasets(expense_path, budget_path):
+    """Preprocessed (expense, budget) datasets."""
+    from helpers import preprocess_budget_data, preprocess_expense_data
+
+    return preprocess_expense_data(expense_path), preprocess_budget_data(budget_path)
@@ -0,0 +1,38 @@
+# Import Libraries
+import pandas as pd
+
+from aggregates import AggregateCube
+from helpers import build_budget_vs_actual, run_code_segments
+
+
+def test_cube_matches_groupby(datasets):
+    df_expense, _ = datasets
+    cube = AggregateCube(df_expense)
+    result = cube.query(by=["Region"], filters={"Year": 2024}, measures="Total Expense")
+    expected = (
+        df_expense[df_expense["Year"] == 2024]
+        .groupby("Region", observed=True)["Total Expense"]
+        .sum()
+        .reset_index()
+    )
+    pd.testing.assert_frame_equal(
+        result.sort_values("Region").reset_index(drop=True),
+        expected.sort_values("Region").reset_index(drop=True),
+        check_dtype=False,
+    )
+
+
+def test_cube_skips_ratio_columns(datasets):
+    df_budget_vs_actual = build_budget_vs_actual(*datasets)
+    cube = AggregateCube(df_budget_vs_actual)
+    assert "Total Budget" in cube.measures
+    assert "Variance %" not in cube.measures
+    assert "Utilization %" not in cube.measures
+
+
+def test_no_cube_without_dimensions(tmp_path):
+    segments = {"code": "answer = 'cube' in globals()", "answer": "{answer}"}
+    outputs = run_code_segments(
+        segments, {"df": pd.DataFrame({"Value": [1, 2]})}, str(tmp_path)
+    )
+    assert outputs["answer"] == "False"
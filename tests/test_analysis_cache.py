@@ -0,0 +1,47 @@
+# Import Libraries
+import os
+
+import helpers
+from helpers import execute_analysis
+
+response_text = """
+<code>
+totals = df.groupby('Country')['Expense'].sum().reset_index()
+answer_dict = {'total': int(totals['Expense'].sum())}
+</code>
+<chart>
+fig = px.bar(totals, x='Country', y='Expense')
+</chart>
+<answer>{answer_dict['total']}</answer>
+"""
+
+
+def analyse(frame, tmp_path):
+    return execute_analysis.invoke(
+        {
+            "input_dict": {"df": frame},
+            "response_text": response_text,
+            "PLOT_DIR": str(tmp_path),
+        }
+    )
+
+
+def test_cached_result_is_reused(frame, tmp_path):
+    first = analyse(frame, tmp_path)
+    hits = helpers.analysis_result_cache_metrics["hits"]
+    second = analyse(frame, tmp_path)
+    assert helpers.analysis_result_cache_metrics["hits"] == hits + 1
+    assert second["answer"] == first["answer"]
+    assert second["figure"] == first["figure"]
+
+
+def test_entry_with_deleted_figure_is_a_miss(frame, tmp_path):
+    first = analyse(frame, tmp_path)
+    os.remove(first["figure"])
+    hits = helpers.analysis_result_cache_metrics["hits"]
+    misses = helpers.analysis_result_cache_metrics["misses"]
+    second = analyse(frame, tmp_path)
+    assert helpers.analysis_result_cache_metrics["hits"] == hits
+    assert helpers.analysis_result_cache_metrics["misses"] == misses + 1
+    # Run again, the figure is written back
+    assert os.path.exists(second["figure"])
@@ -0,0 +1,85 @@
+# Import Libraries
+import asyncio
+
+import pytest
+
+from fake_llm import FakeChatModel
+from multi_agents import AnswerStream, MultiAgentSystem
+from response_cache import ResponseCache
+
+final_answer = (
+    "<answer>Spend is <b>up</b> 5% (a < b).</answer>"
+    "<graph>plots/a.json | plots/b.json</graph>"
+)
+
+
+def feed_all(tokens):
+    stream = AnswerStream()
+    return [event for token in tokens for event in stream.feed(token)]
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, len(final_answer)])
+def test_answer_stream_is_tag_aware(size):
+    tokens = [final_answer[i : i + size] for i in range(0, len(final_answer), size)]
+    events = feed_all(tokens)
+    answer = "".join(value for kind, value in events if kind == "answer")
+    assert answer == "Spend is <b>up</b> 5% (a < b)."
+    # Graph paths are only released once the tag is complete
+    assert events[-1] == ("graphs", ["plots/a.json", "plots/b.json"])
+    assert [kind for kind, _ in events].count("graphs") == 1
+
+
+def test_answer_stream_holds_back_partial_closing_tag():
+    stream = AnswerStream()
+    assert stream.feed("<answer>Total: 10</ans") == [("answer", "Total: 10")]
+    assert stream.feed("wer>") == []
+
+
+@pytest.fixture(scope="module")
+def system(datasets, tmp_path_factory):
+    expense_dataset, budget_dataset = datasets
+    return MultiAgentSystem(
+        model_name="fake",
+        api_key=None,
+        expense_dataset=expense_dataset,
+        budget_dataset=budget_dataset,
+        plot_path=str(tmp_path_factory.mktemp("plots")),
+        parallel_tools=True,
+        llm=FakeChatModel(),
+        response_cache=ResponseCache(":memory:"),
+    )
+
+
+def collect_tokens(chunks):
+    tokens, output = [], None
+    for mode, chunk in chunks:
+        if mode == "custom" and chunk["status"] == "token":
+            tokens.append(chunk["step"]["answer"])
+        if mode == "updates" and "Insight Agent" in chunk:
+            output = chunk["Insight Agent"]["output"]
+            break
+    return tokens, output
+
+
+def test_graph_streams_final_answer_tokens(system):
+    tokens, output = collect_tokens(
+        system.graph.stream(
+            {"question": "Total expenses in 2024"}, stream_mode=["updates", "custom"]
+        )
+    )
+    assert len(tokens) > 1
+    assert "".join(tokens) == "This is a fake answer."
+    assert output.startswith("<answer>This is a fake answer.</answer>")
+
+
+def test_async_graph_streams_final_answer_tokens(system):
+    async def run():
+        chunks = []
+        async for item in system.graph.astream(
+            {"question": "Total expenses in 2024"}, stream_mode=["updates", "custom"]
+        ):
+            chunks.append(item)
+        return collect_tokens(chunks)
+
+    tokens, _ = asyncio.run(run())
+    assert "".join(tokens) == "This is a fake answer."
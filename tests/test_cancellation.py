@@ -0,0 +1,78 @@
+# Import Libraries
+import time
+
+import pytest
+
+from fake_llm import FakeChatModel
+from job_queue import JobQueue
+from multi_agents import MultiAgentSystem
+from response_cache import ResponseCache
+
+latency = 0.3
+
+
+class CancellingChatModel(FakeChatModel):
+    """FakeChatModel that presses Stop on `job` during its `cancel_at`-th call."""
+
+    cancel_at: int = 0
+    calls: int = 0
+    job: object = None
+
+    def count_call(self):
+        self.calls += 1
+        if self.calls == self.cancel_at:
+            self.job.cancel()
+
+    def _generate(self, messages, *args, **kwargs):
+        self.count_call()
+        return super()._generate(messages, *args, **kwargs)
+
+    def _stream(self, messages, *args, **kwargs):
+        self.count_call()
+        yield from super()._stream(messages, *args, **kwargs)
+
+
+# Calls: supervisor, summary of the supervisor turn, the Insight Agent's streamed call,
+# then the expense and budget tools' calls in parallel (the other one may already be
+# in flight when the first one cancels)
+@pytest.mark.parametrize("cancel_at, max_calls", [(3, 3), (4, 5)])
+def test_cancelled_job_stops_before_the_next_llm_call(
+    cancel_at, max_calls, datasets, tmp_path
+):
+    expense_dataset, budget_dataset = datasets
+    llm = CancellingChatModel(latency=latency, cancel_at=cancel_at)
+    system = MultiAgentSystem(
+        model_name="fake",
+        api_key=None,
+        expense_dataset=expense_dataset,
+        budget_dataset=budget_dataset,
+        plot_path=str(tmp_path),
+        parallel_tools=True,
+        llm=llm,
+        response_cache=ResponseCache(":memory:"),
+    )
+
+    def run(job):
+        # Same flow as the chat tab
+        llm.job = job
+        graph = system.graph.with_config(
+            configurable={"check_cancelled": job.check_cancelled}
+        )
+        for mode, chunk in graph.stream(
+            {"question": "Compare 2024 expenses vs budget for Brazil"},
+            stream_mode=["updates", "custom"],
+        ):
+            job.emit((mode, chunk))
+
+    queue = JobQueue(n_workers=1)
+    try:
+        job = queue.submit("session", run)
+        while not job.finished:
+            time.sleep(0.05)
+        assert job.state == "cancelled"
+        # No tool (or any other) LLM call is started afterwards, also not in the
+        # background once the stream consumer has stopped
+        time.sleep(4 * latency)
+        assert llm.calls <= max_calls
+    finally:
+        queue.close()
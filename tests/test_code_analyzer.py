@@ -0,0 +1,34 @@
+# Import Libraries
+import pandas as pd
+
+from code_analyzer import preflight_check
+
+
+def run(code, df):
+    namespace = {"pd": pd, "df": df}
+    exec(preflight_check(code, ["df"]), namespace)
+    return namespace["result"]
+
+
+def test_value_counts_drops_unobserved_categories():
+    df = pd.DataFrame(
+        {"Country": pd.Categorical(["Brazil", "Chile", "Chile"]), "Year": [1, 1, 2]}
+    )
+    code = 'result = df[df["Year"] == 1]["Country"].value_counts().head(5)'
+    assert run(code, df).to_dict() == {"Brazil": 1, "Chile": 1}
+    code = 'result = df[df["Year"] == 2].value_counts(["Country"], normalize=True)'
+    assert run(code, df).to_dict() == {("Chile",): 1.0}
+
+
+def test_value_counts_keeps_empty_bins():
+    df = pd.DataFrame({"Amount": [1, 2, 10]})
+    code = 'result = df["Amount"].value_counts(bins=[0, 5, 8, 12], sort=False)'
+    assert run(code, df).tolist() == [2, 0, 1]
+
+
+def test_groupby_only_returns_observed_combinations():
+    df = pd.DataFrame(
+        {"Country": pd.Categorical(["Brazil", "Chile"]), "Amount": [1, 2]}
+    )
+    code = 'result = df[df["Amount"] > 1].groupby("Country")["Amount"].sum()'
+    assert run(code, df).to_dict() == {"Chile": 2}
@@ -0,0 +1,48 @@
+# Import Libraries
+import pandas as pd
+import pytest
+
+from code_analyzer import preflight_segments
+from helpers import run_code_segments
+
+mutating_codes = [
+    "df['Expense'] = 0",
+    "df.loc[df['Year'] == 2024, 'Expense'] = -1",
+    "df['Expense'].values[:] = -2",
+    "df.drop(columns=['Country'], inplace=True)",
+    "df.sort_values('Expense', inplace=True)",
+]
+
+
+def run(code, df, tmp_path):
+    # Same steps as execute_analysis
+    segments = preflight_segments({"code": code, "answer": "{answer_dict}"}, ["df"])
+    return run_code_segments(segments, {"df": df}, str(tmp_path))
+
+
+@pytest.mark.parametrize("code", mutating_codes)
+def test_generated_code_cannot_modify_shared_frame(code, frame, tmp_path):
+    df = frame
+    expected = df.copy()
+    try:
+        run(code + "\nanswer_dict = 1", df, tmp_path)
+    except ValueError:
+        # Writing through .values of a view is refused (read-only array)
+        pass
+    pd.testing.assert_frame_equal(df, expected)
+
+
+@pytest.mark.parametrize(
+    "code",
+    [
+        "df[df['Year'] == 2024]['Expense'] = -1",
+        "df['Expense'][df['Year'] == 2024] = -1",
+    ],
+)
+def test_chained_assignment_takes_effect(code, frame, tmp_path):
+    # Chained assignments are no-ops under copy-on-write, the pre-flight uses .loc
+    df = frame
+    outputs = run(
+        code + "\nanswer_dict = int((df['Expense'] == -1).sum())", df, tmp_path
+    )
+    assert outputs["answer_dict"] == int((df["Year"] == 2024).sum())
@@ -0,0 +1,52 @@
+# Import Libraries
+import time
+
+from dataset_registry import DatasetRegistry
+
+
+def wait(registry, handle):
+    while registry.ingestion_status(handle)["state"] in ("pending", "running"):
+        time.sleep(0.01)
+    return registry.ingestion_status(handle)
+
+
+def test_writes_to_a_registered_dataset_do_not_reach_the_registry(frame):
+    registry = DatasetRegistry()
+    expected = frame.copy()
+    handle = registry.register(frame, pinned=True)
+    view = registry.get(handle)
+    view.loc[view["Year"] == 2024, "Expense"] = -1
+    view["Extra"] = 1
+    view.drop(columns=["Country"], inplace=True)
+    assert registry.get(handle).equals(expected)
+
+
+def test_jobs_are_dropped_with_their_datasets(frame):
+    registry = DatasetRegistry(max_unpinned=2, max_failed_jobs=2)
+    handles = []
+    for i in range(3):
+        handles.append(
+            registry.submit_upload(
+                "expense", str(i).encode(), f"{i}.csv", lambda *args: frame
+            )
+        )
+        wait(registry, handles[-1])
+    # The oldest upload was evicted (and has to be submitted again)
+    assert registry.get(handles[0]) is None
+    status = registry.ingestion_status(handles[0])
+    assert status["state"] == "failed" and "evicted" in status["error"]
+    assert registry.ingestion_status(handles[2])["state"] == "done"
+
+    def fail(content_hash, progress):
+        raise ValueError("Missing required columns: Year")
+
+    failed = []
+    for i in range(3):
+        failed.append(registry.submit_upload("budget", str(i).encode(), "b.csv", fail))
+        wait(registry, failed[-1])
+    # Only the most recent failed jobs are kept
+    assert len(registry._jobs) == 2 + 2
+    assert registry.ingestion_status(handles[0]) is None
+    assert registry.ingestion_status(failed[2])["error"] == (
+        "Missing required columns: Year"
+    )
@@ -0,0 +1,35 @@
+# Import Libraries
+import pandas as pd
+import pytest
+
+from helpers import preprocess_budget_data, preprocess_expense_data
+from ingestion import ingest, read_ingested
+
+
+@pytest.mark.parametrize("chunk_rows", [1_000, 250_000])
+def test_ingested_expenses_match_preprocessed(expense_path, tmp_path, chunk_rows):
+    parquet_path = str(tmp_path / "expense.parquet")
+    ingest("expense", expense_path, "expenses.csv", parquet_path, chunk_rows=chunk_rows)
+    pd.testing.assert_frame_equal(
+        read_ingested("expense", parquet_path), preprocess_expense_data(expense_path)
+    )
+
+
+@pytest.mark.parametrize("chunk_rows", [100, 250_000])
+def test_ingested_budget_matches_preprocessed(budget_path, tmp_path, chunk_rows):
+    parquet_path = str(tmp_path / "budget.parquet")
+    ingest("budget", budget_path, "Budget_RB.csv", parquet_path, chunk_rows=chunk_rows)
+    pd.testing.assert_frame_equal(
+        read_ingested("budget", parquet_path), preprocess_budget_data(budget_path)
+    )
+
+
+def test_ingested_xlsx_budget_matches_preprocessed(budget_path, tmp_path):
+    xlsx_path = str(tmp_path / "budget.xlsx")
+    pd.read_csv(budget_path).to_excel(xlsx_path, index=False)
+    parquet_path = str(tmp_path / "budget.parquet")
+    ingest("budget", xlsx_path, "budget.xlsx", parquet_path, chunk_rows=100)
+    pd.testing.assert_frame_equal(
+        read_ingested("budget", parquet_path),
+        preprocess_budget_data(None, pd.read_excel(xlsx_path)),
+    )
@@ -0,0 +1,66 @@
+# Import Libraries
+import asyncio
+import time
+
+import pytest
+
+from fake_llm import FakeChatModel
+from multi_agents import MultiAgentSystem
+from response_cache import ResponseCache
+
+latency = 0.3
+question = "Total 2024 spend for Brazil"
+
+
+@pytest.fixture
+def system(datasets, tmp_path):
+    # Fresh in-memory response cache: every tool call pays the LLM latency
+    expense_dataset, budget_dataset = datasets
+    return MultiAgentSystem(
+        model_name="fake",
+        api_key=None,
+        expense_dataset=expense_dataset,
+        budget_dataset=budget_dataset,
+        plot_path=str(tmp_path),
+        parallel_tools=True,
+        llm=FakeChatModel(latency=latency),
+        response_cache=ResponseCache(":memory:"),
+    )
+
+
+def assert_fanned_in(result, datasets):
+    expense_dataset, budget_dataset = datasets
+    assert result["expense_output"]["answer"] == (
+        f"The dataset has {len(expense_dataset)} rows."
+    )
+    assert result["budget_output"]["answer"] == (
+        f"The dataset has {len(budget_dataset)} rows."
+    )
+    assert result["expense_output"]["answer"] in result["answer"]
+    assert result["budget_output"]["answer"] in result["answer"]
+
+
+def test_parallel_tools_run_concurrently(system, datasets):
+    start = time.perf_counter()
+    system.expense_data_tool(question)
+    system.budget_data_tool(question)
+    sequential = time.perf_counter() - start
+
+    system.response_cache = ResponseCache(":memory:")
+    start = time.perf_counter()
+    result = system.expense_and_budget_data_tool(question, question)
+    parallel = time.perf_counter() - start
+
+    assert sequential >= 2 * latency
+    assert parallel < sequential * 0.75
+    assert_fanned_in(result, datasets)
+
+
+def test_async_parallel_tools_run_concurrently(system, datasets):
+    start = time.perf_counter()
+    result = asyncio.run(system.aexpense_and_budget_data_tool(question, question))
+    parallel = time.perf_counter() - start
+
+    # One LLM round trip per tool, overlapped
+    assert parallel < 2 * latency
+    assert_fanned_in(result, datasets)
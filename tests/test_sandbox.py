@@ -0,0 +1,59 @@
+# Import Libraries
+import sys
+import threading
+import time
+
+import pytest
+
+from job_queue import JobCancelled, JobHandle
+from sandbox import SandboxError, SandboxPool
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="The sandbox is not used on Windows"
+)
+
+sum_code = {"code": "total = int(df['Expense'].sum())", "answer": "{total}"}
+
+
+@pytest.mark.parametrize("fork", [False, True])
+def test_replacement_worker_startup_is_not_part_of_the_budget(fork, frame, tmp_path):
+    # The replacement worker takes longer to start (imports, datasets) than the budget
+    pool = SandboxPool(n_workers=1, wall_seconds=1, datasets=[frame], fork=fork)
+    try:
+        expected = str(int(frame["Expense"].sum()))
+        assert pool.run(sum_code, {"df": frame}, str(tmp_path))["answer"] == expected
+        with pytest.raises(SandboxError) as error:
+            pool.run(
+                {"code": "while True: pass", "answer": ""}, {"df": frame}, str(tmp_path)
+            )
+        assert error.value.error_type == "timeout"
+        assert pool.run(sum_code, {"df": frame}, str(tmp_path))["answer"] == expected
+        # Datasets unknown to the worker are sent on first use
+        other = frame.head(10)
+        assert pool.run(sum_code, {"df": other}, str(tmp_path))["answer"] == str(
+            int(other["Expense"].sum())
+        )
+    finally:
+        pool.close()
+
+
+def test_cancelled_job_stops_the_execution(frame, tmp_path):
+    pool = SandboxPool(n_workers=1, wall_seconds=30, datasets=[frame])
+    try:
+        job = JobHandle("job-1", "session", None)
+        threading.Timer(0.5, job.cancel).start()
+        start = time.perf_counter()
+        with pytest.raises(JobCancelled):
+            pool.run(
+                {"code": "while True: pass", "answer": ""},
+                {"df": frame},
+                str(tmp_path),
+                check_cancelled=job.check_cancelled,
+            )
+        assert time.perf_counter() - start < 5
+        assert pool.get_metrics()["cancelled"] == 1
+        # The worker was replaced
+        expected = str(int(frame["Expense"].sum()))
+        assert pool.run(sum_code, {"df": frame}, str(tmp_path))["answer"] == expected
+    finally:
+        pool.close()